@@ -0,0 +1,107 @@
+-- Minimal subset of the ovirt_engine_history schema read by COLLECTOR_BACKEND=dwh.
+-- Sample timestamps are relative to now() so they fall inside DWH_SAMPLE_WINDOW.
+
+CREATE TABLE vm_configuration (
+    history_id serial PRIMARY KEY,
+    vm_name varchar(255) NOT NULL,
+    cluster_id uuid,
+    template_id uuid,
+    memory_size_mb integer,
+    number_of_sockets smallint,
+    cpu_per_socket smallint
+);
+
+CREATE TABLE vm_samples_history (
+    history_id serial PRIMARY KEY,
+    history_datetime timestamp with time zone NOT NULL,
+    vm_id uuid NOT NULL,
+    vm_status smallint NOT NULL,
+    vm_ip text,
+    currently_running_on_host uuid,
+    cpu_usage_percent smallint,
+    user_cpu_usage_percent smallint,
+    system_cpu_usage_percent smallint,
+    memory_usage_percent smallint,
+    vm_configuration_version integer REFERENCES vm_configuration (history_id)
+);
+
+CREATE TABLE host_configuration (
+    history_id serial PRIMARY KEY,
+    host_name varchar(255) NOT NULL,
+    cluster_id uuid,
+    fqdn_or_ip varchar(255),
+    memory_size_mb integer,
+    swap_size_mb integer,
+    cpu_model varchar(255),
+    cpu_speed_mh numeric(18, 0),
+    number_of_cores smallint,
+    number_of_sockets smallint,
+    threads_per_core smallint,
+    vdsm_port integer
+);
+
+CREATE TABLE host_samples_history (
+    history_id serial PRIMARY KEY,
+    history_datetime timestamp with time zone NOT NULL,
+    host_id uuid NOT NULL,
+    host_status smallint NOT NULL,
+    cpu_usage_percent smallint,
+    user_cpu_usage_percent smallint,
+    system_cpu_usage_percent smallint,
+    memory_usage_percent smallint,
+    ksm_cpu_percent smallint,
+    cpu_load integer,
+    swap_used_mb integer,
+    host_configuration_version integer REFERENCES host_configuration (history_id)
+);
+
+CREATE TABLE storage_domain_configuration (
+    history_id serial PRIMARY KEY,
+    storage_domain_name varchar(250) NOT NULL,
+    storage_domain_type smallint NOT NULL,
+    storage_type smallint NOT NULL
+);
+
+CREATE TABLE storage_domain_samples_history (
+    history_id serial PRIMARY KEY,
+    history_datetime timestamp with time zone NOT NULL,
+    storage_domain_id uuid NOT NULL,
+    available_disk_size_gb integer,
+    used_disk_size_gb integer,
+    storage_configuration_version integer REFERENCES storage_domain_configuration (history_id)
+);
+
+INSERT INTO vm_configuration (history_id, vm_name, cluster_id, template_id, memory_size_mb, number_of_sockets, cpu_per_socket) VALUES
+    (1, 'vm1', '00000000-0000-0000-0000-00000000c001', '00000000-0000-0000-0000-00000000f001', 2048, 2, 2),
+    (2, 'vm1', '00000000-0000-0000-0000-00000000c001', '00000000-0000-0000-0000-00000000f001', 4096, 2, 2),
+    (3, 'vm2', NULL, NULL, NULL, NULL, NULL);
+
+INSERT INTO vm_samples_history (history_datetime, vm_id, vm_status, vm_ip, currently_running_on_host,
+                                cpu_usage_percent, user_cpu_usage_percent, system_cpu_usage_percent, memory_usage_percent,
+                                vm_configuration_version) VALUES
+    (now() - interval '2 hours', '00000000-0000-0000-0000-0000000a0001', 0, NULL, NULL, 0, 0, 0, 0, 1),
+    (now() - interval '2 minutes', '00000000-0000-0000-0000-0000000a0001', 1, '10.0.0.1', '00000000-0000-0000-0000-00000000b001', 30, 20, 10, 40, 1),
+    (now() - interval '1 minute', '00000000-0000-0000-0000-0000000a0001', 1, '10.0.0.1', '00000000-0000-0000-0000-00000000b001', 50, 40, 10, 25, 2),
+    (now() - interval '1 minute', '00000000-0000-0000-0000-0000000a0002', 0, NULL, NULL, NULL, NULL, NULL, NULL, 3),
+    (now() - interval '2 hours', '00000000-0000-0000-0000-0000000a0003', 1, '10.0.0.3', NULL, 10, 5, 5, 10, 1);
+
+INSERT INTO host_configuration (history_id, host_name, cluster_id, fqdn_or_ip, memory_size_mb, swap_size_mb, cpu_model, cpu_speed_mh,
+                                number_of_cores, number_of_sockets, threads_per_core, vdsm_port) VALUES
+    (1, 'host1', '00000000-0000-0000-0000-00000000c001', 'host1.example.com', 65536, 8192, 'Intel Xeon', 2400, 16, 2, 2, 54321),
+    (2, 'host2', NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL);
+
+INSERT INTO host_samples_history (history_datetime, host_id, host_status, cpu_usage_percent, user_cpu_usage_percent, system_cpu_usage_percent,
+                                  memory_usage_percent, ksm_cpu_percent, cpu_load, swap_used_mb, host_configuration_version) VALUES
+    (now() - interval '3 minutes', '00000000-0000-0000-0000-00000000b001', 1, 10, 5, 5, 10, 0, 1, 0, 1),
+    (now() - interval '1 minute', '00000000-0000-0000-0000-00000000b001', 1, 30, 20, 10, 50, 1, 4, 1024, 1),
+    (now() - interval '1 minute', '00000000-0000-0000-0000-00000000b002', 3, NULL, NULL, NULL, NULL, NULL, NULL, NULL, 2);
+
+INSERT INTO storage_domain_configuration (history_id, storage_domain_name, storage_domain_type, storage_type) VALUES
+    (1, 'data1', 0, 1),
+    (2, 'export1', 3, 42);
+
+INSERT INTO storage_domain_samples_history (history_datetime, storage_domain_id, available_disk_size_gb, used_disk_size_gb,
+                                            storage_configuration_version) VALUES
+    (now() - interval '4 minutes', '00000000-0000-0000-0000-00000000d001', 200, 100, 1),
+    (now() - interval '1 minute', '00000000-0000-0000-0000-00000000d001', 150, 150, 1),
+    (now() - interval '1 minute', '00000000-0000-0000-0000-00000000d002', NULL, NULL, 2);
@@ -0,0 +1,115 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import zvirt_exporter
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "dwh_fixtures.sql")
+SCHEMA = "zvirt_exporter_test"
+TEST_DSN = os.getenv("ZVIRT_TEST_DWH_DSN", "")
+
+
+def statistic(item, name):
+    for stat in item["statistics"]["statistic"]:
+        if stat["name"] == name:
+            return stat["values"]["value"][0]["datum"]
+
+
+@unittest.skipIf(zvirt_exporter.asyncpg is None, "asyncpg is not installed")
+@unittest.skipUnless(TEST_DSN, "set ZVIRT_TEST_DWH_DSN to a scratch PostgreSQL database")
+class DwhBackendTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        asyncpg = zvirt_exporter.asyncpg
+        connection = await asyncpg.connect(TEST_DSN)
+        try:
+            await connection.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}")
+            with open(FIXTURES) as f:
+                await connection.execute(f.read())
+        finally:
+            await connection.close()
+
+        zvirt_exporter.DWH_SAMPLE_WINDOW = 300
+        zvirt_exporter.DWH_POOL["pool"] = await asyncpg.create_pool(TEST_DSN, min_size=1, max_size=1,
+                                                                     server_settings={"search_path": SCHEMA})
+
+    async def asyncTearDown(self):
+        await zvirt_exporter.DWH_POOL["pool"].close()
+        zvirt_exporter.DWH_POOL["pool"] = None
+
+        connection = await zvirt_exporter.asyncpg.connect(TEST_DSN)
+        try:
+            await connection.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        finally:
+            await connection.close()
+
+    async def test_vms(self):
+        vms = {vm["name"]: vm for vm in (await zvirt_exporter.get_dwh_vms())["vm"]}
+
+        self.assertEqual(sorted(vms), ["vm1", "vm2"])
+
+        vm1 = vms["vm1"]
+        self.assertEqual(vm1["id"], "00000000-0000-0000-0000-0000000a0001")
+        self.assertEqual(vm1["status"], "up")
+        self.assertEqual(vm1["memory"], 4096 * 1024 * 1024)
+        self.assertEqual(vm1["display"]["address"], "10.0.0.1")
+        self.assertEqual(vm1["cluster"]["id"], "00000000-0000-0000-0000-00000000c001")
+        self.assertEqual(vm1["template"]["id"], "00000000-0000-0000-0000-00000000f001")
+        self.assertEqual(vm1["host"]["id"], "00000000-0000-0000-0000-00000000b001")
+        self.assertEqual(vm1["cpu"]["topology"], {"sockets": 2, "cores": 2, "threads": 1})
+        self.assertEqual(statistic(vm1, "cpu.current.total"), 50)
+        self.assertEqual(statistic(vm1, "memory.used"), 1024 * 1024 * 1024)
+
+        vm2 = vms["vm2"]
+        self.assertEqual(vm2["status"], "down")
+        self.assertEqual(vm2["display"]["address"], "unknown")
+        self.assertEqual(vm2["cluster"]["id"], "unknown")
+        self.assertEqual(vm2["template"]["id"], "unknown")
+        self.assertEqual(vm2["host"], {})
+        self.assertEqual(statistic(vm2, "cpu.current.total"), 0)
+
+    async def test_hosts(self):
+        hosts = {host["name"]: host for host in (await zvirt_exporter.get_dwh_hosts())["host"]}
+
+        self.assertEqual(sorted(hosts), ["host1", "host2"])
+
+        host1 = hosts["host1"]
+        self.assertEqual(host1["status"], "up")
+        self.assertEqual(host1["address"], "host1.example.com")
+        self.assertEqual(host1["cluster"]["id"], "00000000-0000-0000-0000-00000000c001")
+        self.assertEqual(host1["port"], 54321)
+        self.assertEqual(host1["cpu"]["topology"], {"sockets": 2, "cores": 8, "threads": 2})
+        self.assertEqual(statistic(host1, "memory.used"), 32768 * 1024 * 1024)
+        self.assertEqual(statistic(host1, "swap.used"), 1024 * 1024 * 1024)
+        self.assertEqual(statistic(host1, "cpu.current.idle"), 70)
+        self.assertEqual(statistic(host1, "cpu.load.avg.5m"), 4)
+
+        host2 = hosts["host2"]
+        self.assertEqual(host2["status"], "non_responsive")
+        self.assertEqual(host2["address"], "unknown")
+        self.assertEqual(host2["cluster"]["id"], "unknown")
+        self.assertEqual(host2["cpu"]["name"], "unknown")
+        self.assertEqual(host2["cpu"]["topology"], {"sockets": 0, "cores": 0, "threads": 0})
+
+    async def test_storagedomains(self):
+        storagedomains = {sd["name"]: sd for sd in (await zvirt_exporter.get_dwh_storagedomains())["storage_domain"]}
+
+        self.assertEqual(sorted(storagedomains), ["data1", "export1"])
+
+        data1 = storagedomains["data1"]
+        self.assertEqual(data1["available"], 150 * 1024 ** 3)
+        self.assertEqual(data1["used"], 150 * 1024 ** 3)
+        self.assertEqual(data1["master"], "true")
+        self.assertEqual(data1["type"], "data")
+        self.assertEqual(data1["storage"]["type"], "nfs")
+
+        export1 = storagedomains["export1"]
+        self.assertEqual(export1["available"], 0)
+        self.assertEqual(export1["master"], "false")
+        self.assertEqual(export1["type"], "export")
+        self.assertEqual(export1["storage"]["type"], "unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
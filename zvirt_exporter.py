@@ -1,13 +1,39 @@
 #!/usr/bin/python3
 
+import gc
+import re
+import sys
+import zlib
 import json
+import ctypes
+import ctypes.util
 import time
 import logging
 import asyncio
 import aiohttp
+import os
+import hmac
+import marshal
+import cProfile
+import tracemalloc
 from os import getenv
-from fastapi import FastAPI, Response
+from datetime import timedelta
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi import FastAPI, Request, Response
 from threading import Lock
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    malloc_trim = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6").malloc_trim
+except (OSError, AttributeError):
+    malloc_trim = None
 logger = logging.getLogger(__name__)
 log = logging.getLogger("zvirt_exporter")
 
@@ -21,9 +47,119 @@ DOMAIN = getenv("DOMAIN", "")
 TOKEN_CACHE = {"access_token": None}
 TOKEN_LOCK = Lock()
 METRICS_CACHE = {"data": None,
-                 "timestamp": 0}
+                 "fragments": {},
+                 "history": None,
+                 "timestamp": 0,
+                 "updated": {},
+                 "collected": {},
+                 "restored": set()}
 CACHE_TTL = 5
 CACHE_LOCK = Lock()
+REFRESH_STATE = {"task": None,
+                 "names": None}
+FRESH_MIN_INTERVAL = int(getenv("FRESH_MIN_INTERVAL", "30"))
+QUERY_INDEX = {}
+QUERY_MAX_LIMIT = int(getenv("QUERY_MAX_LIMIT", "1000"))
+QUERY_FILTERS = {"vms": ("cluster", "host", "tag", "storage_domain", "status"),
+                 "hosts": ("cluster", "tag", "status")}
+
+ROLLUPS_ENABLED = getenv("ROLLUPS_ENABLED", "true").lower() == "true"
+ROLLUP_TOP_N = int(getenv("ROLLUP_TOP_N", "5"))
+ROLLUP_DESCRIPTIONS = {"vms_count": "Number of VMs by VM status (number).",
+                       "vms_cpu_usage": "Sum of VM cpu.current.total (percent).",
+                       "vms_memory": "Sum of VM assigned memory (bytes).",
+                       "vms_memory_used": "Sum of VM memory.used (bytes).",
+                       "vms_disks_actual_size": "Actual allocated size of the attached VM disks, shared disks counted once (bytes).",
+                       "vms_nics_rx": "Sum of VM NIC data.current.rx (bytes_per_second).",
+                       "vms_nics_tx": "Sum of VM NIC data.current.tx (bytes_per_second).",
+                       "top_vms_cpu_usage": "Top VMs of the cluster by cpu.current.total (percent).",
+                       "top_vms_memory_used": "Top VMs of the cluster by memory.used (bytes)."}
+
+FAMILIES = {"vm_statistics", "guest_filesystems", "vm_nics", "vm_disks", "snapshots",
+            "host_statistics", "host_nics", "bonding_options",
+            "mac_pools", "qos", "quotas", "scheduling_policy_properties",
+            "luns", "storage_domain_data_centers", "disk_statistics"}
+DISABLED_FAMILIES = {family.strip() for family in getenv("DISABLED_FAMILIES", "").split(",") if family.strip()}
+DROP_LABELS = {label.strip() for label in getenv("DROP_LABELS", "").split(",") if label.strip()}
+METRICS_ALLOW = re.compile(getenv("METRICS_ALLOW")) if getenv("METRICS_ALLOW") else None
+METRICS_DENY = re.compile(getenv("METRICS_DENY")) if getenv("METRICS_DENY") else None
+SERIES_LIMIT = int(getenv("SERIES_LIMIT", "0"))
+METRIC_RULES_CACHE = {}
+HISTORY_ENABLED = getenv("HISTORY_ENABLED", "false").lower() == "true"
+HISTORY_SAMPLE_INTERVAL = int(getenv("HISTORY_SAMPLE_INTERVAL", "0"))
+SNAPSHOT_PATH = getenv("SNAPSHOT_PATH", "")
+SNAPSHOT_MAX_AGE = int(getenv("SNAPSHOT_MAX_AGE", "3600"))
+FRAGMENT_MAX_AGE = int(getenv("FRAGMENT_MAX_AGE", "600"))
+DISK_COLLECTOR = getenv("DISK_COLLECTOR", "false").lower() == "true"
+DISK_PAGE_SIZE = int(getenv("DISK_PAGE_SIZE", "500"))
+
+ENGINE_COMPRESSION = getenv("ENGINE_COMPRESSION", "gzip, deflate, br" if brotli else "gzip, deflate")
+ENGINE_CONNECTIONS_PER_HOST = int(getenv("ENGINE_CONNECTIONS_PER_HOST", "8"))
+ENGINE_KEEPALIVE_TIMEOUT = int(getenv("ENGINE_KEEPALIVE_TIMEOUT", "30"))
+ENGINE_CHUNK_SIZE = int(getenv("ENGINE_CHUNK_SIZE", "65536"))
+ENGINE_MAX_PAGES = int(getenv("ENGINE_MAX_PAGES", "1000"))
+ENGINE_SESSION = {"session": None}
+ENGINE_DECODERS = {"identity": lambda: None,
+                   "gzip": lambda: zlib.decompressobj(16 + zlib.MAX_WBITS).decompress,
+                   "x-gzip": lambda: zlib.decompressobj(16 + zlib.MAX_WBITS).decompress,
+                   "deflate": lambda: zlib.decompressobj().decompress}
+if brotli is not None:
+    ENGINE_DECODERS["br"] = lambda: brotli.Decompressor().process
+TRANSFERS = {"current": {}}
+
+MEMORY_BUDGET_MB = int(getenv("MEMORY_BUDGET_MB", "0"))
+MEMORY_DEGRADE_RATIO = float(getenv("MEMORY_DEGRADE_RATIO", "0.8"))
+MEMORY_DEGRADE_FAMILIES = {family.strip() for family in getenv("MEMORY_DEGRADE_FAMILIES", "snapshots,guest_filesystems,bonding_options,luns,scheduling_policy_properties").split(",") if family.strip()}
+MEMORY_PAGE_SIZE = int(getenv("MEMORY_PAGE_SIZE", "100"))
+MEMORY_MAX_SKIPPED = int(getenv("MEMORY_MAX_SKIPPED", "3"))
+MEMORY_RELEASE = getenv("MEMORY_RELEASE", "true").lower() == "true"
+MEMORY_STATE = {"level": 0,
+                "skipped": 0,
+                "skipped_total": 0,
+                "cycle": {}}
+
+COLLECTOR_BACKEND = getenv("COLLECTOR_BACKEND", "rest")
+DWH_DSN = getenv("DWH_DSN", "")
+DWH_POOL_SIZE = int(getenv("DWH_POOL_SIZE", "3"))
+DWH_SAMPLE_WINDOW = int(getenv("DWH_SAMPLE_WINDOW", "300"))
+DWH_POOL = {"pool": None}
+
+DEBUG_TOKEN = getenv("DEBUG_TOKEN", "")
+DEBUG_TRACEMALLOC_FRAMES = int(getenv("DEBUG_TRACEMALLOC_FRAMES", "1"))
+DEBUG_TRACEMALLOC_TOP = int(getenv("DEBUG_TRACEMALLOC_TOP", "50"))
+DEBUG_STATE = {"profile_cycles": 0,
+               "profiler": None,
+               "profile": None,
+               "tracemalloc_pending": False,
+               "tracemalloc": None}
+SPANS = {"current": {},
+         "busy": {},
+         "last": {}}
+BLOCKING_PHASES = {"pool", "fetch", "decode", "wait"}
+CURRENT_COLLECTOR = ContextVar("collector", default="gather")
+COLLECTORS = {}
+DISABLED_COLLECTORS = {name.strip() for name in getenv("DISABLED_COLLECTORS", "").split(",") if name.strip()}
+ENABLED_COLLECTORS = {name.strip() for name in getenv("ENABLED_COLLECTORS", "").split(",") if name.strip()}
+COLLECTOR_INTERVALS = {}
+ENGINE_CONCURRENCY = int(getenv("ENGINE_CONCURRENCY", "8"))
+ENGINE_POOL = asyncio.Semaphore(ENGINE_CONCURRENCY)
+
+for family in DISABLED_FAMILIES - FAMILIES:
+    log.warning(f"Unknown metric family in DISABLED_FAMILIES: {family}")
+
+for family in MEMORY_DEGRADE_FAMILIES - FAMILIES:
+    log.warning(f"Unknown metric family in MEMORY_DEGRADE_FAMILIES: {family}")
+
+for item in (item.strip() for item in getenv("COLLECTOR_INTERVALS", "").split(",") if item.strip()):
+    name, _, interval = item.partition("=")
+    if name.strip() and interval.strip().isdigit():
+        COLLECTOR_INTERVALS[name.strip()] = int(interval)
+    else:
+        log.warning(f"Invalid entry in COLLECTOR_INTERVALS: {item} (expected collector=seconds)")
+
+for encoding in {encoding.strip() for encoding in ENGINE_COMPRESSION.split(",")} - ENGINE_DECODERS.keys():
+    log.warning(f"Unsupported encoding in ENGINE_COMPRESSION: {encoding} (br requires `pip install brotli`)")
+ENGINE_COMPRESSION = ", ".join(encoding.strip() for encoding in ENGINE_COMPRESSION.split(",") if encoding.strip() in ENGINE_DECODERS) or "identity"
 
 user = f"{USERNAME}@{DOMAIN}"
 password = PASSWORD
@@ -33,7 +169,7 @@ app = FastAPI()
 
 async def get_token(session):
 
-    headers = {"Accept": "application/json"}
+    headers = {"Accept": "application/json", "Accept-Encoding": "identity"}
 
     with TOKEN_LOCK:
         access_token = TOKEN_CACHE["access_token"]
@@ -63,886 +199,2038 @@ async def get_token(session):
         return new_token
 
 
-async def get_vm_statistics(session, token):
-    url = f"{VIRT_SCHEME}://{VIRT_URL}/ovirt-engine/api/vms?follow=statistics,disk_attachments.disk.statistics,nics.statistics,snapshots.disks.statistics,tags"
-    async with session.get(url, headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
-                           ssl=False) as resp:
-        vm_statistics = await resp.json()
-
-        lines = []
-
-        for vm in vm_statistics["vm"]:
-            labels = {"object_type": "vm",
-                      "fqdn": vm.get("fqdn", "unknown"),
-                      "name": vm.get("name", "unknown"),
-                      "id": vm.get("id", "unknown"),
-                      "ip": vm.get("display", {}).get("address", "unknown"),
-                      "os_architecture": vm.get("guest_operating_system", {}).get("architecture", "unknown"),
-                      "codename": vm.get("guest_operating_system", {}).get("codename", "unknown"),
-                      "distribution": vm.get("guest_operating_system", {}).get("distribution", "unknown"),
-                      "family": vm.get("guest_operating_system", {}).get("family", "unknown"),
-                      "kernel_build": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("build", "unknown"),
-                      "kernel_full_version": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("full_version", "unknown"),
-                      "kernel_major": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("major", "unknown"),
-                      "kernel_minor": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("minor", "unknown"),
-                      "kernel_revision": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("revision", "unknown"),
-                      "distribution_full_version": vm.get("guest_operating_system", {}).get("version", {}).get("full_version", "unknown"),
-                      "distribution_major": vm.get("guest_operating_system", {}).get("version", {}).get("major", "unknown"),
-                      "distribution_minor": vm.get("guest_operating_system", {}).get("version", {}).get("minor", "unknown"),
-                      "distribution_revision": vm.get("guest_operating_system", {}).get("version", {}).get("revision", "unknown"),
-                      "time_zone": vm.get("time_zone", {}).get("name", "unknown"),
-                      "guest_time_zone_name": vm.get("guest_time_zone", {}).get("name", "unknown"),
-                      "guest_time_zone_utc_offset": vm.get("guest_time_zone", {}).get("utc_offset", "unknown"),
-                      "bios_type": vm.get('bios', {}).get("type", "unknown"),
-                      "cpu_architecture": vm.get('cpu', {}).get("architecture", "unknown"),
-                      "template_id": vm.get("template", {}).get("id", "unknown"),
-                      "cluster_id": vm.get("cluster", {}).get("id", "unknown"),
-                      "quota_id": vm.get("quota", {}).get("id", "unknown"),
-                      "cpu_profile_id": vm.get("cpu_profile", {}).get("id", "unknown")}
-
-            cmdb_tags = {"CMDB_AS_ID": "unknown", "CMDB_GAS_ID": "unknown", "CMDB_ENV": "unknown", "CMDB_CRIT": "unknown"}
-
-            for item in vm.get("tags", {}).get("tag", {}):
-                tag_data = item.get("name", "").split(".")
-                tag_data_len = len(tag_data)
-                if tag_data_len == 2:
-                    if tag_data[0] == "CMDB_AS_ID":
-                        cmdb_tags["CMDB_AS_ID"] = tag_data[1]
-                    elif tag_data[0] == "CMDB_GAS_ID":
-                        cmdb_tags["CMDB_GAS_ID"] = tag_data[1]
-                    elif tag_data[0] == "CMDB_ENV":
-                        cmdb_tags["CMDB_ENV"] = tag_data[1]
-                    elif tag_data[0] == "CMDB_CRIT":
-                        cmdb_tags["CMDB_CRIT"] = tag_data[1]
-                    else:
-                        cmdb_tags[tag_data[0]] = tag_data[1]
-                elif tag_data_len == 1:
-                    if len(tag_data[0]) > 0:
-                        cmdb_tags[tag_data[0]] = "unknown"
-
-            labels = {**labels, **cmdb_tags}
-
-            labels = ", ".join(f'{k}="{v}"' for k, v in labels.items())
-            lines.append("# HELP next_run_configuration_exists Are there any configuration changes made to the VM that are pending confirmation (bool).\n")
-            lines.append("# TYPE next_run_configuration_exists gauge\n")
-            lines.append(f"next_run_configuration_exists{{{labels}}} {1 if vm.get('next_run_configuration_exists', 'false') == 'true' else 0}\n")
-            lines.append("# HELP run_once Is VM Run Once (bool).\n")
-            lines.append("# TYPE run_once gauge\n")
-            lines.append(f"run_once{{{labels}}} {1 if vm.get('run_once', 'false') == 'true' else 0}\n")
-            lines.append("# HELP creation_time VM creation date (timestamp).\n")
-            lines.append("# TYPE creation_time gauge\n")
-            lines.append(f"creation_time{{{labels}}} {vm.get('creation_time', 0)}\n")
-            lines.append("# HELP start_time VM start date (timestamp).\n")
-            lines.append("# TYPE start_time gauge\n")
-            lines.append(f"start_time{{{labels}}} {vm.get('start_time', 0)}\n")
-            lines.append("# HELP stop_time VM stop date (timestamp).\n")
-            lines.append("# TYPE stop_time gauge\n")
-            lines.append(f"stop_time{{{labels}}} {vm.get('stop_time', 0)}\n")
-            lines.append("# HELP status VM status (bool).\n")
-            lines.append("# TYPE status gauge\n")
-            lines.append(f"status{{{labels}}} {1 if vm.get('status', 'down') == 'up' else 0}\n")
-            lines.append("# HELP boot_menu_enabled Is the VM boot menu enabled (bool).\n")
-            lines.append("# TYPE boot_menu_enabled gauge\n")
-            lines.append(f"boot_menu_enabled{{{labels}}} {1 if vm.get('bios', {}).get('boot_menu', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP cpu_mode Current CPU mode: 0/1/2/3 - custom/host_model/host_passthrough/unknown (number).\n")
-            lines.append("# TYPE cpu_mode gauge\n")
-            lines.append(f"cpu_mode{{{labels}}} { {'custom': 0, 'host_model': 1, 'host_passthrough': 2, 'unknown': 3}.get(vm.get('cpu', {}).get('mode', 'unknown'))}\n")
-            lines.append("# HELP cpu_topology_cores Number of VM CPU cores (number).\n")
-            lines.append("# TYPE cpu_topology_cores gauge\n")
-            lines.append(f"cpu_topology_cores{{{labels}}} {vm.get('cpu', {}).get('topology', {}).get('cores', 0)}\n")
-            lines.append("# HELP cpu_topology_sockets Number of VM CPU sockets (number).\n")
-            lines.append("# TYPE cpu_topology_sockets gauge\n")
-            lines.append(f"cpu_topology_sockets{{{labels}}} {vm.get('cpu', {}).get('topology', {}).get('sockets', 0)}\n")
-            lines.append("# HELP cpu_topology_threads Number of VM CPU threads (number).\n")
-            lines.append("# TYPE cpu_topology_threads gauge\n")
-            lines.append(f"cpu_topology_threads{{{labels}}} {vm.get('cpu', {}).get('topology', {}).get('threads', 0)}\n")
-            lines.append("# HELP placement_policy_affinity The configuration of the virtual machine’s placement policy: 0/1/2/3 - migratable/pinned/user_migratable/unknown (number).\n")
-            lines.append("# TYPE placement_policy_affinity gauge\n")
-            lines.append(f"placement_policy_affinity{{{labels}}} { {'migratable': 0, 'pinned': 1, 'user_migratable': 2, 'unknown': 3}.get(vm.get('placement_policy', {}).get('affinity', 'unknown'))}\n")
-            lines.append("# HELP storage_error_resume_behaviour Determines how the virtual machine will be resumed after storage error: 0/1/2/3 - auto_resume/kill/leave_paused/unknown (number).\n")
-            lines.append("# TYPE storage_error_resume_behaviour gauge\n")
-            lines.append(f"storage_error_resume_behaviour{{{labels}}} { {'auto_resume': 0, 'kill': 1, 'leave_paused': 2, 'unknown': 3}.get(vm.get('storage_error_resume_behaviour', 'unknown'))}\n")
-            lines.append("# HELP io_threads Number of I/O threads. VirtIO disks are pinned to an I/O thread using a round-robin algorithm (number).\n")
-            lines.append("# TYPE io_threads gauge\n")
-            lines.append(f"io_threads{{{labels}}} {vm.get('io', {}).get('threads', 0)}\n")
-            lines.append("# HELP memory Assigned memory during configuration (bytes).\n")
-            lines.append("# TYPE memory gauge\n")
-            lines.append(f"memory{{{labels}}} {vm.get('memory', 0)}\n")
-            lines.append("# HELP stateless VM is stateless (bool)?\n")
-            lines.append("# TYPE stateless gauge\n")
-            lines.append(f"stateless{{{labels}}} {1 if vm.get('stateless', 'false') == 'true' else 0}\n")
-            lines.append("# HELP usb_enabled VM USB is enabled (bool)?\n")
-            lines.append("# TYPE usb_enabled gauge\n")
-            lines.append(f"usb_enabled{{{labels}}} {1 if vm.get('usb', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP cpu_shares CPU shares weight (0 == auto) (number).\n")
-            lines.append("# TYPE cpu_shares gauge\n")
-            lines.append(f"cpu_shares{{{labels}}} {vm.get('cpu_shares', 0)}\n")
-            lines.append("# HELP delete_protected Is the VM protected from deletion (bool).\n")
-            lines.append("# TYPE delete_protected gauge\n")
-            lines.append(f"delete_protected{{{labels}}} {1 if vm.get('delete_protected', 'false') == 'true' else 0}\n")
-            lines.append("# HELP high_availability_enabled VM HA is enabled (bool).\n")
-            lines.append("# TYPE high_availability_enabled gauge\n")
-            lines.append(f"high_availability_enabled{{{labels}}} {1 if vm.get('high_availability', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP high_availability_priority VM HA priority (number).\n")
-            lines.append("# TYPE high_availability_priority gauge\n")
-            lines.append(f"high_availability_priority{{{labels}}} {vm.get('high_availability', {}).get('priority', 0)}\n")
-            lines.append("# HELP memory_policy_ballooning This parameter enables the memory balancing device for the virtual machine. For this device to work, memory overcommitment must be enabled in the cluster (bool).\n")
-            lines.append("# TYPE memory_policy_ballooning gauge\n")
-            lines.append(f"memory_policy_ballooning{{{labels}}} {1 if vm.get('memory_policy', {}).get('ballooning', 'false') == 'true' else 0}\n")
-            lines.append("# HELP memory_policy_guaranteed VM guaranteed memory (bytes).\n")
-            lines.append("# TYPE memory_policy_guaranteed gauge\n")
-            lines.append(f"memory_policy_guaranteed{{{labels}}} {vm.get('memory_policy', {}).get('guaranteed', 0)}\n")
-            lines.append("# HELP memory_policy_max VM max memory (bytes).\n")
-            lines.append("# TYPE memory_policy_max gauge\n")
-            lines.append(f"memory_policy_max{{{labels}}} {vm.get('memory_policy', {}).get('max', 0)}\n")
-            lines.append("# HELP migration_downtime Max allowed VM downtime during live migration (-1 == cluster default) (number).\n")
-            lines.append("# TYPE migration_downtime gauge\n")
-            lines.append(f"migration_downtime{{{labels}}} {vm.get('migration_downtime', 0)}\n")
-            lines.append("# HELP multi_queues_enabled This setting allows multiple queues. You can create up to four queues on each virtual network card, depending on the number of available vCPUs (bool).\n")
-            lines.append("# TYPE multi_queues_enabled gauge\n")
-            lines.append(f"multi_queues_enabled{{{labels}}} {1 if vm.get('multi_queues_enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP start_paused 1 if start paused VM enabled (bool).\n")
-            lines.append("# TYPE start_paused gauge\n")
-            lines.append(f"start_paused{{{labels}}} {1 if vm.get('start_paused', 'false') == 'true' else 0}\n")
-            lines.append("# HELP virtio_scsi_multi_queues_enabled 1 if multiqueue virtio-scsi enabled (bool).\n")
-            lines.append("# TYPE virtio_scsi_multi_queues_enabled gauge\n")
-            lines.append(f"virtio_scsi_multi_queues_enabled{{{labels}}} {1 if vm.get('virtio_scsi_multi_queues_enabled', 'false') == 'true' else 0}\n")
-
-            for item in vm.get("statistics", {}).get("statistic", {}):
-                if ".history" not in item.get("name", "unknown"):
-                    if item.get("type", "unknown") != "string":
-                        lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} {item.get('description', 'unknown')} ({item.get('unit', 'unknown')}).\n")
-                        lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} {item.get('kind', 'unknown')}\n")
-                        lines.append(f"{item.get('name', 'unknown').replace('.', '_')}{{{labels}}} {item.get('values', {}).get('value', {})[0].get('datum', 0)
-                        if len(item.get('values', {})) > 0
-                        else 0}\n")
-                    else:
-                        load_str_stats = json.loads(item.get("values", {}).get("value", {})[0].get("detail", 0)
-                                                    if len(item.get('values', {})) > 0
-                                                    else "[]")
-                        for str_stat in load_str_stats:
-                            labels_str_stats = f'{labels}, path="{str_stat["path"]}", fs="{str_stat["fs"]}"'
-                            lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} Disk total space ({str_stat["path"]}, {str_stat["fs"]}) ({item.get('unit', 'unknown')}).\n")
-                            lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} gauge\n")
-                            lines.append(f"fs_total{{{labels_str_stats}}} {str_stat['total']}\n")
-                            lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} Disk space used ({str_stat["path"]}, {str_stat["fs"]}) ({item.get('unit', 'unknown')}).\n")
-                            lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} gauge\n")
-                            lines.append(f"fs_used{{{labels_str_stats}}} {str_stat['used']}\n")
-                            lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} Disk space used ({str_stat["path"]}, {str_stat["fs"]}) (percent).\n")
-                            lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} gauge\n")
-                            lines.append(f"fs_percentage{{{labels_str_stats}}} {float((int(str_stat['used']) / int(str_stat['total'])) * 100):.2f}\n")
-
-            for item in vm.get("nics", {}).get("nic", {}):
-                labels_str_stats = (f'{labels}, interface="{item.get("interface", "unknown")}", '
-                                    f'nic_mac="{item.get("mac", {}).get("address", "unknown")}", '
-                                    f'nic_profile_id="{item.get("vnic_profile", {}).get("id", "unknown")}", '
-                                    f'nic_name="{item.get("name", "unknown")}", '
-                                    f'nic_id="{item.get("id", "unknown")}"')
-
-                lines.append(f"# HELP plugged 1 if the VM network interface is plugged (attached) to the VM, else 0 (bool).\n")
-                lines.append(f"# TYPE plugged gauge\n")
-                lines.append(f"plugged{{{labels_str_stats}}} {1 if item.get('plugged', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP synced 1 if the VM network interface configuration is fully synced with next-run settings, else 0 (bool).\n")
-                lines.append(f"# TYPE synced gauge\n")
-                lines.append(f"synced{{{labels_str_stats}}} {1 if item.get('synced', 'false') == 'true' else 0}\n")
-
-                for nic_item in item.get("statistics", {}).get("statistic", {}):
-                    lines.append(f"# HELP {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('description', 'unknown')} ({nic_item.get('unit', 'unknown')}).\n")
-                    lines.append(f"# TYPE {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('kind', 'unknown')}\n")
-                    lines.append(f"{nic_item.get('name', 'unknown').replace('.', '_')}{{{labels_str_stats}}} {nic_item.get('values', {}).get('value', {})[0].get('datum', 0)
-                    if len(nic_item.get('values', {})) > 0
-                    else 0}\n")
+async def get_engine_session():
+    if ENGINE_SESSION["session"] is None or ENGINE_SESSION["session"].closed:
+        connector = aiohttp.TCPConnector(limit_per_host=ENGINE_CONNECTIONS_PER_HOST, keepalive_timeout=ENGINE_KEEPALIVE_TIMEOUT)
+        ENGINE_SESSION["session"] = aiohttp.ClientSession(connector=connector, auto_decompress=False)
 
-            for item in vm.get("disk_attachments", {}).get("disk_attachment", {}):
-                labels_str_stats = (f'{labels}, logical_name="{item.get("logical_name", "unknown")}", '
-                                    f'alias="{item.get("disk", {}).get('alias', "unknown")}", '
-                                    f'disk_name="{item.get("disk", {}).get('name', "unknown")}", '
-                                    f'disk_id="{item.get("disk", {}).get('id', "unknown")}", '
-                                    f'image_id="{item.get("disk", {}).get('image_id', "unknown")}", '
-                                    f'disk_profile_id="{item.get("disk", {}).get('disk_profile', {}).get("id", "unknown")}", '
-                                    f'quota_id="{item.get("disk", {}).get('quota', {}).get("id", "unknown")}", '
-                                    f'storage_domain_id="{item.get("disk", {}).get('storage_domains', {}).get("storage_domain", {})[0].get("id", "unknown")}"')
-
-                lines.append(f"# HELP interface The type of interface driver used to connect the disk device to the virtual machine: 0/1/2/3/4/5 - ide/sata/spapr_vscsi/virtio/virtio_scsi/unknown (number).\n")
-                lines.append(f"# TYPE interface gauge\n")
-                lines.append(f"interface{{{labels_str_stats}}} { {'ide': 0, 'sata': 1, 'spapr_vscsi': 2, 'virtio': 3, 'virtio_scsi': 4, 'unknown': 5}.get(item.get('interface', 'unknown'))}\n")
-                lines.append(f"# HELP disk_backup The backup behavior supported by the disk: 0/1/2 - incremental/none/unknown (number).\n")
-                lines.append(f"# TYPE disk_backup gauge\n")
-                lines.append(f"disk_backup{{{labels_str_stats}}} { {'incremental': 0, 'none': 1, 'unknown': 2}.get(item.get('disk', {}).get('backup', 'unknown'))}\n")
-                lines.append(f"# HELP disk_content_type Indicates the actual content residing on the disk: 0/1/2/3/4/5/6/7/8/9/10 - backup_scratch/data/hosted_engine/hosted_engine_configuration/hosted_engine_metadata/hosted_engine_sanlock/iso/memory_dump_volume/memory_metadata_volume/ovf_store/unknown (number).\n")
-                lines.append(f"# TYPE disk_content_type gauge\n")
-                lines.append(f"disk_content_type{{{labels_str_stats}}} { {'backup_scratch': 0, 'data': 1, 'hosted_engine': 2,
-                                                                          'hosted_engine_configuration': 3, 'hosted_engine_metadata': 4, 'hosted_engine_sanlock': 5,
-                                                                          'iso': 6, 'memory_dump_volume': 7, 'memory_metadata_volume': 8,
-                                                                          'ovf_store': 9, 'unknown': 10}.get(item.get('disk', {}).get('content_type', 'unknown'))}\n")
-                lines.append(f"# HELP disk_format The underlying storage format: 0/1/2 - cow/raw/unknown (number).\n")
-                lines.append(f"# TYPE disk_format gauge\n")
-                lines.append(f"disk_format{{{labels_str_stats}}} { {'cow': 0, 'raw': 1, 'unknown': 2}.get(item.get('disk', {}).get('format', 'unknown'))}\n")
-                lines.append(f"# HELP disk_qcow_version The underlying QCOW version of a QCOW volume: 0/1/2 - qcow2_v2/qcow2_v3/unknown (number).\n")
-                lines.append(f"# TYPE disk_qcow_version gauge\n")
-                lines.append(f"disk_qcow_version{{{labels_str_stats}}} { {'qcow2_v2': 0, 'qcow2_v3': 1, 'unknown': 2}.get(item.get('disk', {}).get('qcow_version', 'unknown'))}\n")
-                lines.append(f"# HELP disk_storage_type Disk storage type: 0/1/2/3/4 - cinder/image/lun/managed_block_storage/unknown (number).\n")
-                lines.append(f"# TYPE disk_storage_type gauge\n")
-                lines.append(f"disk_storage_type{{{labels_str_stats}}} { {'cinder': 0, 'image': 1, 'lun': 2, 'managed_block_storage': 3,'unknown': 4}.get(item.get('disk', {}).get('storage_type', 'unknown'))}\n")
-                lines.append(f"# HELP active 1 if the disk is currently active (attached and in case), else 0 (bool).\n")
-                lines.append(f"# TYPE active gauge\n")
-                lines.append(f"active{{{labels_str_stats}}} {1 if item.get('active', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP bootable 1 if the disk is marked as bootable for the VM, else 0 (bool).\n")
-                lines.append(f"# TYPE bootable gauge\n")
-                lines.append(f"bootable{{{labels_str_stats}}} {1 if item.get('bootable', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP pass_discard 1 if discard/UNMAP/TRIM operations from the guest are passed to storage, else 0 (bool).\n")
-                lines.append(f"# TYPE pass_discard gauge\n")
-                lines.append(f"pass_discard{{{labels_str_stats}}} {1 if item.get('pass_discard', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP read_only 1 if the disk is attached as read-only, else 0 (bool).\n")
-                lines.append(f"# TYPE read_only gauge\n")
-                lines.append(f"read_only{{{labels_str_stats}}} {1 if item.get('read_only', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP uses_scsi_reservation 1 if SCSI reservations are enabled for this disk, else 0 (bool).\n")
-                lines.append(f"# TYPE uses_scsi_reservation gauge\n")
-                lines.append(f"uses_scsi_reservation{{{labels_str_stats}}} {1 if item.get('uses_scsi_reservation', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP actual_size Actual allocated size of the disk on storage (bytes).\n")
-                lines.append(f"# TYPE actual_size gauge\n")
-                lines.append(f"actual_size{{{labels_str_stats}}} {item.get("disk", {}).get('actual_size', 0)}\n")
-                lines.append(f"# HELP propagate_errors 1 if disk I/O errors propagate to the guest (fatal), else 0 (bool).\n")
-                lines.append(f"# TYPE propagate_errors gauge\n")
-                lines.append(f"propagate_errors{{{labels_str_stats}}} {1 if item.get("disk", {}).get('propagate_errors', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP provisioned_size Provisioned (virtual) size of the disk (bytes).\n")
-                lines.append(f"# TYPE provisioned_size gauge\n")
-                lines.append(f"provisioned_size{{{labels_str_stats}}} {item.get("disk", {}).get('provisioned_size', 0)}\n")
-                lines.append(f"# HELP shareable 1 if the disk is marked as shareable between VMs, else 0 (bool).\n")
-                lines.append(f"# TYPE shareable gauge\n")
-                lines.append(f"shareable{{{labels_str_stats}}} {1 if item.get("disk", {}).get('shareable', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP sparse 1 if the disk is thin-provisioned (sparse), else 0 (bool).\n")
-                lines.append(f"# TYPE sparse gauge\n")
-                lines.append(f"sparse{{{labels_str_stats}}} {1 if item.get("disk", {}).get('sparse', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP status 1 if the disk status is ok, else 0 (bool).\n")
-                lines.append(f"# TYPE status gauge\n")
-                lines.append(f"status{{{labels_str_stats}}} {1 if item.get("disk", {}).get('status', 'fail') == 'ok' else 0}\n")
-                lines.append(f"# HELP total_size Total space consumed by the disk on storage (bytes).\n")
-                lines.append(f"# TYPE total_size gauge\n")
-                lines.append(f"total_size{{{labels_str_stats}}} {item.get("disk", {}).get('total_size', 0)}\n")
-                lines.append(f"# HELP wipe_after_delete 1 if secure wipe after delete is enabled, else 0 (bool).\n")
-                lines.append(f"# TYPE wipe_after_delete gauge\n")
-                lines.append(f"wipe_after_delete{{{labels_str_stats}}} {1 if item.get("disk", {}).get('wipe_after_delete', 'false') == 'true' else 0}\n")
-
-                for disk_item in item.get("statistics", {}).get("statistic", {}):
-                    lines.append(f"# HELP {disk_item.get('name', 'unknown').replace('.', '_')} {disk_item.get('description', 'unknown')} ({disk_item.get('unit', 'unknown')}).\n")
-                    lines.append(f"# TYPE {disk_item.get('name', 'unknown').replace('.', '_')} {disk_item.get('kind', 'unknown')}\n")
-                    lines.append(f"{disk_item.get('name', 'unknown').replace('.', '_')}{{{labels_str_stats}}} {disk_item.get('values', {}).get('value', {})[0].get('datum', 0)
-                    if len(disk_item.get('values', {})) > 0
-                    else 0}\n")
+    return ENGINE_SESSION["session"]
 
-            for item in vm.get("snapshots", {}).get("snapshot", {}):
-                if len(item.get("disks", {}).get("disk", {})) > 0:
-                    for snap_item in item.get("disks", {}).get("disk", {}):
-                        labels_str_stats = (f'{labels}, snapshot_id="{snap_item.get("snapshot", {}).get("id", "unknown")}", '
-                                            f'alias="{snap_item.get('alias', "unknown")}", '
-                                            f'backup="{snap_item.get('backup', "unknown")}", '
-                                            f'content_type="{snap_item.get('content_type', "unknown")}", '
-                                            f'format="{snap_item.get('format', "unknown")}", '
-                                            f'image_id="{snap_item.get('image_id', "unknown")}", '
-                                            f'storage_type="{snap_item.get('storage_type', "unknown")}", '
-                                            f'disk_profile_id="{snap_item.get("disk", {}).get('disk_profile', {}).get("id", "unknown")}", '
-                                            f'quota_id="{snap_item.get("disk", {}).get('quota', {}).get("id", "unknown")}", '
-                                            f'storage_domain_id="{snap_item.get('storage_domains', {}).get("storage_domain", {})[0].get("id", "unknown")}"')
-
-                        lines.append(f"date{{{labels_str_stats}}} {item.get('date')}\n")
-                        lines.append(f"persist_memorystate{{{labels_str_stats}}} {1 if item.get('persist_memorystate', 'false') == 'true' else 0}\n")
-                        lines.append(f"snapshot_status{{{labels_str_stats}}} {1 if item.get('snapshot_status', 'fail') == 'ok' else 0}\n")
-                        lines.append(f"snapshot_type{{{labels_str_stats}}} {1 if item.get('snapshot_type', 'inactive') == 'active' else 0}\n")
-                        lines.append(f"actual_size{{{labels_str_stats}}} {snap_item.get('actual_size', 0)}\n")
-                        lines.append(f"propagate_errors{{{labels_str_stats}}} {1 if snap_item.get('propagate_errors', 'false') == 'true' else 0}\n")
-                        lines.append(f"provisioned_size{{{labels_str_stats}}} {snap_item.get('provisioned_size', 0)}\n")
-                        lines.append(f"shareable{{{labels_str_stats}}} {1 if snap_item.get('shareable', 'false') == 'true' else 0}\n")
-                        lines.append(f"sparse{{{labels_str_stats}}} {1 if snap_item.get('sparse', 'false') == 'true' else 0}\n")
-                        lines.append(f"status{{{labels_str_stats}}} {1 if snap_item.get('status', 'fail') == 'ok' else 0}\n")
-                        lines.append(f"total_size{{{labels_str_stats}}} {snap_item.get('total_size', 0)}\n")
-                        lines.append(f"wipe_after_delete{{{labels_str_stats}}} {1 if snap_item.get('wipe_after_delete', 'false') == 'true' else 0}\n")
 
-        return lines
+async def close_engine_session():
+    session = ENGINE_SESSION["session"]
+    ENGINE_SESSION["session"] = None
+    if session is not None:
+        await session.close()
 
 
-async def get_hosts_statistics(session, token):
-    url = f"{VIRT_SCHEME}://{VIRT_URL}/ovirt-engine/api/hosts?follow=statistics,nics.statistics,tags"
-    async with session.get(url, headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
-                           ssl=False) as resp:
-        hosts_statistics = await resp.json()
-
-        lines = []
-
-        for host in hosts_statistics["host"]:
-            labels = {"object_type": "host",
-                      "address": host.get("address", "unknown"),
-                      "name": host.get("name", "unknown"),
-                      "id": host.get("id", "unknown"),
-                      "certificate_organization": host.get("certificate", {}).get("organization", "unknown"),
-                      "certificate_subject": host.get("certificate", {}).get("subject", "unknown"),
-                      "cpu_name": host.get("cpu", {}).get("name", "unknown"),
-                      "cpu_type": host.get("cpu", {}).get("type", "unknown"),
-                      "hardware_information_family": host.get("hardware_information", {}).get("family", "unknown"),
-                      "hardware_information_manufacturer": host.get("hardware_information", {}).get("manufacturer", "unknown"),
-                      "hardware_information_product_name": host.get("hardware_information", {}).get("product_name", "unknown"),
-                      "hardware_information_serial_number": host.get("hardware_information", {}).get("serial_number", "unknown"),
-                      "hardware_information_uuid": host.get("hardware_information", {}).get("uuid", "unknown"),
-                      "hardware_information_version": host.get("hardware_information", {}).get("version", "unknown"),
-                      "iscsi_initiator": host.get("iscsi", {}).get("initiator", "unknown"),
-                      "libvirt_version_build": host.get("libvirt_version", {}).get("build", "unknown"),
-                      "libvirt_version_full_version": host.get("libvirt_version", {}).get("full_version", "unknown"),
-                      "libvirt_version_major": host.get("libvirt_version", {}).get("major", "unknown"),
-                      "libvirt_version_minor": host.get("libvirt_version", {}).get("minor", "unknown"),
-                      "libvirt_version_revision": host.get("libvirt_version", {}).get("revision", "unknown"),
-                      "os_type": host.get("os", {}).get("type", "unknown"),
-                      "os_version_full_version": host.get("os", {}).get("version", {}).get("full_version", "unknown"),
-                      "os_version_major": host.get("os", {}).get("version", {}).get("major", "unknown"),
-                      "os_version_minor": host.get("os", {}).get("version", {}).get("minor", "unknown"),
-                      "version_build": host.get("version", {}).get('build', 'unknown'),
-                      "version_full_version": host.get("version", {}).get('full_version', 'unknown'),
-                      "version_major": host.get("version", {}).get('major', 'unknown'),
-                      "version_minor": host.get("version", {}).get('minor', 'unknown'),
-                      "version_revision": host.get("version", {}).get('revision', 'unknown'),
-                      "vgpu_placement": host.get('vgpu_placement', 'unknown'),
-                      "cluster_id": host.get('cluster', {}).get('id', 'unknown')}
-
-            labels = ", ".join(f'{k}="{v}"' for k, v in labels.items())
-            lines.append("# HELP auto_numa_status The host auto non uniform memory access (NUMA) status: 0/1/2 - disable/enable/unknown (number).\n")
-            lines.append("# TYPE auto_numa_status gauge\n")
-            lines.append(f"auto_numa_status{{{labels}}} { {'disable': 0, 'enable': 1, 'unknown': 2}.get(host.get('auto_numa_status', 'unknown'))}\n")
-            lines.append("# HELP cpu_speed Current CPU speed (MHz).\n")
-            lines.append("# TYPE cpu_speed gauge\n")
-            lines.append(f"cpu_speed{{{labels}}} {host.get('cpu', {}).get('speed', 0)}\n")
-            lines.append("# HELP cpu_topology_cores Number of VM CPU cores (number).\n")
-            lines.append("# TYPE cpu_topology_cores gauge\n")
-            lines.append(f"cpu_topology_cores{{{labels}}} {host.get('cpu', {}).get('topology', {}).get('cores', 0)}\n")
-            lines.append("# HELP cpu_topology_sockets Number of VM CPU sockets (number).\n")
-            lines.append("# TYPE cpu_topology_sockets gauge\n")
-            lines.append(f"cpu_topology_sockets{{{labels}}} {host.get('cpu', {}).get('topology', {}).get('sockets', 0)}\n")
-            lines.append("# HELP cpu_topology_threads Number of VM CPU threads (number).\n")
-            lines.append("# TYPE cpu_topology_threads gauge\n")
-            lines.append(f"cpu_topology_threads{{{labels}}} {host.get('cpu', {}).get('topology', {}).get('threads', 0)}\n")
-            lines.append("# HELP device_passthrough_enabled Specifies whether host device passthrough is enabled on this host (bool).\n")
-            lines.append("# TYPE device_passthrough_enabled gauge\n")
-            lines.append(f"device_passthrough_enabled{{{labels}}} {1 if host.get('device_passthrough', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP external_status The host external status: 0/1/2/3/4/5 - error/failure/info/ok/warning/unknown (number).\n")
-            lines.append("# TYPE external_status gauge\n")
-            lines.append(f"external_status{{{labels}}} { {'error': 0, 'failure': 1, 'info': 2, 'ok': 3, 'warning': 4, 'unknown': 5}.get(host.get('external_status', 'unknown'))}\n")
-            lines.append("# HELP hardware_information_supported_rng_source_hwrng Obtains random data from the /dev/hwrng (usually specialized HW generator) device (bool).\n")
-            lines.append("# TYPE hardware_information_supported_rng_source_hwrng gauge\n")
-            lines.append(f"hardware_information_supported_rng_source_hwrng{{{labels}}} {1 if "hwrng" in host.get('hardware_information', {}).get('supported_rng_sources', {}).get('supported_rng_source', {}) else 0}\n")
-            lines.append("# HELP hardware_information_supported_rng_source_random Obtains random data from the /dev/random device (bool).\n")
-            lines.append("# TYPE hardware_information_supported_rng_source_random gauge\n")
-            lines.append(f"hardware_information_supported_rng_source_random{{{labels}}} {1 if "random" in host.get('hardware_information', {}).get('supported_rng_sources', {}).get('supported_rng_source', {}) else 0}\n")
-            lines.append("# HELP hardware_information_supported_rng_source_urandom Obtains random data from the /dev/urandom device (bool).\n")
-            lines.append("# TYPE hardware_information_supported_rng_source_urandom gauge\n")
-            lines.append(f"hardware_information_supported_rng_source_urandom{{{labels}}} {1 if "urandom" in host.get('hardware_information', {}).get('supported_rng_sources', {}).get('supported_rng_source', {}) else 0}\n")
-            lines.append("# HELP kdump_status The host KDUMP status. KDUMP happens when the host kernel has crashed and it is now going through memory dumping: 0/1/2 - disable/enable/unknown (number).\n")
-            lines.append("# TYPE kdump_status gauge\n")
-            lines.append(f"kdump_status{{{labels}}} { {'disabled': 0, 'enabled': 1, 'unknown': 2}.get(host.get('kdump_status', 'unknown'))}\n")
-            lines.append("# HELP ksm_enabled Kernel SamePage Merging (KSM) reduces references to memory pages from multiple identical pages to a single page reference (bool).\n")
-            lines.append("# TYPE ksm_enabled gauge\n")
-            lines.append(f"ksm_enabled{{{labels}}} {1 if host.get('ksm', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP max_scheduling_memory The max scheduling memory on this host (bytes).\n")
-            lines.append("# TYPE max_scheduling_memory gauge\n")
-            lines.append(f"max_scheduling_memory{{{labels}}} {host.get('max_scheduling_memory', 0)}\n")
-            lines.append("# HELP memory The amount of physical memory on this host (bytes).\n")
-            lines.append("# TYPE memory gauge\n")
-            lines.append(f"memory{{{labels}}} {host.get('max_scheduling_memory', 0)}\n")
-            lines.append("# HELP numa_supported Specifies whether non uniform memory access (NUMA) is supported on this host (bool).\n")
-            lines.append("# TYPE numa_supported gauge\n")
-            lines.append(f"numa_supported{{{labels}}} {1 if host.get('numa_supported', 'false') == 'true' else 0}\n")
-            lines.append("# HELP port The host port (number).\n")
-            lines.append("# TYPE port gauge\n")
-            lines.append(f"port{{{labels}}} {host.get('port', 0)}\n")
-            lines.append("# HELP power_management_automatic_pm_enabled Toggles the automated power control of the host in order to save energy (bool).\n")
-            lines.append("# TYPE power_management_automatic_pm_enabled gauge\n")
-            lines.append(f"power_management_automatic_pm_enabled{{{labels}}} {1 if host.get('power_management', {}).get('automatic_pm_enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP power_management_enabled Indicates whether power management configuration is enabled or disabled (bool).\n")
-            lines.append("# TYPE power_management_enabled gauge\n")
-            lines.append(f"power_management_enabled{{{labels}}} {1 if host.get('power_management', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP power_management_kdump_detection Toggles whether to determine if kdump is running on the host before it is shut down (bool).\n")
-            lines.append("# TYPE power_management_kdump_detection gauge\n")
-            lines.append(f"power_management_kdump_detection{{{labels}}} {1 if host.get('power_management', {}).get('kdump_detection', 'false') == 'true' else 0}\n")
-            lines.append("# HELP power_management_pm_proxies_cluster The fence proxy is selected from the same cluster as the fenced host (bool).\n")
-            lines.append("# TYPE power_management_pm_proxies_cluster gauge\n")
-            lines.append(f"power_management_pm_proxies_cluster{{{labels}}} {1 if 'cluster' in host.get('power_management', {}).get('pm_proxies', {}) else 0}\n")
-            lines.append("# HELP power_management_pm_proxies_dc The fence proxy is selected from the same data center as the fenced host (bool).\n")
-            lines.append("# TYPE power_management_pm_proxies_dc gauge\n")
-            lines.append(f"power_management_pm_proxies_dc{{{labels}}} {1 if 'dc' in host.get('power_management', {}).get('pm_proxies', {}) else 0}\n")
-            lines.append("# HELP power_management_pm_proxies_other_dc The fence proxy is selected from a different data center than the fenced host (bool).\n")
-            lines.append("# TYPE power_management_pm_proxies_other_dc gauge\n")
-            lines.append(f"power_management_pm_proxies_other_dc{{{labels}}} {1 if 'other_dc' in host.get('power_management', {}).get('pm_proxies', {}) else 0}\n")
-            lines.append("# HELP protocol The protocol that the engine uses to communicate with the host: 0/1/2 - stomp/xml/unknown (number).\n")
-            lines.append("# TYPE protocol gauge\n")
-            lines.append(f"protocol{{{labels}}} { {'stomp': 0, 'xml': 1, 'unknown': 2}.get(host.get('protocol', 'unknown'))}\n")
-            lines.append("# HELP reinstallation_required Specifies whether the host should be reinstalled (bool).\n")
-            lines.append("# TYPE reinstallation_required gauge\n")
-            lines.append(f"reinstallation_required{{{labels}}} {1 if host.get('reinstallation_required', 'false') == 'true' else 0}\n")
-            lines.append("# HELP se_linux_mode The host SElinux status: 0/1/2/3 - disabled/enforcing/permissive/unknown (number).\n")
-            lines.append("# TYPE se_linux_mode gauge\n")
-            lines.append(f"se_linux_mode{{{labels}}} { {'disabled': 0, 'enforcing': 1, 'permissive': 2, 'unknown': 3}.get(host.get('se_linux', {}).get('mode', 'unknown'))}\n")
-            lines.append("# HELP spm_priority The host storage pool manager (SPM) priority (number).\n")
-            lines.append("# TYPE spm_priority gauge\n")
-            lines.append(f"spm_priority{{{labels}}} {host.get('spm', {}).get('priority', 0)}\n")
-            lines.append("# HELP spm_status The host storage pool manager (SPM) status: 0/1/2/3 - contending/none/spm/unknown (number).\n")
-            lines.append("# TYPE spm_status gauge\n")
-            lines.append(f"spm_status{{{labels}}} { {'contending': 0, 'none': 1, 'spm': 2, 'unknown': 3}.get(host.get('spm', {}).get('status', 'unknown'))}\n")
-            lines.append("# HELP ssh_port The host SSH port (number).\n")
-            lines.append("# TYPE ssh_port gauge\n")
-            lines.append(f"ssh_port{{{labels}}} {host.get('ssh', {}).get('port', 0)}\n")
-            lines.append("# HELP status The host status: 0/1/2/3/4/5/6/7/8/9/10/11/12/13/14/15 - connecting/down/error/initializing/install_failed/installing/installing_os/kdumping/maintenance/non_operational/non_responsive/pending_approval/preparing_for_maintenance/reboot/unassigned/up (number).\n")
-            lines.append("# TYPE status gauge\n")
-            lines.append(f"status{{{labels}}} { {'connecting': 0, 'down': 1, 'error': 2, 'initializing': 3, 'install_failed': 4,
-                                                 'installing': 5, 'installing_os': 6, 'kdumping': 7, 'maintenance': 8,
-                                                 'non_operational': 9, 'non_responsive': 10, 'pending_approval': 11, 'preparing_for_maintenance': 12,
-                                                 'reboot': 13, 'unassigned': 14, 'up': 15}.get(host.get('status', 'unknown'))}\n")
-            lines.append("# HELP summary_active The number of virtual machines active on the host (number).\n")
-            lines.append("# TYPE summary_active gauge\n")
-            lines.append(f"summary_active{{{labels}}} {host.get('summary', {}).get('active', 0)}\n")
-            lines.append("# HELP summary_migrating The number of virtual machines migrating to or from the host (number).\n")
-            lines.append("# TYPE summary_migrating gauge\n")
-            lines.append(f"summary_migrating{{{labels}}} {host.get('summary', {}).get('migrating', 0)}\n")
-            lines.append("# HELP summary_total The number of virtual machines present on the host (number).\n")
-            lines.append("# TYPE summary_total gauge\n")
-            lines.append(f"summary_total{{{labels}}} {host.get('summary', {}).get('total', 0)}\n")
-            lines.append("# HELP transparent_hugepages_enabled Transparent huge page support expands the size of memory pages beyond the standard 4 KiB limit (bool).\n")
-            lines.append("# TYPE transparent_hugepages_enabled gauge\n")
-            lines.append(f"transparent_hugepages_enabled{{{labels}}} {1 if host.get('transparent_hugepages', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP type Indicates if the host contains a full installation of the operating system or a scaled-down version intended only to host virtual machines: 0/1/2/3 - ovirt_node/rhel/rhev_h/unknown (number).\n")
-            lines.append("# TYPE type gauge\n")
-            lines.append(f"type{{{labels}}} { {'ovirt_node': 0, 'rhel': 1, 'rhev_h': 2, 'unknown': 3}.get(host.get('type', 'unknown'))}\n")
-            lines.append("# HELP update_available Specifies whether there is an oVirt-related update on this host (bool).\n")
-            lines.append("# TYPE update_available gauge\n")
-            lines.append(f"update_available{{{labels}}} {1 if host.get('update_available', 'false') == 'true' else 0}\n")
-
-            for item in host.get("nics", {}).get("host_nic", {}):
-                labels_str_stats = (f'{labels}, bonding_ad_partner_mac_address="{item.get("bonding", {}).get("ad_partner_mac", {}).get('address', "unknown")}", '
-                                    f'nic_mac="{item.get("mac", {}).get("address", "unknown")}", '
-                                    f'nic_profile="{item.get("vnic_profile", {}).get("id", "unknown")}", '
-                                    f'nic_name="{item.get("name", "unknown")}", '
-                                    f'base_interface="{item.get("base_interface", "unknown")}", '
-                                    f'nic_id="{item.get("id", "unknown")}", '
-                                    f'mac_address="{item.get("mac", {}).get("address", "unknown")}", '
-                                    f'ip_address="{item.get("ip", {}).get("address", "unknown")}", '
-                                    f'ip_gateway="{item.get("ip", {}).get("gateway", "unknown")}", '
-                                    f'ip_netmask="{item.get("ip", {}).get("netmask", "unknown")}", '
-                                    f'ip_version="{item.get("ip", {}).get("version", "unknown")}", '
-                                    f'ipv6_address="{item.get("ipv6", {}).get("address", "unknown")}", '
-                                    f'ipv6_gateway="{item.get("ipv6", {}).get("gateway", "unknown")}", '
-                                    f'ipv6_netmask="{item.get("ipv6", {}).get("netmask", "unknown")}", '
-                                    f'ipv6_version="{item.get("ipv6", {}).get("version", "unknown")}", '
-                                    f'vlan_id="{item.get("vlan", {}).get("id", 0)}"')
-
-                lines.append(f"# HELP boot_protocol The IPv4 boot protocol configuration of the NIC: 0/1/2/3/4/5 - autoconf/dhcp/none/poly_dhcp_autoconf/static/unknown (number).\n")
-                lines.append(f"# TYPE boot_protocol gauge\n")
-                lines.append(f"boot_protocol{{{labels_str_stats}}} { {'autoconf': 0, 'dhcp': 1, 'none': 2, 'poly_dhcp_autoconf': 3, 'static': 4, 'unknown': 5}.get(item.get('boot_protocol', "unknown"))}\n")
-                lines.append(f"# HELP ipv6_boot_protocol The IPv6 boot protocol configuration of the NIC: 0/1/2/3/4/5 - autoconf/dhcp/none/poly_dhcp_autoconf/static/unknown (number).\n")
-                lines.append(f"# TYPE ipv6_boot_protocol gauge\n")
-                lines.append(f"ipv6_boot_protocol{{{labels_str_stats}}} { {'autoconf': 0, 'dhcp': 1, 'none': 2, 'poly_dhcp_autoconf': 3, 'static': 4, 'unknown': 5}.get(item.get('ipv6_boot_protocol', "unknown"))}\n")
-                lines.append(f"# HELP ad_aggregator_id The ad_aggregator_id property of a bond or bond slave, for bonds in mode 4 (number).\n")
-                lines.append(f"# TYPE ad_aggregator_id gauge\n")
-                lines.append(f"ad_aggregator_id{{{labels_str_stats}}} {item.get('ad_aggregator_id', 0)}\n")
-                lines.append(f"# HELP bridged Defines the bridged network status (bool).\n")
-                lines.append(f"# TYPE bridged gauge\n")
-                lines.append(f"bridged{{{labels_str_stats}}} {1 if item.get('bridged', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP custom_configuration Indicates whether the host network interface has non-default custom configuration parameters (bool).\n")
-                lines.append(f"# TYPE custom_configuration gauge\n")
-                lines.append(f"custom_configuration{{{labels_str_stats}}} {1 if item.get('custom_configuration', 'false') == 'true' else 0}\n")
-                lines.append(f"# HELP mtu The maximum transmission unit for the interface (number).\n")
-                lines.append(f"# TYPE mtu gauge\n")
-                lines.append(f"mtu{{{labels_str_stats}}} {item.get('mtu', 0)}\n")
-                lines.append(f"# HELP speed Current negotiated link speed of the host network interface in bits per seconds (bits_per_second).\n")
-                lines.append(f"# TYPE speed gauge\n")
-                lines.append(f"speed{{{labels_str_stats}}} {item.get('speed', 0)}\n")
-                lines.append(f"# HELP ad_aggregator_id The ad_aggregator_id property of a bond or bond slave, for bonds in mode 4 (number).\n")
-                lines.append(f"# TYPE ad_aggregator_id gauge\n")
-                lines.append(f"ad_aggregator_id{{{labels_str_stats}}} {item.get('ad_aggregator_id', 0)}\n")
-                lines.append(f"# HELP status Defines the bridged network status (bool).\n")
-                lines.append(f"# TYPE status gauge\n")
-                lines.append(f"status{{{labels_str_stats}}} {1 if item.get('status', 'down') == 'up' else 0}\n")
-                lines.append(f"# HELP check_connectivity Indicates whether connectivity check is enabled for the host network interface (bool).\n")
-                lines.append(f"# TYPE check_connectivity gauge\n")
-                lines.append(f"check_connectivity{{{labels_str_stats}}} {1 if item.get('check_connectivity', 'false') == 'true' else 0}\n")
-
-                for nic_item in item.get("bonding", {}).get("options", {}).get("option", {}):
-                    lines.append(f"# HELP {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('type', 'No description')} (number).\n")
-                    lines.append(f"# TYPE {nic_item.get('name', 'unknown').replace('.', '_')} gauge\n")
-                    lines.append(f"{nic_item.get('name', 'unknown').replace('.', '_')}{{{labels_str_stats}}} {nic_item.get('value', 0)}\n")
-
-                for nic_item in item.get("statistics", {}).get("statistic", {}):
-                    lines.append(f"# HELP {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('description', 'unknown')} ({nic_item.get('unit', 'unknown')}).\n")
-                    lines.append(f"# TYPE {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('kind', 'unknown')}\n")
-                    lines.append(f"{nic_item.get('name', 'unknown').replace('.', '_')}{{{labels_str_stats}}} {nic_item.get('values', {}).get('value', {})[0].get('datum', 0)
-                    if len(nic_item.get('values', {})) > 0
-                    else 0}\n")
+async def read_body(resp):
+    encoding = resp.headers.get("Content-Encoding", "identity").lower()
+    if encoding not in ENGINE_DECODERS:
+        raise ValueError(f"Unsupported Content-Encoding from engine: {encoding}")
 
-            for item in host.get("statistics", {}).get("statistic", {}):
-                lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} {item.get('description', 'unknown')} ({item.get('unit', 'unknown')}).\n")
-                lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} {item.get('kind', 'unknown')}\n")
-                lines.append(f"{item.get('name', 'unknown').replace('.', '_')}{{{labels}}} {item.get('values', {}).get('value', {})[0].get('datum', 0)
-                    if len(item.get('values', {})) > 0
-                    else 0}\n")
+    decompress = ENGINE_DECODERS[encoding]()
+    chunks = []
+    wire_bytes = 0
 
-        return lines
+    async for chunk in resp.content.iter_chunked(ENGINE_CHUNK_SIZE):
+        wire_bytes += len(chunk)
+        chunks.append(chunk if decompress is None else decompress(chunk))
 
+    body = b"".join(chunks)
 
-async def get_datacenters_statistics(session, token):
-    url = f"{VIRT_SCHEME}://{VIRT_URL}/ovirt-engine/api/datacenters?follow=mac_pool,qoss,quotas,quotas.quotastoragelimits,quotas.quotaclusterlimits"
-    async with session.get(url, headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
-                           ssl=False) as resp:
-        datacenters_statistics = await resp.json()
-
-        lines = []
-
-        for datacenter in datacenters_statistics["data_center"]:
-            labels = {"object_type": "data_center",
-                      "storage_format": datacenter.get("storage_format", "unknown"),
-                      "supported_versions_major": datacenter.get("supported_versions", {}).get("version", {})[0].get("major", "unknown"),
-                      "supported_versions_minor": datacenter.get("supported_versions", {}).get("version", {})[0].get("minor", "unknown"),
-                      "version_major": datacenter.get("version", {}).get("major", "unknown"),
-                      "version_minor": datacenter.get("version", {}).get("minor", "unknown"),
-                      "name": datacenter.get("name", "unknown"),
-                      "id": datacenter.get("id", "unknown")}
-
-            labels = ", ".join(f'{k}="{v}"' for k, v in labels.items())
-            lines.append("# HELP local Indicates whether the data center uses local storage (1) or shared storage (0) (bool).\n")
-            lines.append("# TYPE local gauge\n")
-            lines.append(f"local{{{labels}}} {1 if datacenter.get('local', 'false') == 'true' else 0}\n")
-            lines.append("# HELP quota_mode Indicates whether quota enforcement is enabled for this datacenter (bool).\n")
-            lines.append("# TYPE quota_mode gauge\n")
-            lines.append(f"quota_mode{{{labels}}} { {'audit': 0, 'disabled': 1, 'enabled': 2, 'unknown': 3}.get(datacenter.get('quota_mode', 'unknown'))}\n")
-            lines.append("# HELP status Datacenter status: 0/1/2/3/4/5/6 - contend/maintenance/not_operational/problematic/uninitialized/up/unknown  (number).\n")
-            lines.append("# TYPE status gauge\n")
-            lines.append(f"status{{{labels}}} { {'contend': 0, 'maintenance': 1, 'not_operational': 2, 'problematic': 3, 'uninitialized': 4, 'up': 5, 'unknown': 6}.get(datacenter.get('status', 'unknown'))}\n")
-
-            for item in datacenter.get("mac_pool", {}).get("ranges", {}).get("range", {}):
-                labels_str_stats = (f'{labels}, mac_pool_name="{item.get("mac_pool", {}).get("name", "unknown")}", '
-                                    f'mac_pool_description="{item.get("mac_pool", {}).get("description", "unknown")}", '
-                                    f'mac_pool_id="{item.get("mac_pool", {}).get("id", "unknown")}", '
-                                    f'mac_pool_range_from="{item.get("mac_pool", {}).get("ranges", {}).get("range", {}).get("from", "unknown")}", '
-                                    f'mac_pool_range_to="{item.get("mac_pool", {}).get("ranges", {}).get("range", {}).get("to", "unknown")}"')
-
-                lines.append("# HELP allow_duplicates Defines whether duplicate MAC addresses are permitted in the pool (number).\n")
-                lines.append("# TYPE allow_duplicates gauge\n")
-                lines.append(f"allow_duplicates{{{labels_str_stats}}} {1 if datacenter.get('mac_pool', {}).get('allow_duplicates', 'false') == 'true' else 0}\n")
-                lines.append("# HELP default_pool Defines whether this is the default pool (number).\n")
-                lines.append("# TYPE default_pool gauge\n")
-                lines.append(f"default_pool{{{labels_str_stats}}} {1 if datacenter.get('mac_pool', {}).get('default_pool', 'false') == 'true' else 0}\n")
-
-            for item in datacenter.get("qoss", {}).get("qos", {}):
-                labels_str_stats = (f'{labels}, qos_type="{item.get("type", "unknown")}", '
-                                    f'qos_name="{item.get("name", "unknown")}", '
-                                    f'qos_id="{item.get("id", "unknown")}"')
-
-                lines.append("# HELP qos_max_read_iops Maximum permitted number of input operations per second (number).\n")
-                lines.append("# TYPE qos_max_read_iops gauge\n")
-                lines.append(f"qos_max_read_iops{{{labels_str_stats}}} {item.get('max_read_iops', 0)}\n")
-                lines.append("# HELP qos_max_read_throughput Maximum permitted throughput for read operations (number).\n")
-                lines.append("# TYPE qos_max_read_throughput gauge\n")
-                lines.append(f"qos_max_read_throughput{{{labels_str_stats}}} {item.get('max_read_throughput', 0)}\n")
-                lines.append("# HELP qos_max_write_iops Maximum permitted number of output operations per second (number).\n")
-                lines.append("# TYPE qos_max_write_iops gauge\n")
-                lines.append(f"qos_max_write_iops{{{labels_str_stats}}} {item.get('max_write_iops', 0)}\n")
-                lines.append("# HELP qos_max_write_throughput Maximum permitted throughput for write operations (number).\n")
-                lines.append("# TYPE qos_max_write_throughput gauge\n")
-                lines.append(f"qos_max_write_throughput{{{labels_str_stats}}} {item.get('max_write_throughput', 0)}\n")
-
-            for item in datacenter.get("quotas", {}).get("quota", {}):
-                labels_str_stats = (f'{labels}, quota_name="{item.get("name", "unknown")}", '
-                                    f'quota_description="{item.get("description", "unknown")}", '
-                                    f'quota_id="{item.get("id", "unknown")}"')
-
-                lines.append("# HELP cluster_hard_limit_pct Hard resource overcommit limit for the cluster, expressed as a percentage of physical capacity (number).\n")
-                lines.append("# TYPE cluster_hard_limit_pct gauge\n")
-                lines.append(f"cluster_hard_limit_pct{{{labels_str_stats}}} {item.get('cluster_hard_limit_pct', 0)}\n")
-                lines.append("# HELP cluster_soft_limit_pct Soft resource overcommit limit for the cluster, expressed as a percentage of physical capacity (number).\n")
-                lines.append("# TYPE cluster_soft_limit_pct gauge\n")
-                lines.append(f"cluster_soft_limit_pct{{{labels_str_stats}}} {item.get('cluster_soft_limit_pct', 0)}\n")
-                lines.append("# HELP storage_hard_limit_pct Hard storage usage limit for the datacenter, expressed as a percentage of total storage capacity (number).\n")
-                lines.append("# TYPE storage_hard_limit_pct gauge\n")
-                lines.append(f"storage_hard_limit_pct{{{labels_str_stats}}} {item.get('storage_hard_limit_pct', 0)}\n")
-                lines.append("# HELP storage_soft_limit_pct Soft storage usage limit for the datacenter, expressed as a percentage of total storage capacity (number).\n")
-                lines.append("# TYPE storage_soft_limit_pct gauge\n")
-                lines.append(f"storage_soft_limit_pct{{{labels_str_stats}}} {item.get('storage_soft_limit_pct', 0)}\n")
-
-                for quota_cluster_limit in item.get("quota_cluster_limits", {}).get("quota_cluster_limit", {}):
-                    lines.append("# HELP memory_limit Memory limit for the quota at cluster level in bytes. A value of -1 indicates no limit (unlimited) (number).\n")
-                    lines.append("# TYPE memory_limit gauge\n")
-                    lines.append(f"memory_limit{{{labels_str_stats}}} {quota_cluster_limit.get('memory_limit', 0)}\n")
-                    lines.append("# HELP memory_usage Current memory usage for the quota at cluster level in bytes (number).\n")
-                    lines.append("# TYPE memory_usage gauge\n")
-                    lines.append(f"memory_usage{{{labels_str_stats}}} {quota_cluster_limit.get('memory_usage', 0)}\n")
-                    lines.append("# HELP vcpu_limit Virtual CPU limit for the quota at cluster level. A value of -1 indicates no limit (unlimited) (number).\n")
-                    lines.append("# TYPE vcpu_limit gauge\n")
-                    lines.append(f"vcpu_limit{{{labels_str_stats}}} {quota_cluster_limit.get('vcpu_limit', 0)}\n")
-                    lines.append("# HELP vcpu_usage Number of virtual CPUs currently allocated under the quota at cluster level (number).\n")
-                    lines.append("# TYPE vcpu_usage gauge\n")
-                    lines.append(f"vcpu_usage{{{labels_str_stats}}} {quota_cluster_limit.get('vcpu_usage', 0)}\n")
-
-                for quota_storage_limit in item.get("quota_storage_limits", {}).get("quota_storage_limit", {}):
-                    lines.append("# HELP limit Storage capacity limit for the quota in bytes. A value of -1 indicates no limit (unlimited) (number).\n")
-                    lines.append("# TYPE limit gauge\n")
-                    lines.append(f"limit{{{labels_str_stats}}} {quota_storage_limit.get('limit', 0)}\n")
-                    lines.append("# HELP usage Current storage usage for the quota in bytes (number).\n")
-                    lines.append("# TYPE usage gauge\n")
-                    lines.append(f"usage{{{labels_str_stats}}} {quota_storage_limit.get('usage', 0)}\n")
+    transfer = TRANSFERS["current"].setdefault(CURRENT_COLLECTOR.get(), {"requests": 0, "wire_bytes": 0, "decoded_bytes": 0})
+    transfer["requests"] += 1
+    transfer["wire_bytes"] += wire_bytes
+    transfer["decoded_bytes"] += len(body)
 
-        return lines
+    return body
 
 
-async def get_clusters_statistics(session, token):
-    url = f"{VIRT_SCHEME}://{VIRT_URL}/ovirt-engine/api/clusters?follow=enabledfeatures"
-    async with session.get(url, headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
-                           ssl=False) as resp:
-        clusters_statistics = await resp.json()
-
-        lines = []
-
-        for cluster in clusters_statistics["cluster"]:
-            labels = {"object_type": "cluster",
-                      "bios_type": cluster.get("bios_type", "unknown"),
-                      "cpu_architecture": cluster.get("cpu", {}).get("architecture", "unknown"),
-                      "cpu_type": cluster.get("cpu", {}).get("type", "unknown"),
-                      "migration_policy_id": cluster.get("migration", {}).get("policy", {}).get("id", "unknown"),
-                      "version_major": cluster.get("version", {}).get("major", "unknown"),
-                      "version_minor": cluster.get("version", {}).get("minor", "unknown"),
-                      "name": cluster.get("name", "unknown"),
-                      "id": cluster.get("id", "unknown")}
-
-            labels = ", ".join(f'{k}="{v}"' for k, v in labels.items())
-
-            for item in cluster.get("custom_scheduling_policy_properties", {}).get("property", {}):
-                metric_name = "".join(f"_{c.lower()}" if c.isupper() else c for c in item.get('name', 'unknown'))[1:]
-                lines.append(f"# HELP {metric_name.replace('.', '_')} (number).\n")
-                lines.append(f"# TYPE {metric_name.replace('.', '_')} gauge\n")
-                lines.append(f"{metric_name.replace('.', '_')}{{{labels}}} {item.get('value', 0)}\n")
-
-            lines.append("# HELP error_handling_on_error Policy defining which virtual machines are migrated automatically when a cluster error or failure occurs: 0/1/2/3 - do_not_migrate/migrate/migrate_highly_available/unknown (number).\n")
-            lines.append("# TYPE error_handling_on_error gauge\n")
-            lines.append(f"error_handling_on_error{{{labels}}} { {'do_not_migrate': 0, 'migrate': 1, 'migrate_highly_available': 2, 'unknown': 3}.get(cluster.get('error_handling', {}).get('on_error', 'unknown'))}\n")
-            lines.append("# HELP firewall_type The type of firewall to be used on hosts in this cluster: 0/1/2 - firewalld/iptables/unknown (number).\n")
-            lines.append("# TYPE firewall_type gauge\n")
-            lines.append(f"firewall_type{{{labels}}} { {'firewalld': 0, 'iptables': 1, 'unknown': 2}.get(cluster.get('firewall_type', 'unknown'))}\n")
-            lines.append("# HELP ballooning_enabled Indicates whether memory ballooning is enabled for virtual machines in the cluster (bool).\n")
-            lines.append("# TYPE ballooning_enabled gauge\n")
-            lines.append(f"ballooning_enabled{{{labels}}} {1 if cluster.get('ballooning_enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP fencing_policy_enabled Enable or disable fencing on this cluster (bool).\n")
-            lines.append("# TYPE fencing_policy_enabled gauge\n")
-            lines.append(f"fencing_policy_enabled{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP fencing_policy_skip_if_connectivity_broken_enabled If enabled, we will not fence a host in case more than a configurable percentage of hosts in the cluster lost connectivity as well (bool).\n")
-            lines.append("# TYPE fencing_policy_skip_if_connectivity_broken_enabled gauge\n")
-            lines.append(f"fencing_policy_skip_if_connectivity_broken_enabled{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_connectivity_broken', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP fencing_policy_skip_if_connectivity_broken_threshold Threshold for connectivity testing (bool).\n")
-            lines.append("# TYPE fencing_policy_skip_if_connectivity_broken_threshold gauge\n")
-            lines.append(f"fencing_policy_skip_if_connectivity_broken_threshold{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_connectivity_broken', {}).get('threshold', 'false') == 'true' else 0}\n")
-            lines.append("# HELP fencing_policy_skip_if_gluster_bricks_up A flag indicating if fencing should be skipped if Gluster bricks are up and running in the host being fenced (bool).\n")
-            lines.append("# TYPE fencing_policy_skip_if_gluster_bricks_up gauge\n")
-            lines.append(f"fencing_policy_skip_if_gluster_bricks_up{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_gluster_bricks_up', 'false') == 'true' else 0}\n")
-            lines.append("# HELP fencing_policy_skip_if_gluster_quorum_not_met A flag indicating if fencing should be skipped if Gluster bricks are up and running and Gluster quorum will not be met without those bricks (bool).\n")
-            lines.append("# TYPE fencing_policy_skip_if_gluster_quorum_not_met gauge\n")
-            lines.append(f"fencing_policy_skip_if_gluster_quorum_not_met{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_gluster_quorum_not_met', 'false') == 'true' else 0}\n")
-            lines.append("# HELP fencing_policy_skip_if_sd_active_enabled If enabled, we will skip fencing in case the host maintains its lease in the storage (bool).\n")
-            lines.append("# TYPE fencing_policy_skip_if_sd_active_enabled gauge\n")
-            lines.append(f"fencing_policy_skip_if_sd_active_enabled{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_sd_active', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP fips_mode FIPS mode of the cluster (bool).\n")
-            lines.append("# TYPE fips_mode gauge\n")
-            lines.append(f"fips_mode{{{labels}}} {1 if cluster.get('fips_mode', 'disabled') == 'enabled' else 0}\n")
-            lines.append("# HELP gluster_service Indicates whether GlusterFS service is enabled for the cluster (bool).\n")
-            lines.append("# TYPE gluster_service gauge\n")
-            lines.append(f"gluster_service{{{labels}}} {1 if cluster.get('gluster_service', 'false') == 'true' else 0}\n")
-            lines.append("# HELP ha_reservation Indicates whether resource reservation for high availability is enabled for the cluster (bool).\n")
-            lines.append("# TYPE ha_reservation gauge\n")
-            lines.append(f"ha_reservation{{{labels}}} {1 if cluster.get('ha_reservation', 'false') == 'true' else 0}\n")
-            lines.append("# HELP ksm_enabled Indicates whether Kernel Samepage Merging (KSM) is enabled for the cluster (bool).\n")
-            lines.append("# TYPE ksm_enabled gauge\n")
-            lines.append(f"ksm_enabled{{{labels}}} {1 if cluster.get('ksm', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP ksm_merge_across_nodes Indicates whether Kernel Samepage Merging (KSM) is allowed to merge identical memory pages across NUMA nodes in the cluster (bool).\n")
-            lines.append("# TYPE ksm_merge_across_nodes gauge\n")
-            lines.append(f"ksm_merge_across_nodes{{{labels}}} {1 if cluster.get('ksm', {}).get('merge_across_nodes', 'false') == 'true' else 0}\n")
-            lines.append("# HELP log_max_memory_used_threshold The memory consumption threshold for logging audit log events (number).\n")
-            lines.append("# TYPE log_max_memory_used_threshold gauge\n")
-            lines.append(f"log_max_memory_used_threshold{{{labels}}} {cluster.get('log_max_memory_used_threshold', 0)}\n")
-            lines.append("# HELP log_max_memory_used_threshold_type The memory consumption threshold type for logging audit log events (1 if percentage, 0 if absolute_value_in_mb) (bool).\n")
-            lines.append("# TYPE log_max_memory_used_threshold_type gauge\n")
-            lines.append(f"log_max_memory_used_threshold_type{{{labels}}} {1 if cluster.get('log_max_memory_used_threshold_type', 'absolute_value_in_mb') == 'percentage' else 0}\n")
-            lines.append("# HELP memory_policy_over_commit_percent Allowed memory overcommit for the cluster, expressed as a percantage of physical memory (number).\n")
-            lines.append("# TYPE memory_policy_over_commit_percent gauge\n")
-            lines.append(f"memory_policy_over_commit_percent{{{labels}}} {cluster.get('memory_policy', {}).get('over_commit', {}).get('percent', 0)}\n")
-            lines.append("# HELP memory_policy_transparent_hugepages_enabled Allowed memory overcommit for the cluster, expressed as a percantage of physical memory (number).\n")
-            lines.append("# TYPE memory_policy_transparent_hugepages_enabled gauge\n")
-            lines.append(f"memory_policy_transparent_hugepages_enabled{{{labels}}} {1 if cluster.get('memory_policy', {}).get('transparent_hugepages', {}).get('enabled', 'false') == 'true' else 0}\n")
-            lines.append("# HELP migration_auto_converge Migration network selection mode: 0/1/2/3 - false/true/inherit/unknown (number).\n")
-            lines.append("# TYPE migration_auto_converge gauge\n")
-            lines.append(f"migration_auto_converge{{{labels}}} { {'false': 0, 'true': 1, 'inherit': 2, 'unknown': 3}.get(cluster.get('migration', {}).get('auto_converge', 'unknown'))}\n")
-            lines.append("# HELP migration_bandwidth_assignment_method Defines how the migration bandwidth is assigned: 0/1/2/3 - auto/custom/hypervisor_default/unknown (number).\n")
-            lines.append("# TYPE migration_bandwidth_assignment_method gauge\n")
-            lines.append(f"migration_bandwidth_assignment_method{{{labels}}} { {'auto': 0, 'custom': 1, 'hypervisor_default': 2, 'unknown': 3}.get(cluster.get('migration', {}).get('bandwidth', {}).get('assignment_method', 'unknown'))}\n")
-            lines.append("# HELP migration_compressed Indicates whether memory compression is enabled for live migration: 0/1/2/3 - false/true/inherit/unknown (number).\n")
-            lines.append("# TYPE migration_compressed gauge\n")
-            lines.append(f"migration_compressed{{{labels}}} { {'false': 0, 'true': 1, 'inherit': 2, 'unknown': 3}.get(cluster.get('migration', {}).get('compressed', 'unknown'))}\n")
-            lines.append("# HELP migration_encrypted Specifies whether the migration should be encrypted or not: 0/1/2/3 - false/true/inherit/unknown (number).\n")
-            lines.append("# TYPE migration_encrypted gauge\n")
-            lines.append(f"migration_encrypted{{{labels}}} { {'false': 0, 'true': 1, 'inherit': 2, 'unknown': 3}.get(cluster.get('migration', {}).get('encrypted', 'unknown'))}\n")
-            lines.append("# HELP required_rng_source Representing the random generator backend types: 0/1/2/3 - hwrng/random/urandom/unknown (number).\n")
-            lines.append("# TYPE required_rng_source gauge\n")
-            lines.append(f"required_rng_source{{{labels}}} { {'hwrng': 0, 'random': 1, 'urandom': 2, 'unknown': 3}.get(cluster.get('required_rng_sources', {}).get('required_rng_source', 'unknown')[0])}\n")
-            lines.append("# HELP switch_type The type of switch to be used by all networks in given cluster: 0/1/2 - legacy/ovs/unknown (number).\n")
-            lines.append("# TYPE switch_type gauge\n")
-            lines.append(f"switch_type{{{labels}}} { {'legacy': 0, 'ovs': 1, 'unknown': 2}.get(cluster.get('switch_type', 'unknown'))}\n")
-            lines.append("# HELP threads_as_cores Indicates whether CPU threads (SMT/Hyper-Threading) are treated as separate CPU cores by the scheduler (bool).\n")
-            lines.append("# TYPE threads_as_cores gauge\n")
-            lines.append(f"threads_as_cores{{{labels}}} {1 if cluster.get('threads_as_cores', 'false') == 'true' else 0}\n")
-            lines.append("# HELP trusted_service Indicates whether trusted services are enabled for virtual machine in the cluster (bool).\n")
-            lines.append("# TYPE trusted_service gauge\n")
-            lines.append(f"trusted_service{{{labels}}} {1 if cluster.get('trusted_service', 'false') == 'true' else 0}\n")
-            lines.append("# HELP tunnel_migration Indicates whether virtual machine migration is performed via the management network tunnel (bool).\n")
-            lines.append("# TYPE tunnel_migration gauge\n")
-            lines.append(f"tunnel_migration{{{labels}}} {1 if cluster.get('tunnel_migration', 'false') == 'true' else 0}\n")
-            lines.append("# HELP virt_service Indicates whether virtualization services are enabled for the cluster (bool).\n")
-            lines.append("# TYPE virt_service gauge\n")
-            lines.append(f"virt_service{{{labels}}} {1 if cluster.get('virt_service', 'false') == 'true' else 0}\n")
-            lines.append("# HELP vnc_encryption Indicates whether VNC console connections to virtual machines are encrypted (bool).\n")
-            lines.append("# TYPE vnc_encryption gauge\n")
-            lines.append(f"vnc_encryption{{{labels}}} {1 if cluster.get('vnc_encryption', 'false') == 'true' else 0}\n")
+async def get_json(session, token, path):
+    url = f"{VIRT_SCHEME}://{VIRT_URL}/ovirt-engine/api/{path}"
+    with span("pool"):
+        await ENGINE_POOL.acquire()
+    try:
+        with span("fetch"):
+            async with session.get(url, headers={"Authorization": f"Bearer {token}",
+                                                 "Accept": "application/json",
+                                                 "Accept-Encoding": ENGINE_COMPRESSION},
+                                   ssl=False) as resp:
+                resp.raise_for_status()
+                body = await read_body(resp)
+    finally:
+        ENGINE_POOL.release()
 
-        return lines
+    with span("decode"):
+        data = json.loads(body)
 
+    sample_rss()
 
-async def get_storagedomains_statistics(session, token):
-    url = f"{VIRT_SCHEME}://{VIRT_URL}/ovirt-engine/api/storagedomains"
-    async with session.get(url, headers={"Authorization": f"Bearer {token}", "Accept": "application/json"}, ssl=False) as resp:
-        storagedomains_statistics = await resp.json()
-
-        lines = []
-
-        for storagedomain in storagedomains_statistics["storage_domain"]:
-            labels = {"object_type": "storagedomain",
-                      "storage_type": storagedomain.get("storage", {}).get("type", "unknown"),
-                      "name": storagedomain.get("name", "unknown"),
-                      "id": storagedomain.get("id", "unknown")}
-
-            labels = ", ".join(f'{k}="{v}"' for k, v in labels.items())
-
-            lines.append("# HELP Amount of free storage space avalible in the storage domain (bytes).\n")
-            lines.append("# TYPE available gauge\n")
-            lines.append(f"available{{{labels}}} {storagedomain.get('available', 0)}\n")
-            lines.append("# HELP This attribute indicates whether a data storage domain is used as backup domain or not (bool).\n")
-            lines.append("# TYPE backup gauge\n")
-            lines.append(f"backup{{{labels}}} {1 if storagedomain.get('backup', 'false') == 'true' else 0}\n")
-            lines.append("# HELP Specifies block size in bytes for a storage domain (bytes).\n")
-            lines.append("# TYPE block_size gauge\n")
-            lines.append(f"block_size{{{labels}}} {storagedomain.get('block_size', 0)}\n")
-            lines.append("# HELP Total logical size of all virtual disks allocated on the storage domain (bytes).\n")
-            lines.append("# TYPE committed gauge\n")
-            lines.append(f"committed{{{labels}}} {storagedomain.get('committed', 0)}\n")
-            lines.append("# HELP Free space threshold, in percent, below which operations are blocked on the storage domain (number).\n")
-            lines.append("# TYPE critical_space_action_blocker gauge\n")
-            lines.append(f"critical_space_action_blocker{{{labels}}} {storagedomain.get('critical_space_action_blocker', 0)}\n")
-            lines.append("# HELP Indicates whether disks' blocks on block storage domains will be discarded right before they are deleted (bool).\n")
-            lines.append("# TYPE discard_after_delete gauge\n")
-            lines.append(f"discard_after_delete{{{labels}}} {1 if storagedomain.get('discard_after_delete', 'false') == 'true' else 0}\n")
-            lines.append("# HELP External health status of the storage domain as reported by the storage backend: 0/1/2/3/4/5 - error/failure/info/ok/warning/unknown (number).\n")
-            lines.append("# TYPE external_status gauge\n")
-            lines.append(f"external_status{{{labels}}} { {'error': 0, 'failure': 1, 'info': 2, 'ok': 3, 'warning': 4, 'unknown': 5}.get(storagedomain.get('external_status', 'unknown'))}\n")
-            lines.append("# HELP Indicates whether the storage domain is the master domain of the data center (bool).\n")
-            lines.append("# TYPE master gauge\n")
-            lines.append(f"master{{{labels}}} {1 if storagedomain.get('master', 'false') == 'true' else 0}\n")
-            lines.append("# HELP Storage domain metadata format version (v1-v5): 0/1/2/3/4/5 - v1/v2/v3/v4/v5/unknown (number).\n")
-            lines.append("# TYPE storage_format gauge\n")
-            lines.append(f"storage_format{{{labels}}} { {'v1': 0, 'v2': 1, 'v3': 2, 'v4': 3, 'v5': 4, 'unknown': 5}.get(storagedomain.get('storage_format', 'unknown'))}\n")
-            lines.append("# HELP Indicates whether a block storage domain supports discard operations (bool).\n")
-            lines.append("# TYPE supports_discard gauge\n")
-            lines.append(f"supports_discard{{{labels}}} {1 if storagedomain.get('supports_discard', 'false') == 'true' else 0}\n")
-            lines.append("# HELP Indicates whether a block storage domain supports the property that discard zeroes the data (bool).\n")
-            lines.append("# TYPE supports_discard_zeroes_data gauge\n")
-            lines.append(f"supports_discard_zeroes_data{{{labels}}} {1 if storagedomain.get('supports_discard_zeroes_data', 'false') == 'true' else 0}\n")
-            lines.append("# HELP Storage domain role: 0/1/2/3/4/5/6 - data/export/image/iso/managed_block_storage/volume/unknown (number).\n")
-            lines.append("# TYPE type gauge\n")
-            lines.append(f"type{{{labels}}} { {'data': 0, 'export': 1, 'image': 2, 'iso': 3, 'managed_block_storage': 4, 'volume': 5, 'unknown': 6}.get(storagedomain.get('type', 'unknown'))}\n")
-            lines.append("# HELP Used storage space in the storage domain (bytes).\n")
-            lines.append("# TYPE used gauge\n")
-            lines.append(f"used{{{labels}}} {storagedomain.get('used', 0)}\n")
-            lines.append("# HELP Warning threshold for low free space on the storage domain (percent).\n")
-            lines.append("# TYPE warning_low_space_indicator gauge\n")
-            lines.append(f"warning_low_space_indicator{{{labels}}} {storagedomain.get('warning_low_space_indicator', 0)}\n")
-            lines.append("# HELP Serves as the default value of wipe_after_delete for disks on this storage domain (bool).\n")
-            lines.append("# TYPE wipe_after_delete gauge\n")
-            lines.append(f"wipe_after_delete{{{labels}}} {1 if storagedomain.get('wipe_after_delete', 'false') == 'true' else 0}\n")
-
-            for item in storagedomain.get("storage", {}).get("volume_group", {}).get("logical_units", {}).get("logical_unit", {}):
-                labels_str_stats = (f'{labels}, logical_unit_product_id="{item.get("product_id", "unknown")}", '
-                                    f'logical_unit_serial="{item.get("serial", "unknown")}", '
-                                    f'logical_unit_address="{item.get("address", "unknown")}", '
-                                    f'logical_unit_portal="{item.get("portal", "unknown")}", '
-                                    f'logical_unit_target="{item.get("target", "unknown")}", '
-                                    f'logical_unit_vendor_id="{item.get("vendor_id", "unknown")}", '
-                                    f'logical_unit_volume_group_id="{item.get("volume_group_id", "unknown")}", '
-                                    f'logical_unit_id="{item.get("id", "unknown")}",'
-                                    f'logical_unit_lun_mapping="{item.get("lun_mapping", "unknown")}"')
-
-                lines.append("# HELP The maximum number of bytes that can be discarded by the logical unit’s underlying storage in a single operation (bytes).\n")
-                lines.append("# TYPE discard_max_size gauge\n")
-                lines.append(f"discard_max_size{{{labels_str_stats}}} {item.get('discard_max_size', 0)}\n")
-                lines.append("# HELP True, if previously discarded blocks in the logical unit’s underlying storage are read back as zeros (bool).\n")
-                lines.append("# TYPE discard_zeroes_data gauge\n")
-                lines.append(f"discard_zeroes_data{{{labels_str_stats}}} {1 if item.get('discard_zeroes_data', 'false') == 'true' else 0}\n")
-                lines.append("# HELP Number of active multipath to the logical unit (LUN) (number).\n")
-                lines.append("# TYPE paths gauge\n")
-                lines.append(f"paths{{{labels_str_stats}}} {item.get('paths', 0)}\n")
-                lines.append("# HELP Network port used to access the logical unit (LUN). For example iSCSI target port (number).\n")
-                lines.append("# TYPE port gauge\n")
-                lines.append(f"port{{{labels_str_stats}}} {item.get('port', 0)}\n")
-                lines.append("# HELP Size of the logical unit (LUN) (bytes).\n")
-                lines.append("# TYPE size gauge\n")
-                lines.append(f"size{{{labels_str_stats}}} {item.get('size', 0)}\n")
-
-            for item in storagedomain.get("data_centers", {}).get("data_center", {}):
-                labels_str_stats = f'{labels}, data_center_id="{item.get("id", "unknown")}"'
-
-                lines.append("# HELP Size of the logical unit (LUN) (bytes).\n")
-                lines.append("# TYPE data_center_id gauge\n")
-                lines.append(f"data_center_id{{{labels_str_stats}}} 1\n")
+    return data
 
-        return lines
+
+async def iter_pages(session, token, path, kind, page_size):
+    page = 1
+    seen = set()
+
+    while True:
+        items = (await get_json(session, token, f"{path}&max={page_size}&search=page%20{page}" if page_size > 0 else path)).get(kind, [])
+        new_items = 0
+        for item in items:
+            if item.get("id") is not None:
+                if item["id"] in seen:
+                    continue
+                seen.add(item["id"])
+            new_items += 1
+            yield item
+
+        if page_size <= 0 or len(items) < page_size:
+            break
+        if not new_items:
+            log.warning(f"Page {page} of {path} returned no new {kind} items, the engine seems to ignore paging, stopping")
+            break
+        if page >= ENGINE_MAX_PAGES:
+            log.warning(f"Stopped paging {path} after ENGINE_MAX_PAGES={ENGINE_MAX_PAGES} pages")
+            break
+        page += 1
+
+
+async def fan_out(session, token, paths):
+    return await asyncio.gather(*(get_json(session, token, path) for path in paths), return_exceptions=True)
+
+
+async def iter_items(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def get_dwh_pool():
+    if DWH_POOL["pool"] is None:
+        if asyncpg is None:
+            raise RuntimeError("COLLECTOR_BACKEND=dwh requires the asyncpg package")
+        DWH_POOL["pool"] = await asyncpg.create_pool(DWH_DSN, min_size=1, max_size=DWH_POOL_SIZE)
+
+    return DWH_POOL["pool"]
+
+
+async def fetch_dwh(query):
+    pool = await get_dwh_pool()
+    with span("pool"):
+        connection = await pool.acquire()
+    try:
+        with span("fetch"):
+            return await connection.fetch(query, timedelta(seconds=DWH_SAMPLE_WINDOW))
+    finally:
+        await pool.release(connection)
+
+
+def dwh_statistic(name, datum, unit, description):
+    return {"name": name,
+            "description": description,
+            "unit": unit,
+            "kind": "gauge",
+            "type": "decimal",
+            "values": {"value": [{"datum": datum if datum is not None else 0}]}}
+
+
+async def get_dwh_vms():
+    rows = await fetch_dwh("SELECT DISTINCT ON (s.vm_id) s.vm_id, s.vm_status, s.vm_ip, s.currently_running_on_host, "
+                           "s.cpu_usage_percent, s.user_cpu_usage_percent, s.system_cpu_usage_percent, s.memory_usage_percent, "
+                           "c.vm_name, c.cluster_id, c.template_id, c.memory_size_mb, c.number_of_sockets, c.cpu_per_socket "
+                           "FROM vm_samples_history s "
+                           "JOIN vm_configuration c ON c.history_id = s.vm_configuration_version "
+                           "WHERE s.history_datetime > now() - $1::interval "
+                           "ORDER BY s.vm_id, s.history_datetime DESC")
+
+    vms = []
+    for row in rows:
+        memory = (row["memory_size_mb"] or 0) * 1024 * 1024
+        vms.append({"id": str(row["vm_id"]),
+                    "name": row["vm_name"],
+                    "status": {0: "down", 1: "up", 2: "paused", 3: "not_responding"}.get(row["vm_status"], "unknown"),
+                    "memory": memory,
+                    "display": {"address": row["vm_ip"] or "unknown"},
+                    "cluster": {"id": str(row["cluster_id"]) if row["cluster_id"] else "unknown"},
+                    "template": {"id": str(row["template_id"]) if row["template_id"] else "unknown"},
+                    "host": {"id": str(row["currently_running_on_host"])} if row["currently_running_on_host"] else {},
+                    "cpu": {"topology": {"sockets": row["number_of_sockets"] or 0,
+                                         "cores": row["cpu_per_socket"] or 0,
+                                         "threads": 1}},
+                    "statistics": {"statistic": [dwh_statistic("cpu.current.total", row["cpu_usage_percent"], "percent", "Total CPU used"),
+                                                 dwh_statistic("cpu.current.guest", row["user_cpu_usage_percent"], "percent", "CPU used by guest"),
+                                                 dwh_statistic("cpu.current.hypervisor", row["system_cpu_usage_percent"], "percent", "CPU overhead"),
+                                                 dwh_statistic("memory.installed", memory, "bytes", "Total memory configured"),
+                                                 dwh_statistic("memory.used", memory * (row["memory_usage_percent"] or 0) // 100, "bytes", "Memory used (agent)")]}})
+
+    return {"vm": vms}
+
+
+async def get_dwh_hosts():
+    rows = await fetch_dwh("SELECT DISTINCT ON (s.host_id) s.host_id, s.host_status, s.cpu_usage_percent, s.user_cpu_usage_percent, "
+                           "s.system_cpu_usage_percent, s.memory_usage_percent, s.ksm_cpu_percent, s.cpu_load, s.swap_used_mb, "
+                           "c.host_name, c.cluster_id, c.fqdn_or_ip, c.memory_size_mb, c.swap_size_mb, c.cpu_model, c.cpu_speed_mh, "
+                           "c.number_of_cores, c.number_of_sockets, c.threads_per_core, c.vdsm_port "
+                           "FROM host_samples_history s "
+                           "JOIN host_configuration c ON c.history_id = s.host_configuration_version "
+                           "WHERE s.history_datetime > now() - $1::interval "
+                           "ORDER BY s.host_id, s.history_datetime DESC")
+
+    hosts = []
+    for row in rows:
+        memory = (row["memory_size_mb"] or 0) * 1024 * 1024
+        swap = (row["swap_size_mb"] or 0) * 1024 * 1024
+        sockets = row["number_of_sockets"] or 0
+        hosts.append({"id": str(row["host_id"]),
+                      "name": row["host_name"],
+                      "address": row["fqdn_or_ip"] or "unknown",
+                      "status": {1: "up", 2: "maintenance", 3: "non_responsive"}.get(row["host_status"], "unknown"),
+                      "cluster": {"id": str(row["cluster_id"]) if row["cluster_id"] else "unknown"},
+                      "port": row["vdsm_port"] or 0,
+                      "cpu": {"name": row["cpu_model"] or "unknown",
+                              "speed": row["cpu_speed_mh"] or 0,
+                              "topology": {"sockets": sockets,
+                                           "cores": (row["number_of_cores"] or 0) // sockets if sockets else 0,
+                                           "threads": row["threads_per_core"] or 0}},
+                      "statistics": {"statistic": [dwh_statistic("memory.total", memory, "bytes", "Total memory"),
+                                                   dwh_statistic("memory.used", memory * (row["memory_usage_percent"] or 0) // 100, "bytes", "Used memory"),
+                                                   dwh_statistic("swap.total", swap, "bytes", "Total swap"),
+                                                   dwh_statistic("swap.used", (row["swap_used_mb"] or 0) * 1024 * 1024, "bytes", "Used swap"),
+                                                   dwh_statistic("cpu.current.user", row["user_cpu_usage_percent"], "percent", "User CPU usage"),
+                                                   dwh_statistic("cpu.current.system", row["system_cpu_usage_percent"], "percent", "System CPU usage"),
+                                                   dwh_statistic("cpu.current.idle", 100 - (row["cpu_usage_percent"] or 0), "percent", "Idle CPU usage"),
+                                                   dwh_statistic("cpu.load.avg.5m", row["cpu_load"], "none", "CPU 5 minute load average"),
+                                                   dwh_statistic("ksm.cpu.current", row["ksm_cpu_percent"], "percent", "KSM CPU usage")]}})
+
+    return {"host": hosts}
+
+
+async def get_dwh_storagedomains():
+    rows = await fetch_dwh("SELECT DISTINCT ON (s.storage_domain_id) s.storage_domain_id, s.available_disk_size_gb, s.used_disk_size_gb, "
+                           "c.storage_domain_name, c.storage_domain_type, c.storage_type "
+                           "FROM storage_domain_samples_history s "
+                           "JOIN storage_domain_configuration c ON c.history_id = s.storage_configuration_version "
+                           "WHERE s.history_datetime > now() - $1::interval "
+                           "ORDER BY s.storage_domain_id, s.history_datetime DESC")
+
+    storagedomains = []
+    for row in rows:
+        storagedomains.append({"id": str(row["storage_domain_id"]),
+                               "name": row["storage_domain_name"],
+                               "available": (row["available_disk_size_gb"] or 0) * 1024 ** 3,
+                               "used": (row["used_disk_size_gb"] or 0) * 1024 ** 3,
+                               "master": "true" if row["storage_domain_type"] == 0 else "false",
+                               "type": {0: "data", 1: "data", 2: "iso", 3: "export", 4: "image", 5: "volume",
+                                        7: "managed_block_storage"}.get(row["storage_domain_type"], "unknown"),
+                               "storage": {"type": {1: "nfs", 2: "fcp", 3: "iscsi", 4: "localfs", 6: "posixfs", 7: "glusterfs",
+                                                    8: "glance", 9: "cinder", 10: "managed_block_storage"}.get(row["storage_type"], "unknown")}})
+
+    return {"storage_domain": storagedomains}
+
+
+@contextmanager
+def span(phase, collector=None):
+    collector = collector or CURRENT_COLLECTOR.get()
+    start = time.perf_counter()
+
+    busy = SPANS["busy"].setdefault(collector, {"active": 0, "since": 0, "total": 0}) if phase in BLOCKING_PHASES else None
+    if busy is not None:
+        if not busy["active"]:
+            busy["since"] = start
+        busy["active"] += 1
+
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        phases = SPANS["current"].setdefault(collector, {})
+        phases[phase] = phases.get(phase, 0) + end - start
+
+        if busy is not None:
+            busy["active"] -= 1
+            if not busy["active"]:
+                busy["total"] += end - busy["since"]
+
+
+@contextmanager
+def debug_capture():
+    if DEBUG_STATE["profile_cycles"] > 0 and DEBUG_STATE["profiler"] is None:
+        DEBUG_STATE["profiler"] = cProfile.Profile()
+    profiler = DEBUG_STATE["profiler"]
+
+    tracing = DEBUG_STATE["tracemalloc_pending"]
+    if tracing:
+        tracemalloc.start(DEBUG_TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot()
+
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            DEBUG_STATE["profile_cycles"] -= 1
+            if DEBUG_STATE["profile_cycles"] <= 0:
+                profiler.create_stats()
+                DEBUG_STATE["profile"] = marshal.dumps(profiler.stats)
+                DEBUG_STATE["profiler"] = None
+                log.info("Profiling finished, download it from /debug/profile")
+
+        if tracing:
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report = [f"Traced memory after the cycle: {current} bytes, peak: {peak} bytes\n\n"]
+            report.extend(f"{stat}\n" for stat in after.compare_to(before, "lineno")[:DEBUG_TRACEMALLOC_TOP])
+            DEBUG_STATE["tracemalloc"] = "".join(report)
+            DEBUG_STATE["tracemalloc_pending"] = False
+            log.info("Tracemalloc snapshot finished, download it from /debug/tracemalloc")
+
+
+def get_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def sample_rss():
+    cycle = MEMORY_STATE["cycle"]
+    cycle["peak"] = max(cycle.get("peak", 0), get_rss())
+
+
+def release_memory():
+    gc.collect()
+    if malloc_trim is not None:
+        malloc_trim(0)
+
+
+def plan_memory():
+    if MEMORY_BUDGET_MB <= 0:
+        return 0
+
+    budget = MEMORY_BUDGET_MB * 1024 * 1024
+    rss = get_rss()
+    peak = MEMORY_STATE["cycle"].get("peak", 0)
+
+    if rss >= budget and MEMORY_STATE["skipped"] < MEMORY_MAX_SKIPPED:
+        level = 2
+    elif rss >= budget or peak >= budget * MEMORY_DEGRADE_RATIO:
+        level = 1
+    elif MEMORY_STATE["level"] > 0 and peak >= budget * MEMORY_DEGRADE_RATIO * 0.75:
+        level = 1
+    else:
+        level = 0
+
+    if level != MEMORY_STATE["level"]:
+        log.warning(f"Memory degradation level {MEMORY_STATE['level']} -> {level} "
+                    f"(rss {rss / 1048576:.0f} MB, last cycle peak {peak / 1048576:.0f} MB, budget {MEMORY_BUDGET_MB} MB)")
+    MEMORY_STATE["level"] = level
+
+    return level
 
 
-async def gather_statistic():
-    async with aiohttp.ClientSession() as session:
-        token = await get_token(session)
+def get_memory_statistics():
+    cycle = MEMORY_STATE["cycle"]
+    lines = ["# HELP zvirt_exporter_memory_rss_bytes Resident memory of the exporter process (bytes).\n",
+             "# TYPE zvirt_exporter_memory_rss_bytes gauge\n",
+             f"zvirt_exporter_memory_rss_bytes {get_rss()}\n",
+             "# HELP zvirt_exporter_memory_budget_bytes Configured memory budget, 0 - unlimited (bytes).\n",
+             "# TYPE zvirt_exporter_memory_budget_bytes gauge\n",
+             f"zvirt_exporter_memory_budget_bytes {MEMORY_BUDGET_MB * 1024 * 1024}\n",
+             "# HELP zvirt_exporter_memory_degradation_level Memory degradation: 0/1/2 - normal/reduced pages and families/collection skipped (number).\n",
+             "# TYPE zvirt_exporter_memory_degradation_level gauge\n",
+             f"zvirt_exporter_memory_degradation_level {MEMORY_STATE['level']}\n",
+             "# HELP zvirt_exporter_memory_skipped_cycles_total Collections skipped because the process was over the memory budget (number).\n",
+             "# TYPE zvirt_exporter_memory_skipped_cycles_total counter\n",
+             f"zvirt_exporter_memory_skipped_cycles_total {MEMORY_STATE['skipped_total']}\n",
+             "# HELP zvirt_exporter_cycle_rss_bytes Resident memory at the start, the peak and after releasing memory at the end of the last collection (bytes).\n",
+             "# TYPE zvirt_exporter_cycle_rss_bytes gauge\n"]
+    lines.extend(f'zvirt_exporter_cycle_rss_bytes{{point="{point}"}} {cycle[point]}\n' for point in ("start", "peak", "released") if point in cycle)
+    lines.append("# HELP zvirt_exporter_collector_output_bytes Size of the cached metrics of the collector (bytes).\n")
+    lines.append("# TYPE zvirt_exporter_collector_output_bytes gauge\n")
+    lines.extend(f'zvirt_exporter_collector_output_bytes{{collector="{name}"}} {len(fragment)}\n' for name, fragment in METRICS_CACHE["fragments"].items())
+    lines.append("# HELP zvirt_exporter_collector_last_success_timestamp_seconds Time the collector last finished successfully (unixtime).\n")
+    lines.append("# TYPE zvirt_exporter_collector_last_success_timestamp_seconds gauge\n")
+    lines.extend(f'zvirt_exporter_collector_last_success_timestamp_seconds{{collector="{name}"}} {timestamp:.0f}\n' for name, timestamp in METRICS_CACHE["updated"].items())
 
-        tasks = [get_vm_statistics(session, token),
-                 get_hosts_statistics(session, token),
-                 get_clusters_statistics(session, token),
-                 get_datacenters_statistics(session, token),
-                 get_storagedomains_statistics(session, token)]
+    return lines
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
 
-        output = "".join(line for result in results
-                                 if not isinstance(result, Exception)
-                                 for line in result)
+def statistic_datum(statistics, name):
+    for item in statistics.get("statistic", {}):
+        if item.get("name") == name:
+            values = item.get("values", {}).get("value", [])
+            return values[0].get("datum", 0) if len(values) > 0 else 0
 
-        return output
+    return 0
 
 
-async def metrics_updater():
-    global METRICS_CACHE
+def family_enabled(family):
+    return family not in DISABLED_FAMILIES and not (MEMORY_STATE["level"] > 0 and family in MEMORY_DEGRADE_FAMILIES)
 
-    while True:
-        start = time.time()
-        new_metrics = None
 
-        try:
-            log.info("Collecting metrics...")
-            new_metrics = await gather_statistic()
-        except Exception as e:
-            log.exception(f"Metrics update failed: {e}")
+def follow_param(*parts):
+    return ",".join(part for family, part in parts if family is None or family_enabled(family))
 
-        if new_metrics:
-            METRICS_CACHE["data"] = new_metrics
-            METRICS_CACHE["timestamp"] = time.time()
 
-            duration = time.time() - start
-            log.info(f"Metrics updated in {duration:.2f}s")
+def resolve(inventory, kind, object_id, field="name"):
+    return inventory[kind].get(object_id, {}).get(field, "unknown")
+
+
+async def wait_dependencies(inventory):
+    with span("wait"):
+        await asyncio.gather(*(inventory["ready"][name].wait() for name in COLLECTORS[CURRENT_COLLECTOR.get()]["depends"]
+                               if name in inventory["ready"]))
+
+
+def register_collector(name, depends=(), interval=0, cost=1, enabled=True):
+    def register(func):
+        if enabled and name not in DISABLED_COLLECTORS:
+            COLLECTORS[name] = {"func": func,
+                                "depends": depends,
+                                "interval": COLLECTOR_INTERVALS.get(name, interval),
+                                "cost": cost}
+        return func
+
+    return register
+
+
+def schedule_collectors(names=None):
+    if names is None:
+        names = [name for name, plugin in COLLECTORS.items()
+                 if time.time() - METRICS_CACHE["updated"].get(name, 0) >= plugin["interval"]]
+
+    selected = set()
+    pending = [name for name in names if name in COLLECTORS]
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(dependency for dependency in COLLECTORS[name]["depends"] if dependency in COLLECTORS)
+
+    return sorted(selected, key=lambda name: COLLECTORS[name]["cost"], reverse=True)
+
+
+def render_labels(labels, separator=", "):
+    return separator.join(f'{k}="{v}"' for k, v in labels.items() if k not in DROP_LABELS)
+
+
+def metric_allowed(name):
+    allowed = METRIC_RULES_CACHE.get(name)
+    if allowed is None:
+        allowed = ((METRICS_ALLOW is None or METRICS_ALLOW.search(name) is not None)
+                   and (METRICS_DENY is None or METRICS_DENY.search(name) is None))
+        METRIC_RULES_CACHE[name] = allowed
+
+    return allowed
+
+
+def filter_series(collector, lines):
+    if METRICS_ALLOW is None and METRICS_DENY is None and SERIES_LIMIT <= 0:
+        return lines
+
+    filtered = []
+    series = 0
+    help_line = None
+
+    for line in lines:
+        if line.startswith("# HELP "):
+            help_line = line
+            continue
+
+        if line.startswith("# "):
+            name = line.split(" ", 3)[2]
         else:
-            log.warning("Keeping previous metrics cache")
+            name = line.split("{", 1)[0].split(" ", 1)[0]
+
+        previous_help, help_line = help_line, None
+        if not metric_allowed(name):
+            continue
+
+        if not line.startswith("#"):
+            series += 1
+            if 0 < SERIES_LIMIT < series:
+                log.warning(f"Collector {collector} reached SERIES_LIMIT={SERIES_LIMIT}, dropping remaining series")
+                while filtered and filtered[-1].startswith("#"):
+                    filtered.pop()
+                break
+
+        if previous_help is not None:
+            filtered.append(previous_help)
+        filtered.append(line)
+
+    return filtered
+
+
+@register_collector("vms", depends=("hosts", "clusters", "datacenters", "storagedomains", "vnicprofiles", *(("disks",) if DISK_COLLECTOR else ())), cost=10)
+async def get_vm_statistics(session, token, inventory):
+    follow = follow_param((None if ROLLUPS_ENABLED else "vm_statistics", "statistics"),
+                          (None if ROLLUPS_ENABLED else "vm_disks", "disk_attachments" if DISK_COLLECTOR else
+                           "disk_attachments.disk.statistics" if family_enabled("vm_disks") else "disk_attachments.disk"),
+                          (None if ROLLUPS_ENABLED else "vm_nics", "nics.statistics"),
+                          ("snapshots", "snapshots.disks.statistics"),
+                          (None, "tags"))
+    if COLLECTOR_BACKEND == "dwh":
+        vm_statistics = await get_dwh_vms()
+    elif MEMORY_STATE["level"] > 0:
+        vm_statistics = {"vm": iter_pages(session, token, f"vms?follow={follow}", "vm", MEMORY_PAGE_SIZE)}
+    else:
+        vm_statistics = await get_json(session, token, f"vms?follow={follow}")
+
+    await wait_dependencies(inventory)
+
+    lines = []
+
+    async for vm in iter_items(vm_statistics["vm"]):
+        labels = {"object_type": "vm",
+                  "fqdn": vm.get("fqdn", "unknown"),
+                  "name": vm.get("name", "unknown"),
+                  "id": vm.get("id", "unknown"),
+                  "ip": vm.get("display", {}).get("address", "unknown"),
+                  "os_architecture": vm.get("guest_operating_system", {}).get("architecture", "unknown"),
+                  "codename": vm.get("guest_operating_system", {}).get("codename", "unknown"),
+                  "distribution": vm.get("guest_operating_system", {}).get("distribution", "unknown"),
+                  "family": vm.get("guest_operating_system", {}).get("family", "unknown"),
+                  "kernel_build": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("build", "unknown"),
+                  "kernel_full_version": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("full_version", "unknown"),
+                  "kernel_major": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("major", "unknown"),
+                  "kernel_minor": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("minor", "unknown"),
+                  "kernel_revision": vm.get("guest_operating_system", {}).get("kernel", {}).get("version", {}).get("revision", "unknown"),
+                  "distribution_full_version": vm.get("guest_operating_system", {}).get("version", {}).get("full_version", "unknown"),
+                  "distribution_major": vm.get("guest_operating_system", {}).get("version", {}).get("major", "unknown"),
+                  "distribution_minor": vm.get("guest_operating_system", {}).get("version", {}).get("minor", "unknown"),
+                  "distribution_revision": vm.get("guest_operating_system", {}).get("version", {}).get("revision", "unknown"),
+                  "time_zone": vm.get("time_zone", {}).get("name", "unknown"),
+                  "guest_time_zone_name": vm.get("guest_time_zone", {}).get("name", "unknown"),
+                  "guest_time_zone_utc_offset": vm.get("guest_time_zone", {}).get("utc_offset", "unknown"),
+                  "bios_type": vm.get('bios', {}).get("type", "unknown"),
+                  "cpu_architecture": vm.get('cpu', {}).get("architecture", "unknown"),
+                  "template_id": vm.get("template", {}).get("id", "unknown"),
+                  "cluster_id": vm.get("cluster", {}).get("id", "unknown"),
+                  "quota_id": vm.get("quota", {}).get("id", "unknown"),
+                  "cpu_profile_id": vm.get("cpu_profile", {}).get("id", "unknown")}
+
+        labels["cluster_name"] = resolve(inventory, "clusters", labels["cluster_id"])
+        labels["data_center_id"] = resolve(inventory, "clusters", labels["cluster_id"], "data_center_id")
+        labels["data_center_name"] = resolve(inventory, "data_centers", labels["data_center_id"])
+        labels["quota_name"] = resolve(inventory, "quotas", labels["quota_id"])
+
+        cmdb_tags = {"CMDB_AS_ID": "unknown", "CMDB_GAS_ID": "unknown", "CMDB_ENV": "unknown", "CMDB_CRIT": "unknown"}
+
+        for item in vm.get("tags", {}).get("tag", {}):
+            tag_data = item.get("name", "").split(".")
+            tag_data_len = len(tag_data)
+            if tag_data_len == 2:
+                if tag_data[0] == "CMDB_AS_ID":
+                    cmdb_tags["CMDB_AS_ID"] = tag_data[1]
+                elif tag_data[0] == "CMDB_GAS_ID":
+                    cmdb_tags["CMDB_GAS_ID"] = tag_data[1]
+                elif tag_data[0] == "CMDB_ENV":
+                    cmdb_tags["CMDB_ENV"] = tag_data[1]
+                elif tag_data[0] == "CMDB_CRIT":
+                    cmdb_tags["CMDB_CRIT"] = tag_data[1]
+                else:
+                    cmdb_tags[tag_data[0]] = tag_data[1]
+            elif tag_data_len == 1:
+                if len(tag_data[0]) > 0:
+                    cmdb_tags[tag_data[0]] = "unknown"
+
+        labels = {**labels, **cmdb_tags}
+
+        inventory["vms"].append({"id": vm.get("id", "unknown"),
+                                 "name": vm.get("name", "unknown"),
+                                 "host_id": vm.get("host", {}).get("id", "unknown"),
+                                 "cluster_id": vm.get("cluster", {}).get("id", "unknown"),
+                                 "status": vm.get("status", "unknown"),
+                                 "memory": int(vm.get("memory", 0)),
+                                 "cpu_usage": statistic_datum(vm.get("statistics", {}), "cpu.current.total"),
+                                 "memory_used": statistic_datum(vm.get("statistics", {}), "memory.used"),
+                                 "nics_rx": sum(statistic_datum(item.get("statistics", {}), "data.current.rx")
+                                                for item in vm.get("nics", {}).get("nic", {})),
+                                 "nics_tx": sum(statistic_datum(item.get("statistics", {}), "data.current.tx")
+                                                for item in vm.get("nics", {}).get("nic", {})),
+                                 "disks": {item.get("disk", {}).get("id", "unknown"): int(item.get("disk", {}).get("actual_size", 0))
+                                           for item in vm.get("disk_attachments", {}).get("disk_attachment", {})},
+                                 "storage_domain_ids": sorted({storage_domain.get("id", "unknown")
+                                                               for item in vm.get("disk_attachments", {}).get("disk_attachment", {})
+                                                               for storage_domain in item.get("disk", {}).get("storage_domains", {}).get("storage_domain", [])}),
+                                 "tags": [item.get("name", "unknown") for item in vm.get("tags", {}).get("tag", {})]})
+
+        object_labels = labels
+        labels = render_labels(labels)
+        lines.append("# HELP next_run_configuration_exists Are there any configuration changes made to the VM that are pending confirmation (bool).\n")
+        lines.append("# TYPE next_run_configuration_exists gauge\n")
+        lines.append(f"next_run_configuration_exists{{{labels}}} {1 if vm.get('next_run_configuration_exists', 'false') == 'true' else 0}\n")
+        lines.append("# HELP run_once Is VM Run Once (bool).\n")
+        lines.append("# TYPE run_once gauge\n")
+        lines.append(f"run_once{{{labels}}} {1 if vm.get('run_once', 'false') == 'true' else 0}\n")
+        lines.append("# HELP creation_time VM creation date (timestamp).\n")
+        lines.append("# TYPE creation_time gauge\n")
+        lines.append(f"creation_time{{{labels}}} {vm.get('creation_time', 0)}\n")
+        lines.append("# HELP start_time VM start date (timestamp).\n")
+        lines.append("# TYPE start_time gauge\n")
+        lines.append(f"start_time{{{labels}}} {vm.get('start_time', 0)}\n")
+        lines.append("# HELP stop_time VM stop date (timestamp).\n")
+        lines.append("# TYPE stop_time gauge\n")
+        lines.append(f"stop_time{{{labels}}} {vm.get('stop_time', 0)}\n")
+        lines.append("# HELP status VM status (bool).\n")
+        lines.append("# TYPE status gauge\n")
+        lines.append(f"status{{{labels}}} {1 if vm.get('status', 'down') == 'up' else 0}\n")
+        lines.append("# HELP boot_menu_enabled Is the VM boot menu enabled (bool).\n")
+        lines.append("# TYPE boot_menu_enabled gauge\n")
+        lines.append(f"boot_menu_enabled{{{labels}}} {1 if vm.get('bios', {}).get('boot_menu', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP cpu_mode Current CPU mode: 0/1/2/3 - custom/host_model/host_passthrough/unknown (number).\n")
+        lines.append("# TYPE cpu_mode gauge\n")
+        lines.append(f"cpu_mode{{{labels}}} { {'custom': 0, 'host_model': 1, 'host_passthrough': 2, 'unknown': 3}.get(vm.get('cpu', {}).get('mode', 'unknown'))}\n")
+        lines.append("# HELP cpu_topology_cores Number of VM CPU cores (number).\n")
+        lines.append("# TYPE cpu_topology_cores gauge\n")
+        lines.append(f"cpu_topology_cores{{{labels}}} {vm.get('cpu', {}).get('topology', {}).get('cores', 0)}\n")
+        lines.append("# HELP cpu_topology_sockets Number of VM CPU sockets (number).\n")
+        lines.append("# TYPE cpu_topology_sockets gauge\n")
+        lines.append(f"cpu_topology_sockets{{{labels}}} {vm.get('cpu', {}).get('topology', {}).get('sockets', 0)}\n")
+        lines.append("# HELP cpu_topology_threads Number of VM CPU threads (number).\n")
+        lines.append("# TYPE cpu_topology_threads gauge\n")
+        lines.append(f"cpu_topology_threads{{{labels}}} {vm.get('cpu', {}).get('topology', {}).get('threads', 0)}\n")
+        lines.append("# HELP placement_policy_affinity The configuration of the virtual machine’s placement policy: 0/1/2/3 - migratable/pinned/user_migratable/unknown (number).\n")
+        lines.append("# TYPE placement_policy_affinity gauge\n")
+        lines.append(f"placement_policy_affinity{{{labels}}} { {'migratable': 0, 'pinned': 1, 'user_migratable': 2, 'unknown': 3}.get(vm.get('placement_policy', {}).get('affinity', 'unknown'))}\n")
+        lines.append("# HELP storage_error_resume_behaviour Determines how the virtual machine will be resumed after storage error: 0/1/2/3 - auto_resume/kill/leave_paused/unknown (number).\n")
+        lines.append("# TYPE storage_error_resume_behaviour gauge\n")
+        lines.append(f"storage_error_resume_behaviour{{{labels}}} { {'auto_resume': 0, 'kill': 1, 'leave_paused': 2, 'unknown': 3}.get(vm.get('storage_error_resume_behaviour', 'unknown'))}\n")
+        lines.append("# HELP io_threads Number of I/O threads. VirtIO disks are pinned to an I/O thread using a round-robin algorithm (number).\n")
+        lines.append("# TYPE io_threads gauge\n")
+        lines.append(f"io_threads{{{labels}}} {vm.get('io', {}).get('threads', 0)}\n")
+        lines.append("# HELP memory Assigned memory during configuration (bytes).\n")
+        lines.append("# TYPE memory gauge\n")
+        lines.append(f"memory{{{labels}}} {vm.get('memory', 0)}\n")
+        lines.append("# HELP stateless VM is stateless (bool)?\n")
+        lines.append("# TYPE stateless gauge\n")
+        lines.append(f"stateless{{{labels}}} {1 if vm.get('stateless', 'false') == 'true' else 0}\n")
+        lines.append("# HELP usb_enabled VM USB is enabled (bool)?\n")
+        lines.append("# TYPE usb_enabled gauge\n")
+        lines.append(f"usb_enabled{{{labels}}} {1 if vm.get('usb', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP cpu_shares CPU shares weight (0 == auto) (number).\n")
+        lines.append("# TYPE cpu_shares gauge\n")
+        lines.append(f"cpu_shares{{{labels}}} {vm.get('cpu_shares', 0)}\n")
+        lines.append("# HELP delete_protected Is the VM protected from deletion (bool).\n")
+        lines.append("# TYPE delete_protected gauge\n")
+        lines.append(f"delete_protected{{{labels}}} {1 if vm.get('delete_protected', 'false') == 'true' else 0}\n")
+        lines.append("# HELP high_availability_enabled VM HA is enabled (bool).\n")
+        lines.append("# TYPE high_availability_enabled gauge\n")
+        lines.append(f"high_availability_enabled{{{labels}}} {1 if vm.get('high_availability', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP high_availability_priority VM HA priority (number).\n")
+        lines.append("# TYPE high_availability_priority gauge\n")
+        lines.append(f"high_availability_priority{{{labels}}} {vm.get('high_availability', {}).get('priority', 0)}\n")
+        lines.append("# HELP memory_policy_ballooning This parameter enables the memory balancing device for the virtual machine. For this device to work, memory overcommitment must be enabled in the cluster (bool).\n")
+        lines.append("# TYPE memory_policy_ballooning gauge\n")
+        lines.append(f"memory_policy_ballooning{{{labels}}} {1 if vm.get('memory_policy', {}).get('ballooning', 'false') == 'true' else 0}\n")
+        lines.append("# HELP memory_policy_guaranteed VM guaranteed memory (bytes).\n")
+        lines.append("# TYPE memory_policy_guaranteed gauge\n")
+        lines.append(f"memory_policy_guaranteed{{{labels}}} {vm.get('memory_policy', {}).get('guaranteed', 0)}\n")
+        lines.append("# HELP memory_policy_max VM max memory (bytes).\n")
+        lines.append("# TYPE memory_policy_max gauge\n")
+        lines.append(f"memory_policy_max{{{labels}}} {vm.get('memory_policy', {}).get('max', 0)}\n")
+        lines.append("# HELP migration_downtime Max allowed VM downtime during live migration (-1 == cluster default) (number).\n")
+        lines.append("# TYPE migration_downtime gauge\n")
+        lines.append(f"migration_downtime{{{labels}}} {vm.get('migration_downtime', 0)}\n")
+        lines.append("# HELP multi_queues_enabled This setting allows multiple queues. You can create up to four queues on each virtual network card, depending on the number of available vCPUs (bool).\n")
+        lines.append("# TYPE multi_queues_enabled gauge\n")
+        lines.append(f"multi_queues_enabled{{{labels}}} {1 if vm.get('multi_queues_enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP start_paused 1 if start paused VM enabled (bool).\n")
+        lines.append("# TYPE start_paused gauge\n")
+        lines.append(f"start_paused{{{labels}}} {1 if vm.get('start_paused', 'false') == 'true' else 0}\n")
+        lines.append("# HELP virtio_scsi_multi_queues_enabled 1 if multiqueue virtio-scsi enabled (bool).\n")
+        lines.append("# TYPE virtio_scsi_multi_queues_enabled gauge\n")
+        lines.append(f"virtio_scsi_multi_queues_enabled{{{labels}}} {1 if vm.get('virtio_scsi_multi_queues_enabled', 'false') == 'true' else 0}\n")
+
+        for item in vm.get("statistics", {}).get("statistic", {}) if family_enabled("vm_statistics") else []:
+            if ".history" not in item.get("name", "unknown"):
+                if item.get("type", "unknown") != "string":
+                    lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} {item.get('description', 'unknown')} ({item.get('unit', 'unknown')}).\n")
+                    lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} {item.get('kind', 'unknown')}\n")
+                    lines.append(f"{item.get('name', 'unknown').replace('.', '_')}{{{labels}}} {item.get('values', {}).get('value', {})[0].get('datum', 0)
+                    if len(item.get('values', {})) > 0
+                    else 0}\n")
+                elif family_enabled("guest_filesystems"):
+                    load_str_stats = json.loads(item.get("values", {}).get("value", {})[0].get("detail", 0)
+                                                if len(item.get('values', {})) > 0
+                                                else "[]")
+                    for str_stat in load_str_stats:
+                        labels_str_stats = render_labels({**object_labels,
+                                                          "path": str_stat["path"],
+                                                          "fs": str_stat["fs"]})
+                        lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} Disk total space ({str_stat["path"]}, {str_stat["fs"]}) ({item.get('unit', 'unknown')}).\n")
+                        lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} gauge\n")
+                        lines.append(f"fs_total{{{labels_str_stats}}} {str_stat['total']}\n")
+                        lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} Disk space used ({str_stat["path"]}, {str_stat["fs"]}) ({item.get('unit', 'unknown')}).\n")
+                        lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} gauge\n")
+                        lines.append(f"fs_used{{{labels_str_stats}}} {str_stat['used']}\n")
+                        lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} Disk space used ({str_stat["path"]}, {str_stat["fs"]}) (percent).\n")
+                        lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} gauge\n")
+                        lines.append(f"fs_percentage{{{labels_str_stats}}} {float((int(str_stat['used']) / int(str_stat['total'])) * 100):.2f}\n")
+            elif HISTORY_ENABLED and metric_allowed(item.get('name', 'unknown').replace('.', '_')):
+                metric_name = item.get('name', 'unknown').replace('.', '_')
+                family = inventory["history"].setdefault(metric_name, {"help": f"{item.get('description', 'unknown')} ({item.get('unit', 'unknown')}).",
+                                                                       "samples": []})
+                history_labels = render_labels(object_labels, ",")
+                values = item.get("values", {}).get("value", [])
+                points = []
+                for position, value in enumerate(values):
+                    if "date" in value:
+                        points.append((int(value["date"]) / 1000, value.get("datum", 0)))
+                    elif HISTORY_SAMPLE_INTERVAL > 0:
+                        points.append((int(inventory["collected"] // HISTORY_SAMPLE_INTERVAL) * HISTORY_SAMPLE_INTERVAL - (len(values) - 1 - position) * HISTORY_SAMPLE_INTERVAL, value.get("datum", 0)))
+                    else:
+                        inventory["history_dropped"] += 1
+                for timestamp, datum in sorted(points):
+                    family["samples"].append(f"{metric_name}{{{history_labels}}} {datum} {timestamp}\n")
+
+        for item in vm.get("nics", {}).get("nic", {}) if family_enabled("vm_nics") else []:
+            labels_str_stats = render_labels({**object_labels,
+                                              "interface": item.get("interface", "unknown"),
+                                              "nic_mac": item.get("mac", {}).get("address", "unknown"),
+                                              "nic_profile_id": item.get("vnic_profile", {}).get("id", "unknown"),
+                                              **({"nic_profile_name": resolve(inventory, "vnic_profiles", item.get("vnic_profile", {}).get("id", "unknown")),
+                                                  "network_name": resolve(inventory, "networks", resolve(inventory, "vnic_profiles", item.get("vnic_profile", {}).get("id", "unknown"), "network_id"))}
+                                                 if "vnicprofiles" in COLLECTORS else {}),
+                                              "nic_name": item.get("name", "unknown"),
+                                              "nic_id": item.get("id", "unknown")})
+
+            lines.append(f"# HELP plugged 1 if the VM network interface is plugged (attached) to the VM, else 0 (bool).\n")
+            lines.append(f"# TYPE plugged gauge\n")
+            lines.append(f"plugged{{{labels_str_stats}}} {1 if item.get('plugged', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP synced 1 if the VM network interface configuration is fully synced with next-run settings, else 0 (bool).\n")
+            lines.append(f"# TYPE synced gauge\n")
+            lines.append(f"synced{{{labels_str_stats}}} {1 if item.get('synced', 'false') == 'true' else 0}\n")
+
+            for nic_item in item.get("statistics", {}).get("statistic", {}):
+                lines.append(f"# HELP {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('description', 'unknown')} ({nic_item.get('unit', 'unknown')}).\n")
+                lines.append(f"# TYPE {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('kind', 'unknown')}\n")
+                lines.append(f"{nic_item.get('name', 'unknown').replace('.', '_')}{{{labels_str_stats}}} {nic_item.get('values', {}).get('value', {})[0].get('datum', 0)
+                if len(nic_item.get('values', {})) > 0
+                else 0}\n")
+
+        for item in vm.get("disk_attachments", {}).get("disk_attachment", {}) if family_enabled("vm_disks") and DISK_COLLECTOR else []:
+            labels_str_stats = render_labels({"vm_id": vm.get("id", "unknown"),
+                                              "vm_name": vm.get("name", "unknown"),
+                                              "disk_id": item.get("disk", {}).get("id", item.get("id", "unknown")),
+                                              "logical_name": item.get("logical_name", "unknown"),
+                                              "interface": item.get("interface", "unknown"),
+                                              "bootable": item.get("bootable", "false"),
+                                              "read_only": item.get("read_only", "false")})
+
+            lines.append("# HELP vm_disk_attachment Disk attached to the VM, 1 if the attachment is active, else 0 (bool).\n")
+            lines.append("# TYPE vm_disk_attachment gauge\n")
+            lines.append(f"vm_disk_attachment{{{labels_str_stats}}} {1 if item.get('active', 'false') == 'true' else 0}\n")
+
+        for item in vm.get("disk_attachments", {}).get("disk_attachment", {}) if family_enabled("vm_disks") and not DISK_COLLECTOR else []:
+            labels_str_stats = render_labels({**object_labels,
+                                              "logical_name": item.get("logical_name", "unknown"),
+                                              "alias": item.get("disk", {}).get('alias', "unknown"),
+                                              "disk_name": item.get("disk", {}).get('name', "unknown"),
+                                              "disk_id": item.get("disk", {}).get('id', "unknown"),
+                                              "image_id": item.get("disk", {}).get('image_id', "unknown"),
+                                              "disk_profile_id": item.get("disk", {}).get('disk_profile', {}).get("id", "unknown"),
+                                              "disk_profile_name": resolve(inventory, "disk_profiles", item.get("disk", {}).get('disk_profile', {}).get("id", "unknown")),
+                                              "quota_id": item.get("disk", {}).get('quota', {}).get("id", "unknown"),
+                                              "quota_name": resolve(inventory, "quotas", item.get("disk", {}).get('quota', {}).get("id", "unknown")),
+                                              "storage_domain_id": item.get("disk", {}).get('storage_domains', {}).get("storage_domain", {})[0].get("id", "unknown"),
+                                              "storage_domain_name": resolve(inventory, "storage_domains", item.get("disk", {}).get('storage_domains', {}).get("storage_domain", {})[0].get("id", "unknown"))})
+
+            lines.append(f"# HELP interface The type of interface driver used to connect the disk device to the virtual machine: 0/1/2/3/4/5 - ide/sata/spapr_vscsi/virtio/virtio_scsi/unknown (number).\n")
+            lines.append(f"# TYPE interface gauge\n")
+            lines.append(f"interface{{{labels_str_stats}}} { {'ide': 0, 'sata': 1, 'spapr_vscsi': 2, 'virtio': 3, 'virtio_scsi': 4, 'unknown': 5}.get(item.get('interface', 'unknown'))}\n")
+            lines.append(f"# HELP disk_backup The backup behavior supported by the disk: 0/1/2 - incremental/none/unknown (number).\n")
+            lines.append(f"# TYPE disk_backup gauge\n")
+            lines.append(f"disk_backup{{{labels_str_stats}}} { {'incremental': 0, 'none': 1, 'unknown': 2}.get(item.get('disk', {}).get('backup', 'unknown'))}\n")
+            lines.append(f"# HELP disk_content_type Indicates the actual content residing on the disk: 0/1/2/3/4/5/6/7/8/9/10 - backup_scratch/data/hosted_engine/hosted_engine_configuration/hosted_engine_metadata/hosted_engine_sanlock/iso/memory_dump_volume/memory_metadata_volume/ovf_store/unknown (number).\n")
+            lines.append(f"# TYPE disk_content_type gauge\n")
+            lines.append(f"disk_content_type{{{labels_str_stats}}} { {'backup_scratch': 0, 'data': 1, 'hosted_engine': 2,
+                                                                      'hosted_engine_configuration': 3, 'hosted_engine_metadata': 4, 'hosted_engine_sanlock': 5,
+                                                                      'iso': 6, 'memory_dump_volume': 7, 'memory_metadata_volume': 8,
+                                                                      'ovf_store': 9, 'unknown': 10}.get(item.get('disk', {}).get('content_type', 'unknown'))}\n")
+            lines.append(f"# HELP disk_format The underlying storage format: 0/1/2 - cow/raw/unknown (number).\n")
+            lines.append(f"# TYPE disk_format gauge\n")
+            lines.append(f"disk_format{{{labels_str_stats}}} { {'cow': 0, 'raw': 1, 'unknown': 2}.get(item.get('disk', {}).get('format', 'unknown'))}\n")
+            lines.append(f"# HELP disk_qcow_version The underlying QCOW version of a QCOW volume: 0/1/2 - qcow2_v2/qcow2_v3/unknown (number).\n")
+            lines.append(f"# TYPE disk_qcow_version gauge\n")
+            lines.append(f"disk_qcow_version{{{labels_str_stats}}} { {'qcow2_v2': 0, 'qcow2_v3': 1, 'unknown': 2}.get(item.get('disk', {}).get('qcow_version', 'unknown'))}\n")
+            lines.append(f"# HELP disk_storage_type Disk storage type: 0/1/2/3/4 - cinder/image/lun/managed_block_storage/unknown (number).\n")
+            lines.append(f"# TYPE disk_storage_type gauge\n")
+            lines.append(f"disk_storage_type{{{labels_str_stats}}} { {'cinder': 0, 'image': 1, 'lun': 2, 'managed_block_storage': 3,'unknown': 4}.get(item.get('disk', {}).get('storage_type', 'unknown'))}\n")
+            lines.append(f"# HELP active 1 if the disk is currently active (attached and in case), else 0 (bool).\n")
+            lines.append(f"# TYPE active gauge\n")
+            lines.append(f"active{{{labels_str_stats}}} {1 if item.get('active', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP bootable 1 if the disk is marked as bootable for the VM, else 0 (bool).\n")
+            lines.append(f"# TYPE bootable gauge\n")
+            lines.append(f"bootable{{{labels_str_stats}}} {1 if item.get('bootable', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP pass_discard 1 if discard/UNMAP/TRIM operations from the guest are passed to storage, else 0 (bool).\n")
+            lines.append(f"# TYPE pass_discard gauge\n")
+            lines.append(f"pass_discard{{{labels_str_stats}}} {1 if item.get('pass_discard', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP read_only 1 if the disk is attached as read-only, else 0 (bool).\n")
+            lines.append(f"# TYPE read_only gauge\n")
+            lines.append(f"read_only{{{labels_str_stats}}} {1 if item.get('read_only', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP uses_scsi_reservation 1 if SCSI reservations are enabled for this disk, else 0 (bool).\n")
+            lines.append(f"# TYPE uses_scsi_reservation gauge\n")
+            lines.append(f"uses_scsi_reservation{{{labels_str_stats}}} {1 if item.get('uses_scsi_reservation', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP actual_size Actual allocated size of the disk on storage (bytes).\n")
+            lines.append(f"# TYPE actual_size gauge\n")
+            lines.append(f"actual_size{{{labels_str_stats}}} {item.get("disk", {}).get('actual_size', 0)}\n")
+            lines.append(f"# HELP propagate_errors 1 if disk I/O errors propagate to the guest (fatal), else 0 (bool).\n")
+            lines.append(f"# TYPE propagate_errors gauge\n")
+            lines.append(f"propagate_errors{{{labels_str_stats}}} {1 if item.get("disk", {}).get('propagate_errors', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP provisioned_size Provisioned (virtual) size of the disk (bytes).\n")
+            lines.append(f"# TYPE provisioned_size gauge\n")
+            lines.append(f"provisioned_size{{{labels_str_stats}}} {item.get("disk", {}).get('provisioned_size', 0)}\n")
+            lines.append(f"# HELP shareable 1 if the disk is marked as shareable between VMs, else 0 (bool).\n")
+            lines.append(f"# TYPE shareable gauge\n")
+            lines.append(f"shareable{{{labels_str_stats}}} {1 if item.get("disk", {}).get('shareable', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP sparse 1 if the disk is thin-provisioned (sparse), else 0 (bool).\n")
+            lines.append(f"# TYPE sparse gauge\n")
+            lines.append(f"sparse{{{labels_str_stats}}} {1 if item.get("disk", {}).get('sparse', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP status 1 if the disk status is ok, else 0 (bool).\n")
+            lines.append(f"# TYPE status gauge\n")
+            lines.append(f"status{{{labels_str_stats}}} {1 if item.get("disk", {}).get('status', 'fail') == 'ok' else 0}\n")
+            lines.append(f"# HELP total_size Total space consumed by the disk on storage (bytes).\n")
+            lines.append(f"# TYPE total_size gauge\n")
+            lines.append(f"total_size{{{labels_str_stats}}} {item.get("disk", {}).get('total_size', 0)}\n")
+            lines.append(f"# HELP wipe_after_delete 1 if secure wipe after delete is enabled, else 0 (bool).\n")
+            lines.append(f"# TYPE wipe_after_delete gauge\n")
+            lines.append(f"wipe_after_delete{{{labels_str_stats}}} {1 if item.get("disk", {}).get('wipe_after_delete', 'false') == 'true' else 0}\n")
+
+            for disk_item in item.get("statistics", {}).get("statistic", {}):
+                lines.append(f"# HELP {disk_item.get('name', 'unknown').replace('.', '_')} {disk_item.get('description', 'unknown')} ({disk_item.get('unit', 'unknown')}).\n")
+                lines.append(f"# TYPE {disk_item.get('name', 'unknown').replace('.', '_')} {disk_item.get('kind', 'unknown')}\n")
+                lines.append(f"{disk_item.get('name', 'unknown').replace('.', '_')}{{{labels_str_stats}}} {disk_item.get('values', {}).get('value', {})[0].get('datum', 0)
+                if len(disk_item.get('values', {})) > 0
+                else 0}\n")
+
+        for item in vm.get("snapshots", {}).get("snapshot", {}) if family_enabled("snapshots") else []:
+            if len(item.get("disks", {}).get("disk", {})) > 0:
+                for snap_item in item.get("disks", {}).get("disk", {}):
+                    labels_str_stats = render_labels({**object_labels,
+                                                      "snapshot_id": snap_item.get("snapshot", {}).get("id", "unknown"),
+                                                      "alias": snap_item.get('alias', "unknown"),
+                                                      "backup": snap_item.get('backup', "unknown"),
+                                                      "content_type": snap_item.get('content_type', "unknown"),
+                                                      "format": snap_item.get('format', "unknown"),
+                                                      "image_id": snap_item.get('image_id', "unknown"),
+                                                      "storage_type": snap_item.get('storage_type', "unknown"),
+                                                      "disk_profile_id": snap_item.get("disk", {}).get('disk_profile', {}).get("id", "unknown"),
+                                                      "quota_id": snap_item.get("disk", {}).get('quota', {}).get("id", "unknown"),
+                                                      "storage_domain_id": snap_item.get('storage_domains', {}).get("storage_domain", {})[0].get("id", "unknown"),
+                                                      "storage_domain_name": resolve(inventory, "storage_domains", snap_item.get('storage_domains', {}).get("storage_domain", {})[0].get("id", "unknown"))})
+
+                    lines.append(f"date{{{labels_str_stats}}} {item.get('date')}\n")
+                    lines.append(f"persist_memorystate{{{labels_str_stats}}} {1 if item.get('persist_memorystate', 'false') == 'true' else 0}\n")
+                    lines.append(f"snapshot_status{{{labels_str_stats}}} {1 if item.get('snapshot_status', 'fail') == 'ok' else 0}\n")
+                    lines.append(f"snapshot_type{{{labels_str_stats}}} {1 if item.get('snapshot_type', 'inactive') == 'active' else 0}\n")
+                    lines.append(f"actual_size{{{labels_str_stats}}} {snap_item.get('actual_size', 0)}\n")
+                    lines.append(f"propagate_errors{{{labels_str_stats}}} {1 if snap_item.get('propagate_errors', 'false') == 'true' else 0}\n")
+                    lines.append(f"provisioned_size{{{labels_str_stats}}} {snap_item.get('provisioned_size', 0)}\n")
+                    lines.append(f"shareable{{{labels_str_stats}}} {1 if snap_item.get('shareable', 'false') == 'true' else 0}\n")
+                    lines.append(f"sparse{{{labels_str_stats}}} {1 if snap_item.get('sparse', 'false') == 'true' else 0}\n")
+                    lines.append(f"status{{{labels_str_stats}}} {1 if snap_item.get('status', 'fail') == 'ok' else 0}\n")
+                    lines.append(f"total_size{{{labels_str_stats}}} {snap_item.get('total_size', 0)}\n")
+                    lines.append(f"wipe_after_delete{{{labels_str_stats}}} {1 if snap_item.get('wipe_after_delete', 'false') == 'true' else 0}\n")
+
+    return filter_series("vms", lines)
+
+
+@register_collector("hosts", depends=("clusters", "datacenters"), cost=3)
+async def get_hosts_statistics(session, token, inventory):
+    follow = follow_param(("host_statistics", "statistics"),
+                          ("host_nics", "nics.statistics"),
+                          (None, "tags"))
+    if COLLECTOR_BACKEND == "dwh":
+        hosts_statistics = await get_dwh_hosts()
+    else:
+        hosts_statistics = await get_json(session, token, f"hosts?follow={follow}")
+
+    await wait_dependencies(inventory)
+
+    lines = []
+
+    for host in hosts_statistics["host"]:
+        labels = {"object_type": "host",
+                  "address": host.get("address", "unknown"),
+                  "name": host.get("name", "unknown"),
+                  "id": host.get("id", "unknown"),
+                  "certificate_organization": host.get("certificate", {}).get("organization", "unknown"),
+                  "certificate_subject": host.get("certificate", {}).get("subject", "unknown"),
+                  "cpu_name": host.get("cpu", {}).get("name", "unknown"),
+                  "cpu_type": host.get("cpu", {}).get("type", "unknown"),
+                  "hardware_information_family": host.get("hardware_information", {}).get("family", "unknown"),
+                  "hardware_information_manufacturer": host.get("hardware_information", {}).get("manufacturer", "unknown"),
+                  "hardware_information_product_name": host.get("hardware_information", {}).get("product_name", "unknown"),
+                  "hardware_information_serial_number": host.get("hardware_information", {}).get("serial_number", "unknown"),
+                  "hardware_information_uuid": host.get("hardware_information", {}).get("uuid", "unknown"),
+                  "hardware_information_version": host.get("hardware_information", {}).get("version", "unknown"),
+                  "iscsi_initiator": host.get("iscsi", {}).get("initiator", "unknown"),
+                  "libvirt_version_build": host.get("libvirt_version", {}).get("build", "unknown"),
+                  "libvirt_version_full_version": host.get("libvirt_version", {}).get("full_version", "unknown"),
+                  "libvirt_version_major": host.get("libvirt_version", {}).get("major", "unknown"),
+                  "libvirt_version_minor": host.get("libvirt_version", {}).get("minor", "unknown"),
+                  "libvirt_version_revision": host.get("libvirt_version", {}).get("revision", "unknown"),
+                  "os_type": host.get("os", {}).get("type", "unknown"),
+                  "os_version_full_version": host.get("os", {}).get("version", {}).get("full_version", "unknown"),
+                  "os_version_major": host.get("os", {}).get("version", {}).get("major", "unknown"),
+                  "os_version_minor": host.get("os", {}).get("version", {}).get("minor", "unknown"),
+                  "version_build": host.get("version", {}).get('build', 'unknown'),
+                  "version_full_version": host.get("version", {}).get('full_version', 'unknown'),
+                  "version_major": host.get("version", {}).get('major', 'unknown'),
+                  "version_minor": host.get("version", {}).get('minor', 'unknown'),
+                  "version_revision": host.get("version", {}).get('revision', 'unknown'),
+                  "vgpu_placement": host.get('vgpu_placement', 'unknown'),
+                  "cluster_id": host.get('cluster', {}).get('id', 'unknown')}
+
+        labels["cluster_name"] = resolve(inventory, "clusters", labels["cluster_id"])
+        labels["data_center_id"] = resolve(inventory, "clusters", labels["cluster_id"], "data_center_id")
+        labels["data_center_name"] = resolve(inventory, "data_centers", labels["data_center_id"])
+
+        inventory["hosts"][host.get("id", "unknown")] = {"name": host.get("name", "unknown"),
+                                                         "cluster_id": host.get("cluster", {}).get("id", "unknown"),
+                                                         "status": host.get("status", "unknown"),
+                                                         "tags": [item.get("name", "unknown") for item in host.get("tags", {}).get("tag", {})]}
+
+        object_labels = labels
+        labels = render_labels(labels)
+        lines.append("# HELP auto_numa_status The host auto non uniform memory access (NUMA) status: 0/1/2 - disable/enable/unknown (number).\n")
+        lines.append("# TYPE auto_numa_status gauge\n")
+        lines.append(f"auto_numa_status{{{labels}}} { {'disable': 0, 'enable': 1, 'unknown': 2}.get(host.get('auto_numa_status', 'unknown'))}\n")
+        lines.append("# HELP cpu_speed Current CPU speed (MHz).\n")
+        lines.append("# TYPE cpu_speed gauge\n")
+        lines.append(f"cpu_speed{{{labels}}} {host.get('cpu', {}).get('speed', 0)}\n")
+        lines.append("# HELP cpu_topology_cores Number of VM CPU cores (number).\n")
+        lines.append("# TYPE cpu_topology_cores gauge\n")
+        lines.append(f"cpu_topology_cores{{{labels}}} {host.get('cpu', {}).get('topology', {}).get('cores', 0)}\n")
+        lines.append("# HELP cpu_topology_sockets Number of VM CPU sockets (number).\n")
+        lines.append("# TYPE cpu_topology_sockets gauge\n")
+        lines.append(f"cpu_topology_sockets{{{labels}}} {host.get('cpu', {}).get('topology', {}).get('sockets', 0)}\n")
+        lines.append("# HELP cpu_topology_threads Number of VM CPU threads (number).\n")
+        lines.append("# TYPE cpu_topology_threads gauge\n")
+        lines.append(f"cpu_topology_threads{{{labels}}} {host.get('cpu', {}).get('topology', {}).get('threads', 0)}\n")
+        lines.append("# HELP device_passthrough_enabled Specifies whether host device passthrough is enabled on this host (bool).\n")
+        lines.append("# TYPE device_passthrough_enabled gauge\n")
+        lines.append(f"device_passthrough_enabled{{{labels}}} {1 if host.get('device_passthrough', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP external_status The host external status: 0/1/2/3/4/5 - error/failure/info/ok/warning/unknown (number).\n")
+        lines.append("# TYPE external_status gauge\n")
+        lines.append(f"external_status{{{labels}}} { {'error': 0, 'failure': 1, 'info': 2, 'ok': 3, 'warning': 4, 'unknown': 5}.get(host.get('external_status', 'unknown'))}\n")
+        lines.append("# HELP hardware_information_supported_rng_source_hwrng Obtains random data from the /dev/hwrng (usually specialized HW generator) device (bool).\n")
+        lines.append("# TYPE hardware_information_supported_rng_source_hwrng gauge\n")
+        lines.append(f"hardware_information_supported_rng_source_hwrng{{{labels}}} {1 if "hwrng" in host.get('hardware_information', {}).get('supported_rng_sources', {}).get('supported_rng_source', {}) else 0}\n")
+        lines.append("# HELP hardware_information_supported_rng_source_random Obtains random data from the /dev/random device (bool).\n")
+        lines.append("# TYPE hardware_information_supported_rng_source_random gauge\n")
+        lines.append(f"hardware_information_supported_rng_source_random{{{labels}}} {1 if "random" in host.get('hardware_information', {}).get('supported_rng_sources', {}).get('supported_rng_source', {}) else 0}\n")
+        lines.append("# HELP hardware_information_supported_rng_source_urandom Obtains random data from the /dev/urandom device (bool).\n")
+        lines.append("# TYPE hardware_information_supported_rng_source_urandom gauge\n")
+        lines.append(f"hardware_information_supported_rng_source_urandom{{{labels}}} {1 if "urandom" in host.get('hardware_information', {}).get('supported_rng_sources', {}).get('supported_rng_source', {}) else 0}\n")
+        lines.append("# HELP kdump_status The host KDUMP status. KDUMP happens when the host kernel has crashed and it is now going through memory dumping: 0/1/2 - disable/enable/unknown (number).\n")
+        lines.append("# TYPE kdump_status gauge\n")
+        lines.append(f"kdump_status{{{labels}}} { {'disabled': 0, 'enabled': 1, 'unknown': 2}.get(host.get('kdump_status', 'unknown'))}\n")
+        lines.append("# HELP ksm_enabled Kernel SamePage Merging (KSM) reduces references to memory pages from multiple identical pages to a single page reference (bool).\n")
+        lines.append("# TYPE ksm_enabled gauge\n")
+        lines.append(f"ksm_enabled{{{labels}}} {1 if host.get('ksm', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP max_scheduling_memory The max scheduling memory on this host (bytes).\n")
+        lines.append("# TYPE max_scheduling_memory gauge\n")
+        lines.append(f"max_scheduling_memory{{{labels}}} {host.get('max_scheduling_memory', 0)}\n")
+        lines.append("# HELP memory The amount of physical memory on this host (bytes).\n")
+        lines.append("# TYPE memory gauge\n")
+        lines.append(f"memory{{{labels}}} {host.get('max_scheduling_memory', 0)}\n")
+        lines.append("# HELP numa_supported Specifies whether non uniform memory access (NUMA) is supported on this host (bool).\n")
+        lines.append("# TYPE numa_supported gauge\n")
+        lines.append(f"numa_supported{{{labels}}} {1 if host.get('numa_supported', 'false') == 'true' else 0}\n")
+        lines.append("# HELP port The host port (number).\n")
+        lines.append("# TYPE port gauge\n")
+        lines.append(f"port{{{labels}}} {host.get('port', 0)}\n")
+        lines.append("# HELP power_management_automatic_pm_enabled Toggles the automated power control of the host in order to save energy (bool).\n")
+        lines.append("# TYPE power_management_automatic_pm_enabled gauge\n")
+        lines.append(f"power_management_automatic_pm_enabled{{{labels}}} {1 if host.get('power_management', {}).get('automatic_pm_enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP power_management_enabled Indicates whether power management configuration is enabled or disabled (bool).\n")
+        lines.append("# TYPE power_management_enabled gauge\n")
+        lines.append(f"power_management_enabled{{{labels}}} {1 if host.get('power_management', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP power_management_kdump_detection Toggles whether to determine if kdump is running on the host before it is shut down (bool).\n")
+        lines.append("# TYPE power_management_kdump_detection gauge\n")
+        lines.append(f"power_management_kdump_detection{{{labels}}} {1 if host.get('power_management', {}).get('kdump_detection', 'false') == 'true' else 0}\n")
+        lines.append("# HELP power_management_pm_proxies_cluster The fence proxy is selected from the same cluster as the fenced host (bool).\n")
+        lines.append("# TYPE power_management_pm_proxies_cluster gauge\n")
+        lines.append(f"power_management_pm_proxies_cluster{{{labels}}} {1 if 'cluster' in host.get('power_management', {}).get('pm_proxies', {}) else 0}\n")
+        lines.append("# HELP power_management_pm_proxies_dc The fence proxy is selected from the same data center as the fenced host (bool).\n")
+        lines.append("# TYPE power_management_pm_proxies_dc gauge\n")
+        lines.append(f"power_management_pm_proxies_dc{{{labels}}} {1 if 'dc' in host.get('power_management', {}).get('pm_proxies', {}) else 0}\n")
+        lines.append("# HELP power_management_pm_proxies_other_dc The fence proxy is selected from a different data center than the fenced host (bool).\n")
+        lines.append("# TYPE power_management_pm_proxies_other_dc gauge\n")
+        lines.append(f"power_management_pm_proxies_other_dc{{{labels}}} {1 if 'other_dc' in host.get('power_management', {}).get('pm_proxies', {}) else 0}\n")
+        lines.append("# HELP protocol The protocol that the engine uses to communicate with the host: 0/1/2 - stomp/xml/unknown (number).\n")
+        lines.append("# TYPE protocol gauge\n")
+        lines.append(f"protocol{{{labels}}} { {'stomp': 0, 'xml': 1, 'unknown': 2}.get(host.get('protocol', 'unknown'))}\n")
+        lines.append("# HELP reinstallation_required Specifies whether the host should be reinstalled (bool).\n")
+        lines.append("# TYPE reinstallation_required gauge\n")
+        lines.append(f"reinstallation_required{{{labels}}} {1 if host.get('reinstallation_required', 'false') == 'true' else 0}\n")
+        lines.append("# HELP se_linux_mode The host SElinux status: 0/1/2/3 - disabled/enforcing/permissive/unknown (number).\n")
+        lines.append("# TYPE se_linux_mode gauge\n")
+        lines.append(f"se_linux_mode{{{labels}}} { {'disabled': 0, 'enforcing': 1, 'permissive': 2, 'unknown': 3}.get(host.get('se_linux', {}).get('mode', 'unknown'))}\n")
+        lines.append("# HELP spm_priority The host storage pool manager (SPM) priority (number).\n")
+        lines.append("# TYPE spm_priority gauge\n")
+        lines.append(f"spm_priority{{{labels}}} {host.get('spm', {}).get('priority', 0)}\n")
+        lines.append("# HELP spm_status The host storage pool manager (SPM) status: 0/1/2/3 - contending/none/spm/unknown (number).\n")
+        lines.append("# TYPE spm_status gauge\n")
+        lines.append(f"spm_status{{{labels}}} { {'contending': 0, 'none': 1, 'spm': 2, 'unknown': 3}.get(host.get('spm', {}).get('status', 'unknown'))}\n")
+        lines.append("# HELP ssh_port The host SSH port (number).\n")
+        lines.append("# TYPE ssh_port gauge\n")
+        lines.append(f"ssh_port{{{labels}}} {host.get('ssh', {}).get('port', 0)}\n")
+        lines.append("# HELP status The host status: 0/1/2/3/4/5/6/7/8/9/10/11/12/13/14/15 - connecting/down/error/initializing/install_failed/installing/installing_os/kdumping/maintenance/non_operational/non_responsive/pending_approval/preparing_for_maintenance/reboot/unassigned/up (number).\n")
+        lines.append("# TYPE status gauge\n")
+        lines.append(f"status{{{labels}}} { {'connecting': 0, 'down': 1, 'error': 2, 'initializing': 3, 'install_failed': 4,
+                                             'installing': 5, 'installing_os': 6, 'kdumping': 7, 'maintenance': 8,
+                                             'non_operational': 9, 'non_responsive': 10, 'pending_approval': 11, 'preparing_for_maintenance': 12,
+                                             'reboot': 13, 'unassigned': 14, 'up': 15}.get(host.get('status', 'unknown'))}\n")
+        lines.append("# HELP summary_active The number of virtual machines active on the host (number).\n")
+        lines.append("# TYPE summary_active gauge\n")
+        lines.append(f"summary_active{{{labels}}} {host.get('summary', {}).get('active', 0)}\n")
+        lines.append("# HELP summary_migrating The number of virtual machines migrating to or from the host (number).\n")
+        lines.append("# TYPE summary_migrating gauge\n")
+        lines.append(f"summary_migrating{{{labels}}} {host.get('summary', {}).get('migrating', 0)}\n")
+        lines.append("# HELP summary_total The number of virtual machines present on the host (number).\n")
+        lines.append("# TYPE summary_total gauge\n")
+        lines.append(f"summary_total{{{labels}}} {host.get('summary', {}).get('total', 0)}\n")
+        lines.append("# HELP transparent_hugepages_enabled Transparent huge page support expands the size of memory pages beyond the standard 4 KiB limit (bool).\n")
+        lines.append("# TYPE transparent_hugepages_enabled gauge\n")
+        lines.append(f"transparent_hugepages_enabled{{{labels}}} {1 if host.get('transparent_hugepages', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP type Indicates if the host contains a full installation of the operating system or a scaled-down version intended only to host virtual machines: 0/1/2/3 - ovirt_node/rhel/rhev_h/unknown (number).\n")
+        lines.append("# TYPE type gauge\n")
+        lines.append(f"type{{{labels}}} { {'ovirt_node': 0, 'rhel': 1, 'rhev_h': 2, 'unknown': 3}.get(host.get('type', 'unknown'))}\n")
+        lines.append("# HELP update_available Specifies whether there is an oVirt-related update on this host (bool).\n")
+        lines.append("# TYPE update_available gauge\n")
+        lines.append(f"update_available{{{labels}}} {1 if host.get('update_available', 'false') == 'true' else 0}\n")
+
+        for item in host.get("nics", {}).get("host_nic", {}) if family_enabled("host_nics") else []:
+            labels_str_stats = render_labels({**object_labels,
+                                              "bonding_ad_partner_mac_address": item.get("bonding", {}).get("ad_partner_mac", {}).get('address', "unknown"),
+                                              "nic_mac": item.get("mac", {}).get("address", "unknown"),
+                                              "nic_profile": item.get("vnic_profile", {}).get("id", "unknown"),
+                                              "nic_name": item.get("name", "unknown"),
+                                              "base_interface": item.get("base_interface", "unknown"),
+                                              "nic_id": item.get("id", "unknown"),
+                                              "mac_address": item.get("mac", {}).get("address", "unknown"),
+                                              "ip_address": item.get("ip", {}).get("address", "unknown"),
+                                              "ip_gateway": item.get("ip", {}).get("gateway", "unknown"),
+                                              "ip_netmask": item.get("ip", {}).get("netmask", "unknown"),
+                                              "ip_version": item.get("ip", {}).get("version", "unknown"),
+                                              "ipv6_address": item.get("ipv6", {}).get("address", "unknown"),
+                                              "ipv6_gateway": item.get("ipv6", {}).get("gateway", "unknown"),
+                                              "ipv6_netmask": item.get("ipv6", {}).get("netmask", "unknown"),
+                                              "ipv6_version": item.get("ipv6", {}).get("version", "unknown"),
+                                              "vlan_id": item.get("vlan", {}).get("id", 0)})
+
+            lines.append(f"# HELP boot_protocol The IPv4 boot protocol configuration of the NIC: 0/1/2/3/4/5 - autoconf/dhcp/none/poly_dhcp_autoconf/static/unknown (number).\n")
+            lines.append(f"# TYPE boot_protocol gauge\n")
+            lines.append(f"boot_protocol{{{labels_str_stats}}} { {'autoconf': 0, 'dhcp': 1, 'none': 2, 'poly_dhcp_autoconf': 3, 'static': 4, 'unknown': 5}.get(item.get('boot_protocol', "unknown"))}\n")
+            lines.append(f"# HELP ipv6_boot_protocol The IPv6 boot protocol configuration of the NIC: 0/1/2/3/4/5 - autoconf/dhcp/none/poly_dhcp_autoconf/static/unknown (number).\n")
+            lines.append(f"# TYPE ipv6_boot_protocol gauge\n")
+            lines.append(f"ipv6_boot_protocol{{{labels_str_stats}}} { {'autoconf': 0, 'dhcp': 1, 'none': 2, 'poly_dhcp_autoconf': 3, 'static': 4, 'unknown': 5}.get(item.get('ipv6_boot_protocol', "unknown"))}\n")
+            lines.append(f"# HELP ad_aggregator_id The ad_aggregator_id property of a bond or bond slave, for bonds in mode 4 (number).\n")
+            lines.append(f"# TYPE ad_aggregator_id gauge\n")
+            lines.append(f"ad_aggregator_id{{{labels_str_stats}}} {item.get('ad_aggregator_id', 0)}\n")
+            lines.append(f"# HELP bridged Defines the bridged network status (bool).\n")
+            lines.append(f"# TYPE bridged gauge\n")
+            lines.append(f"bridged{{{labels_str_stats}}} {1 if item.get('bridged', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP custom_configuration Indicates whether the host network interface has non-default custom configuration parameters (bool).\n")
+            lines.append(f"# TYPE custom_configuration gauge\n")
+            lines.append(f"custom_configuration{{{labels_str_stats}}} {1 if item.get('custom_configuration', 'false') == 'true' else 0}\n")
+            lines.append(f"# HELP mtu The maximum transmission unit for the interface (number).\n")
+            lines.append(f"# TYPE mtu gauge\n")
+            lines.append(f"mtu{{{labels_str_stats}}} {item.get('mtu', 0)}\n")
+            lines.append(f"# HELP speed Current negotiated link speed of the host network interface in bits per seconds (bits_per_second).\n")
+            lines.append(f"# TYPE speed gauge\n")
+            lines.append(f"speed{{{labels_str_stats}}} {item.get('speed', 0)}\n")
+            lines.append(f"# HELP ad_aggregator_id The ad_aggregator_id property of a bond or bond slave, for bonds in mode 4 (number).\n")
+            lines.append(f"# TYPE ad_aggregator_id gauge\n")
+            lines.append(f"ad_aggregator_id{{{labels_str_stats}}} {item.get('ad_aggregator_id', 0)}\n")
+            lines.append(f"# HELP status Defines the bridged network status (bool).\n")
+            lines.append(f"# TYPE status gauge\n")
+            lines.append(f"status{{{labels_str_stats}}} {1 if item.get('status', 'down') == 'up' else 0}\n")
+            lines.append(f"# HELP check_connectivity Indicates whether connectivity check is enabled for the host network interface (bool).\n")
+            lines.append(f"# TYPE check_connectivity gauge\n")
+            lines.append(f"check_connectivity{{{labels_str_stats}}} {1 if item.get('check_connectivity', 'false') == 'true' else 0}\n")
+
+            for nic_item in item.get("bonding", {}).get("options", {}).get("option", {}) if family_enabled("bonding_options") else []:
+                lines.append(f"# HELP {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('type', 'No description')} (number).\n")
+                lines.append(f"# TYPE {nic_item.get('name', 'unknown').replace('.', '_')} gauge\n")
+                lines.append(f"{nic_item.get('name', 'unknown').replace('.', '_')}{{{labels_str_stats}}} {nic_item.get('value', 0)}\n")
+
+            for nic_item in item.get("statistics", {}).get("statistic", {}):
+                lines.append(f"# HELP {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('description', 'unknown')} ({nic_item.get('unit', 'unknown')}).\n")
+                lines.append(f"# TYPE {nic_item.get('name', 'unknown').replace('.', '_')} {nic_item.get('kind', 'unknown')}\n")
+                lines.append(f"{nic_item.get('name', 'unknown').replace('.', '_')}{{{labels_str_stats}}} {nic_item.get('values', {}).get('value', {})[0].get('datum', 0)
+                if len(nic_item.get('values', {})) > 0
+                else 0}\n")
+
+        for item in host.get("statistics", {}).get("statistic", {}) if family_enabled("host_statistics") else []:
+            lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} {item.get('description', 'unknown')} ({item.get('unit', 'unknown')}).\n")
+            lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} {item.get('kind', 'unknown')}\n")
+            lines.append(f"{item.get('name', 'unknown').replace('.', '_')}{{{labels}}} {item.get('values', {}).get('value', {})[0].get('datum', 0)
+                if len(item.get('values', {})) > 0
+                else 0}\n")
+
+    return filter_series("hosts", lines)
+
+
+@register_collector("datacenters")
+async def get_datacenters_statistics(session, token, inventory):
+    follow = follow_param(("mac_pools", "mac_pool"),
+                          ("qos", "qoss"),
+                          ("quotas", "quotas,quotas.quotastoragelimits,quotas.quotaclusterlimits"))
+    datacenters_statistics = await get_json(session, token, f"datacenters?follow={follow}")
+
+    lines = []
+
+    for datacenter in datacenters_statistics["data_center"]:
+        labels = {"object_type": "data_center",
+                  "storage_format": datacenter.get("storage_format", "unknown"),
+                  "supported_versions_major": datacenter.get("supported_versions", {}).get("version", {})[0].get("major", "unknown"),
+                  "supported_versions_minor": datacenter.get("supported_versions", {}).get("version", {})[0].get("minor", "unknown"),
+                  "version_major": datacenter.get("version", {}).get("major", "unknown"),
+                  "version_minor": datacenter.get("version", {}).get("minor", "unknown"),
+                  "name": datacenter.get("name", "unknown"),
+                  "id": datacenter.get("id", "unknown")}
+
+        inventory["data_centers"][datacenter.get("id", "unknown")] = {"name": datacenter.get("name", "unknown")}
+
+        for item in datacenter.get("quotas", {}).get("quota", {}):
+            inventory["quotas"][item.get("id", "unknown")] = {"name": item.get("name", "unknown"),
+                                                              "data_center_id": datacenter.get("id", "unknown")}
+
+        object_labels = labels
+        labels = render_labels(labels)
+        lines.append("# HELP local Indicates whether the data center uses local storage (1) or shared storage (0) (bool).\n")
+        lines.append("# TYPE local gauge\n")
+        lines.append(f"local{{{labels}}} {1 if datacenter.get('local', 'false') == 'true' else 0}\n")
+        lines.append("# HELP quota_mode Indicates whether quota enforcement is enabled for this datacenter (bool).\n")
+        lines.append("# TYPE quota_mode gauge\n")
+        lines.append(f"quota_mode{{{labels}}} { {'audit': 0, 'disabled': 1, 'enabled': 2, 'unknown': 3}.get(datacenter.get('quota_mode', 'unknown'))}\n")
+        lines.append("# HELP status Datacenter status: 0/1/2/3/4/5/6 - contend/maintenance/not_operational/problematic/uninitialized/up/unknown  (number).\n")
+        lines.append("# TYPE status gauge\n")
+        lines.append(f"status{{{labels}}} { {'contend': 0, 'maintenance': 1, 'not_operational': 2, 'problematic': 3, 'uninitialized': 4, 'up': 5, 'unknown': 6}.get(datacenter.get('status', 'unknown'))}\n")
+
+        for item in datacenter.get("mac_pool", {}).get("ranges", {}).get("range", {}) if family_enabled("mac_pools") else []:
+            labels_str_stats = render_labels({**object_labels,
+                                              "mac_pool_name": item.get("mac_pool", {}).get("name", "unknown"),
+                                              "mac_pool_description": item.get("mac_pool", {}).get("description", "unknown"),
+                                              "mac_pool_id": item.get("mac_pool", {}).get("id", "unknown"),
+                                              "mac_pool_range_from": item.get("mac_pool", {}).get("ranges", {}).get("range", {}).get("from", "unknown"),
+                                              "mac_pool_range_to": item.get("mac_pool", {}).get("ranges", {}).get("range", {}).get("to", "unknown")})
+
+            lines.append("# HELP allow_duplicates Defines whether duplicate MAC addresses are permitted in the pool (number).\n")
+            lines.append("# TYPE allow_duplicates gauge\n")
+            lines.append(f"allow_duplicates{{{labels_str_stats}}} {1 if datacenter.get('mac_pool', {}).get('allow_duplicates', 'false') == 'true' else 0}\n")
+            lines.append("# HELP default_pool Defines whether this is the default pool (number).\n")
+            lines.append("# TYPE default_pool gauge\n")
+            lines.append(f"default_pool{{{labels_str_stats}}} {1 if datacenter.get('mac_pool', {}).get('default_pool', 'false') == 'true' else 0}\n")
+
+        for item in datacenter.get("qoss", {}).get("qos", {}) if family_enabled("qos") else []:
+            labels_str_stats = render_labels({**object_labels,
+                                              "qos_type": item.get("type", "unknown"),
+                                              "qos_name": item.get("name", "unknown"),
+                                              "qos_id": item.get("id", "unknown")})
+
+            lines.append("# HELP qos_max_read_iops Maximum permitted number of input operations per second (number).\n")
+            lines.append("# TYPE qos_max_read_iops gauge\n")
+            lines.append(f"qos_max_read_iops{{{labels_str_stats}}} {item.get('max_read_iops', 0)}\n")
+            lines.append("# HELP qos_max_read_throughput Maximum permitted throughput for read operations (number).\n")
+            lines.append("# TYPE qos_max_read_throughput gauge\n")
+            lines.append(f"qos_max_read_throughput{{{labels_str_stats}}} {item.get('max_read_throughput', 0)}\n")
+            lines.append("# HELP qos_max_write_iops Maximum permitted number of output operations per second (number).\n")
+            lines.append("# TYPE qos_max_write_iops gauge\n")
+            lines.append(f"qos_max_write_iops{{{labels_str_stats}}} {item.get('max_write_iops', 0)}\n")
+            lines.append("# HELP qos_max_write_throughput Maximum permitted throughput for write operations (number).\n")
+            lines.append("# TYPE qos_max_write_throughput gauge\n")
+            lines.append(f"qos_max_write_throughput{{{labels_str_stats}}} {item.get('max_write_throughput', 0)}\n")
+
+        for item in datacenter.get("quotas", {}).get("quota", {}) if family_enabled("quotas") else []:
+            labels_str_stats = render_labels({**object_labels,
+                                              "quota_name": item.get("name", "unknown"),
+                                              "quota_description": item.get("description", "unknown"),
+                                              "quota_id": item.get("id", "unknown")})
+
+            lines.append("# HELP cluster_hard_limit_pct Hard resource overcommit limit for the cluster, expressed as a percentage of physical capacity (number).\n")
+            lines.append("# TYPE cluster_hard_limit_pct gauge\n")
+            lines.append(f"cluster_hard_limit_pct{{{labels_str_stats}}} {item.get('cluster_hard_limit_pct', 0)}\n")
+            lines.append("# HELP cluster_soft_limit_pct Soft resource overcommit limit for the cluster, expressed as a percentage of physical capacity (number).\n")
+            lines.append("# TYPE cluster_soft_limit_pct gauge\n")
+            lines.append(f"cluster_soft_limit_pct{{{labels_str_stats}}} {item.get('cluster_soft_limit_pct', 0)}\n")
+            lines.append("# HELP storage_hard_limit_pct Hard storage usage limit for the datacenter, expressed as a percentage of total storage capacity (number).\n")
+            lines.append("# TYPE storage_hard_limit_pct gauge\n")
+            lines.append(f"storage_hard_limit_pct{{{labels_str_stats}}} {item.get('storage_hard_limit_pct', 0)}\n")
+            lines.append("# HELP storage_soft_limit_pct Soft storage usage limit for the datacenter, expressed as a percentage of total storage capacity (number).\n")
+            lines.append("# TYPE storage_soft_limit_pct gauge\n")
+            lines.append(f"storage_soft_limit_pct{{{labels_str_stats}}} {item.get('storage_soft_limit_pct', 0)}\n")
+
+            for quota_cluster_limit in item.get("quota_cluster_limits", {}).get("quota_cluster_limit", {}):
+                lines.append("# HELP memory_limit Memory limit for the quota at cluster level in bytes. A value of -1 indicates no limit (unlimited) (number).\n")
+                lines.append("# TYPE memory_limit gauge\n")
+                lines.append(f"memory_limit{{{labels_str_stats}}} {quota_cluster_limit.get('memory_limit', 0)}\n")
+                lines.append("# HELP memory_usage Current memory usage for the quota at cluster level in bytes (number).\n")
+                lines.append("# TYPE memory_usage gauge\n")
+                lines.append(f"memory_usage{{{labels_str_stats}}} {quota_cluster_limit.get('memory_usage', 0)}\n")
+                lines.append("# HELP vcpu_limit Virtual CPU limit for the quota at cluster level. A value of -1 indicates no limit (unlimited) (number).\n")
+                lines.append("# TYPE vcpu_limit gauge\n")
+                lines.append(f"vcpu_limit{{{labels_str_stats}}} {quota_cluster_limit.get('vcpu_limit', 0)}\n")
+                lines.append("# HELP vcpu_usage Number of virtual CPUs currently allocated under the quota at cluster level (number).\n")
+                lines.append("# TYPE vcpu_usage gauge\n")
+                lines.append(f"vcpu_usage{{{labels_str_stats}}} {quota_cluster_limit.get('vcpu_usage', 0)}\n")
+
+            for quota_storage_limit in item.get("quota_storage_limits", {}).get("quota_storage_limit", {}):
+                lines.append("# HELP limit Storage capacity limit for the quota in bytes. A value of -1 indicates no limit (unlimited) (number).\n")
+                lines.append("# TYPE limit gauge\n")
+                lines.append(f"limit{{{labels_str_stats}}} {quota_storage_limit.get('limit', 0)}\n")
+                lines.append("# HELP usage Current storage usage for the quota in bytes (number).\n")
+                lines.append("# TYPE usage gauge\n")
+                lines.append(f"usage{{{labels_str_stats}}} {quota_storage_limit.get('usage', 0)}\n")
+
+    return filter_series("datacenters", lines)
+
+
+@register_collector("clusters")
+async def get_clusters_statistics(session, token, inventory):
+    clusters_statistics = await get_json(session, token, "clusters?follow=enabledfeatures")
+
+    lines = []
+
+    for cluster in clusters_statistics["cluster"]:
+        labels = {"object_type": "cluster",
+                  "bios_type": cluster.get("bios_type", "unknown"),
+                  "cpu_architecture": cluster.get("cpu", {}).get("architecture", "unknown"),
+                  "cpu_type": cluster.get("cpu", {}).get("type", "unknown"),
+                  "migration_policy_id": cluster.get("migration", {}).get("policy", {}).get("id", "unknown"),
+                  "version_major": cluster.get("version", {}).get("major", "unknown"),
+                  "version_minor": cluster.get("version", {}).get("minor", "unknown"),
+                  "name": cluster.get("name", "unknown"),
+                  "id": cluster.get("id", "unknown")}
+
+        inventory["clusters"][cluster.get("id", "unknown")] = {"name": cluster.get("name", "unknown"),
+                                                               "data_center_id": cluster.get("data_center", {}).get("id", "unknown")}
+
+        labels = render_labels(labels)
+
+        for item in cluster.get("custom_scheduling_policy_properties", {}).get("property", {}) if family_enabled("scheduling_policy_properties") else []:
+            metric_name = "".join(f"_{c.lower()}" if c.isupper() else c for c in item.get('name', 'unknown'))[1:]
+            lines.append(f"# HELP {metric_name.replace('.', '_')} (number).\n")
+            lines.append(f"# TYPE {metric_name.replace('.', '_')} gauge\n")
+            lines.append(f"{metric_name.replace('.', '_')}{{{labels}}} {item.get('value', 0)}\n")
+
+        lines.append("# HELP error_handling_on_error Policy defining which virtual machines are migrated automatically when a cluster error or failure occurs: 0/1/2/3 - do_not_migrate/migrate/migrate_highly_available/unknown (number).\n")
+        lines.append("# TYPE error_handling_on_error gauge\n")
+        lines.append(f"error_handling_on_error{{{labels}}} { {'do_not_migrate': 0, 'migrate': 1, 'migrate_highly_available': 2, 'unknown': 3}.get(cluster.get('error_handling', {}).get('on_error', 'unknown'))}\n")
+        lines.append("# HELP firewall_type The type of firewall to be used on hosts in this cluster: 0/1/2 - firewalld/iptables/unknown (number).\n")
+        lines.append("# TYPE firewall_type gauge\n")
+        lines.append(f"firewall_type{{{labels}}} { {'firewalld': 0, 'iptables': 1, 'unknown': 2}.get(cluster.get('firewall_type', 'unknown'))}\n")
+        lines.append("# HELP ballooning_enabled Indicates whether memory ballooning is enabled for virtual machines in the cluster (bool).\n")
+        lines.append("# TYPE ballooning_enabled gauge\n")
+        lines.append(f"ballooning_enabled{{{labels}}} {1 if cluster.get('ballooning_enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP fencing_policy_enabled Enable or disable fencing on this cluster (bool).\n")
+        lines.append("# TYPE fencing_policy_enabled gauge\n")
+        lines.append(f"fencing_policy_enabled{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP fencing_policy_skip_if_connectivity_broken_enabled If enabled, we will not fence a host in case more than a configurable percentage of hosts in the cluster lost connectivity as well (bool).\n")
+        lines.append("# TYPE fencing_policy_skip_if_connectivity_broken_enabled gauge\n")
+        lines.append(f"fencing_policy_skip_if_connectivity_broken_enabled{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_connectivity_broken', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP fencing_policy_skip_if_connectivity_broken_threshold Threshold for connectivity testing (bool).\n")
+        lines.append("# TYPE fencing_policy_skip_if_connectivity_broken_threshold gauge\n")
+        lines.append(f"fencing_policy_skip_if_connectivity_broken_threshold{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_connectivity_broken', {}).get('threshold', 'false') == 'true' else 0}\n")
+        lines.append("# HELP fencing_policy_skip_if_gluster_bricks_up A flag indicating if fencing should be skipped if Gluster bricks are up and running in the host being fenced (bool).\n")
+        lines.append("# TYPE fencing_policy_skip_if_gluster_bricks_up gauge\n")
+        lines.append(f"fencing_policy_skip_if_gluster_bricks_up{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_gluster_bricks_up', 'false') == 'true' else 0}\n")
+        lines.append("# HELP fencing_policy_skip_if_gluster_quorum_not_met A flag indicating if fencing should be skipped if Gluster bricks are up and running and Gluster quorum will not be met without those bricks (bool).\n")
+        lines.append("# TYPE fencing_policy_skip_if_gluster_quorum_not_met gauge\n")
+        lines.append(f"fencing_policy_skip_if_gluster_quorum_not_met{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_gluster_quorum_not_met', 'false') == 'true' else 0}\n")
+        lines.append("# HELP fencing_policy_skip_if_sd_active_enabled If enabled, we will skip fencing in case the host maintains its lease in the storage (bool).\n")
+        lines.append("# TYPE fencing_policy_skip_if_sd_active_enabled gauge\n")
+        lines.append(f"fencing_policy_skip_if_sd_active_enabled{{{labels}}} {1 if cluster.get('fencing_policy', {}).get('skip_if_sd_active', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP fips_mode FIPS mode of the cluster (bool).\n")
+        lines.append("# TYPE fips_mode gauge\n")
+        lines.append(f"fips_mode{{{labels}}} {1 if cluster.get('fips_mode', 'disabled') == 'enabled' else 0}\n")
+        lines.append("# HELP gluster_service Indicates whether GlusterFS service is enabled for the cluster (bool).\n")
+        lines.append("# TYPE gluster_service gauge\n")
+        lines.append(f"gluster_service{{{labels}}} {1 if cluster.get('gluster_service', 'false') == 'true' else 0}\n")
+        lines.append("# HELP ha_reservation Indicates whether resource reservation for high availability is enabled for the cluster (bool).\n")
+        lines.append("# TYPE ha_reservation gauge\n")
+        lines.append(f"ha_reservation{{{labels}}} {1 if cluster.get('ha_reservation', 'false') == 'true' else 0}\n")
+        lines.append("# HELP ksm_enabled Indicates whether Kernel Samepage Merging (KSM) is enabled for the cluster (bool).\n")
+        lines.append("# TYPE ksm_enabled gauge\n")
+        lines.append(f"ksm_enabled{{{labels}}} {1 if cluster.get('ksm', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP ksm_merge_across_nodes Indicates whether Kernel Samepage Merging (KSM) is allowed to merge identical memory pages across NUMA nodes in the cluster (bool).\n")
+        lines.append("# TYPE ksm_merge_across_nodes gauge\n")
+        lines.append(f"ksm_merge_across_nodes{{{labels}}} {1 if cluster.get('ksm', {}).get('merge_across_nodes', 'false') == 'true' else 0}\n")
+        lines.append("# HELP log_max_memory_used_threshold The memory consumption threshold for logging audit log events (number).\n")
+        lines.append("# TYPE log_max_memory_used_threshold gauge\n")
+        lines.append(f"log_max_memory_used_threshold{{{labels}}} {cluster.get('log_max_memory_used_threshold', 0)}\n")
+        lines.append("# HELP log_max_memory_used_threshold_type The memory consumption threshold type for logging audit log events (1 if percentage, 0 if absolute_value_in_mb) (bool).\n")
+        lines.append("# TYPE log_max_memory_used_threshold_type gauge\n")
+        lines.append(f"log_max_memory_used_threshold_type{{{labels}}} {1 if cluster.get('log_max_memory_used_threshold_type', 'absolute_value_in_mb') == 'percentage' else 0}\n")
+        lines.append("# HELP memory_policy_over_commit_percent Allowed memory overcommit for the cluster, expressed as a percantage of physical memory (number).\n")
+        lines.append("# TYPE memory_policy_over_commit_percent gauge\n")
+        lines.append(f"memory_policy_over_commit_percent{{{labels}}} {cluster.get('memory_policy', {}).get('over_commit', {}).get('percent', 0)}\n")
+        lines.append("# HELP memory_policy_transparent_hugepages_enabled Allowed memory overcommit for the cluster, expressed as a percantage of physical memory (number).\n")
+        lines.append("# TYPE memory_policy_transparent_hugepages_enabled gauge\n")
+        lines.append(f"memory_policy_transparent_hugepages_enabled{{{labels}}} {1 if cluster.get('memory_policy', {}).get('transparent_hugepages', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP migration_auto_converge Migration network selection mode: 0/1/2/3 - false/true/inherit/unknown (number).\n")
+        lines.append("# TYPE migration_auto_converge gauge\n")
+        lines.append(f"migration_auto_converge{{{labels}}} { {'false': 0, 'true': 1, 'inherit': 2, 'unknown': 3}.get(cluster.get('migration', {}).get('auto_converge', 'unknown'))}\n")
+        lines.append("# HELP migration_bandwidth_assignment_method Defines how the migration bandwidth is assigned: 0/1/2/3 - auto/custom/hypervisor_default/unknown (number).\n")
+        lines.append("# TYPE migration_bandwidth_assignment_method gauge\n")
+        lines.append(f"migration_bandwidth_assignment_method{{{labels}}} { {'auto': 0, 'custom': 1, 'hypervisor_default': 2, 'unknown': 3}.get(cluster.get('migration', {}).get('bandwidth', {}).get('assignment_method', 'unknown'))}\n")
+        lines.append("# HELP migration_compressed Indicates whether memory compression is enabled for live migration: 0/1/2/3 - false/true/inherit/unknown (number).\n")
+        lines.append("# TYPE migration_compressed gauge\n")
+        lines.append(f"migration_compressed{{{labels}}} { {'false': 0, 'true': 1, 'inherit': 2, 'unknown': 3}.get(cluster.get('migration', {}).get('compressed', 'unknown'))}\n")
+        lines.append("# HELP migration_encrypted Specifies whether the migration should be encrypted or not: 0/1/2/3 - false/true/inherit/unknown (number).\n")
+        lines.append("# TYPE migration_encrypted gauge\n")
+        lines.append(f"migration_encrypted{{{labels}}} { {'false': 0, 'true': 1, 'inherit': 2, 'unknown': 3}.get(cluster.get('migration', {}).get('encrypted', 'unknown'))}\n")
+        lines.append("# HELP required_rng_source Representing the random generator backend types: 0/1/2/3 - hwrng/random/urandom/unknown (number).\n")
+        lines.append("# TYPE required_rng_source gauge\n")
+        lines.append(f"required_rng_source{{{labels}}} { {'hwrng': 0, 'random': 1, 'urandom': 2, 'unknown': 3}.get(cluster.get('required_rng_sources', {}).get('required_rng_source', 'unknown')[0])}\n")
+        lines.append("# HELP switch_type The type of switch to be used by all networks in given cluster: 0/1/2 - legacy/ovs/unknown (number).\n")
+        lines.append("# TYPE switch_type gauge\n")
+        lines.append(f"switch_type{{{labels}}} { {'legacy': 0, 'ovs': 1, 'unknown': 2}.get(cluster.get('switch_type', 'unknown'))}\n")
+        lines.append("# HELP threads_as_cores Indicates whether CPU threads (SMT/Hyper-Threading) are treated as separate CPU cores by the scheduler (bool).\n")
+        lines.append("# TYPE threads_as_cores gauge\n")
+        lines.append(f"threads_as_cores{{{labels}}} {1 if cluster.get('threads_as_cores', 'false') == 'true' else 0}\n")
+        lines.append("# HELP trusted_service Indicates whether trusted services are enabled for virtual machine in the cluster (bool).\n")
+        lines.append("# TYPE trusted_service gauge\n")
+        lines.append(f"trusted_service{{{labels}}} {1 if cluster.get('trusted_service', 'false') == 'true' else 0}\n")
+        lines.append("# HELP tunnel_migration Indicates whether virtual machine migration is performed via the management network tunnel (bool).\n")
+        lines.append("# TYPE tunnel_migration gauge\n")
+        lines.append(f"tunnel_migration{{{labels}}} {1 if cluster.get('tunnel_migration', 'false') == 'true' else 0}\n")
+        lines.append("# HELP virt_service Indicates whether virtualization services are enabled for the cluster (bool).\n")
+        lines.append("# TYPE virt_service gauge\n")
+        lines.append(f"virt_service{{{labels}}} {1 if cluster.get('virt_service', 'false') == 'true' else 0}\n")
+        lines.append("# HELP vnc_encryption Indicates whether VNC console connections to virtual machines are encrypted (bool).\n")
+        lines.append("# TYPE vnc_encryption gauge\n")
+        lines.append(f"vnc_encryption{{{labels}}} {1 if cluster.get('vnc_encryption', 'false') == 'true' else 0}\n")
+
+    return filter_series("clusters", lines)
+
+
+@register_collector("storagedomains", depends=("datacenters",))
+async def get_storagedomains_statistics(session, token, inventory):
+    if COLLECTOR_BACKEND == "dwh":
+        storagedomains_statistics = await get_dwh_storagedomains()
+    else:
+        storagedomains_statistics = await get_json(session, token, "storagedomains?follow=disk_profiles")
+
+    for storagedomain in storagedomains_statistics["storage_domain"]:
+        inventory["storage_domains"][storagedomain.get("id", "unknown")] = {"name": storagedomain.get("name", "unknown"),
+                                                                            "storage_type": storagedomain.get("storage", {}).get("type", "unknown")}
+
+        for item in storagedomain.get("disk_profiles", {}).get("disk_profile", {}):
+            inventory["disk_profiles"][item.get("id", "unknown")] = {"name": item.get("name", "unknown"),
+                                                                     "storage_domain_id": storagedomain.get("id", "unknown")}
+
+    inventory["ready"]["storagedomains"].set()
+    await wait_dependencies(inventory)
+
+    lines = []
+
+    for storagedomain in storagedomains_statistics["storage_domain"]:
+        labels = {"object_type": "storagedomain",
+                  "storage_type": storagedomain.get("storage", {}).get("type", "unknown"),
+                  "name": storagedomain.get("name", "unknown"),
+                  "id": storagedomain.get("id", "unknown")}
+
+        object_labels = labels
+        labels = render_labels(labels)
+
+        lines.append("# HELP Amount of free storage space avalible in the storage domain (bytes).\n")
+        lines.append("# TYPE available gauge\n")
+        lines.append(f"available{{{labels}}} {storagedomain.get('available', 0)}\n")
+        lines.append("# HELP This attribute indicates whether a data storage domain is used as backup domain or not (bool).\n")
+        lines.append("# TYPE backup gauge\n")
+        lines.append(f"backup{{{labels}}} {1 if storagedomain.get('backup', 'false') == 'true' else 0}\n")
+        lines.append("# HELP Specifies block size in bytes for a storage domain (bytes).\n")
+        lines.append("# TYPE block_size gauge\n")
+        lines.append(f"block_size{{{labels}}} {storagedomain.get('block_size', 0)}\n")
+        lines.append("# HELP Total logical size of all virtual disks allocated on the storage domain (bytes).\n")
+        lines.append("# TYPE committed gauge\n")
+        lines.append(f"committed{{{labels}}} {storagedomain.get('committed', 0)}\n")
+        lines.append("# HELP Free space threshold, in percent, below which operations are blocked on the storage domain (number).\n")
+        lines.append("# TYPE critical_space_action_blocker gauge\n")
+        lines.append(f"critical_space_action_blocker{{{labels}}} {storagedomain.get('critical_space_action_blocker', 0)}\n")
+        lines.append("# HELP Indicates whether disks' blocks on block storage domains will be discarded right before they are deleted (bool).\n")
+        lines.append("# TYPE discard_after_delete gauge\n")
+        lines.append(f"discard_after_delete{{{labels}}} {1 if storagedomain.get('discard_after_delete', 'false') == 'true' else 0}\n")
+        lines.append("# HELP External health status of the storage domain as reported by the storage backend: 0/1/2/3/4/5 - error/failure/info/ok/warning/unknown (number).\n")
+        lines.append("# TYPE external_status gauge\n")
+        lines.append(f"external_status{{{labels}}} { {'error': 0, 'failure': 1, 'info': 2, 'ok': 3, 'warning': 4, 'unknown': 5}.get(storagedomain.get('external_status', 'unknown'))}\n")
+        lines.append("# HELP Indicates whether the storage domain is the master domain of the data center (bool).\n")
+        lines.append("# TYPE master gauge\n")
+        lines.append(f"master{{{labels}}} {1 if storagedomain.get('master', 'false') == 'true' else 0}\n")
+        lines.append("# HELP Storage domain metadata format version (v1-v5): 0/1/2/3/4/5 - v1/v2/v3/v4/v5/unknown (number).\n")
+        lines.append("# TYPE storage_format gauge\n")
+        lines.append(f"storage_format{{{labels}}} { {'v1': 0, 'v2': 1, 'v3': 2, 'v4': 3, 'v5': 4, 'unknown': 5}.get(storagedomain.get('storage_format', 'unknown'))}\n")
+        lines.append("# HELP Indicates whether a block storage domain supports discard operations (bool).\n")
+        lines.append("# TYPE supports_discard gauge\n")
+        lines.append(f"supports_discard{{{labels}}} {1 if storagedomain.get('supports_discard', 'false') == 'true' else 0}\n")
+        lines.append("# HELP Indicates whether a block storage domain supports the property that discard zeroes the data (bool).\n")
+        lines.append("# TYPE supports_discard_zeroes_data gauge\n")
+        lines.append(f"supports_discard_zeroes_data{{{labels}}} {1 if storagedomain.get('supports_discard_zeroes_data', 'false') == 'true' else 0}\n")
+        lines.append("# HELP Storage domain role: 0/1/2/3/4/5/6 - data/export/image/iso/managed_block_storage/volume/unknown (number).\n")
+        lines.append("# TYPE type gauge\n")
+        lines.append(f"type{{{labels}}} { {'data': 0, 'export': 1, 'image': 2, 'iso': 3, 'managed_block_storage': 4, 'volume': 5, 'unknown': 6}.get(storagedomain.get('type', 'unknown'))}\n")
+        lines.append("# HELP Used storage space in the storage domain (bytes).\n")
+        lines.append("# TYPE used gauge\n")
+        lines.append(f"used{{{labels}}} {storagedomain.get('used', 0)}\n")
+        lines.append("# HELP Warning threshold for low free space on the storage domain (percent).\n")
+        lines.append("# TYPE warning_low_space_indicator gauge\n")
+        lines.append(f"warning_low_space_indicator{{{labels}}} {storagedomain.get('warning_low_space_indicator', 0)}\n")
+        lines.append("# HELP Serves as the default value of wipe_after_delete for disks on this storage domain (bool).\n")
+        lines.append("# TYPE wipe_after_delete gauge\n")
+        lines.append(f"wipe_after_delete{{{labels}}} {1 if storagedomain.get('wipe_after_delete', 'false') == 'true' else 0}\n")
+
+        for item in storagedomain.get("storage", {}).get("volume_group", {}).get("logical_units", {}).get("logical_unit", {}) if family_enabled("luns") else []:
+            labels_str_stats = render_labels({**object_labels,
+                                              "logical_unit_product_id": item.get("product_id", "unknown"),
+                                              "logical_unit_serial": item.get("serial", "unknown"),
+                                              "logical_unit_address": item.get("address", "unknown"),
+                                              "logical_unit_portal": item.get("portal", "unknown"),
+                                              "logical_unit_target": item.get("target", "unknown"),
+                                              "logical_unit_vendor_id": item.get("vendor_id", "unknown"),
+                                              "logical_unit_volume_group_id": item.get("volume_group_id", "unknown"),
+                                              "logical_unit_id": item.get("id", "unknown"),
+                                              "logical_unit_lun_mapping": item.get("lun_mapping", "unknown")})
+
+            lines.append("# HELP The maximum number of bytes that can be discarded by the logical unit’s underlying storage in a single operation (bytes).\n")
+            lines.append("# TYPE discard_max_size gauge\n")
+            lines.append(f"discard_max_size{{{labels_str_stats}}} {item.get('discard_max_size', 0)}\n")
+            lines.append("# HELP True, if previously discarded blocks in the logical unit’s underlying storage are read back as zeros (bool).\n")
+            lines.append("# TYPE discard_zeroes_data gauge\n")
+            lines.append(f"discard_zeroes_data{{{labels_str_stats}}} {1 if item.get('discard_zeroes_data', 'false') == 'true' else 0}\n")
+            lines.append("# HELP Number of active multipath to the logical unit (LUN) (number).\n")
+            lines.append("# TYPE paths gauge\n")
+            lines.append(f"paths{{{labels_str_stats}}} {item.get('paths', 0)}\n")
+            lines.append("# HELP Network port used to access the logical unit (LUN). For example iSCSI target port (number).\n")
+            lines.append("# TYPE port gauge\n")
+            lines.append(f"port{{{labels_str_stats}}} {item.get('port', 0)}\n")
+            lines.append("# HELP Size of the logical unit (LUN) (bytes).\n")
+            lines.append("# TYPE size gauge\n")
+            lines.append(f"size{{{labels_str_stats}}} {item.get('size', 0)}\n")
+
+        for item in storagedomain.get("data_centers", {}).get("data_center", {}) if family_enabled("storage_domain_data_centers") else []:
+            labels_str_stats = render_labels({**object_labels,
+                                              "data_center_id": item.get("id", "unknown"),
+                                              "data_center_name": resolve(inventory, "data_centers", item.get("id", "unknown"))})
+
+            lines.append("# HELP Size of the logical unit (LUN) (bytes).\n")
+            lines.append("# TYPE data_center_id gauge\n")
+            lines.append(f"data_center_id{{{labels_str_stats}}} 1\n")
+
+    return filter_series("storagedomains", lines)
+
+
+@register_collector("disks", depends=("datacenters", "storagedomains"), cost=5, enabled=DISK_COLLECTOR)
+async def get_disks_statistics(session, token, inventory):
+    follow = follow_param(("disk_statistics", "statistics"))
+    page_size = min(DISK_PAGE_SIZE, MEMORY_PAGE_SIZE) if MEMORY_STATE["level"] > 0 else DISK_PAGE_SIZE
+    disks = {}
+
+    async for disk in iter_pages(session, token, f"disks?follow={follow}", "disk", page_size):
+        disks.setdefault(disk.get("id", "unknown"), disk)
+
+    await wait_dependencies(inventory)
+
+    lines = []
+
+    for disk in disks.values():
+        labels = {"object_type": "disk",
+                  "alias": disk.get("alias", "unknown"),
+                  "name": disk.get("name", "unknown"),
+                  "id": disk.get("id", "unknown"),
+                  "image_id": disk.get("image_id", "unknown"),
+                  "disk_profile_id": disk.get("disk_profile", {}).get("id", "unknown"),
+                  "disk_profile_name": resolve(inventory, "disk_profiles", disk.get("disk_profile", {}).get("id", "unknown")),
+                  "quota_id": disk.get("quota", {}).get("id", "unknown"),
+                  "quota_name": resolve(inventory, "quotas", disk.get("quota", {}).get("id", "unknown")),
+                  "storage_domain_id": disk.get("storage_domains", {}).get("storage_domain", [{}])[0].get("id", "unknown"),
+                  "storage_domain_name": resolve(inventory, "storage_domains", disk.get("storage_domains", {}).get("storage_domain", [{}])[0].get("id", "unknown"))}
+
+        inventory["disks"][disk.get("id", "unknown")] = {"actual_size": int(disk.get("actual_size", 0)),
+                                                         "storage_domain_id": disk.get("storage_domains", {}).get("storage_domain", [{}])[0].get("id", "unknown")}
+
+        labels = render_labels(labels)
+        lines.append("# HELP disk_backup The backup behavior supported by the disk: 0/1/2 - incremental/none/unknown (number).\n")
+        lines.append("# TYPE disk_backup gauge\n")
+        lines.append(f"disk_backup{{{labels}}} { {'incremental': 0, 'none': 1, 'unknown': 2}.get(disk.get('backup', 'unknown'))}\n")
+        lines.append("# HELP disk_content_type Indicates the actual content residing on the disk: 0/1/2/3/4/5/6/7/8/9/10 - backup_scratch/data/hosted_engine/hosted_engine_configuration/hosted_engine_metadata/hosted_engine_sanlock/iso/memory_dump_volume/memory_metadata_volume/ovf_store/unknown (number).\n")
+        lines.append("# TYPE disk_content_type gauge\n")
+        lines.append(f"disk_content_type{{{labels}}} { {'backup_scratch': 0, 'data': 1, 'hosted_engine': 2,
+                                                         'hosted_engine_configuration': 3, 'hosted_engine_metadata': 4, 'hosted_engine_sanlock': 5,
+                                                         'iso': 6, 'memory_dump_volume': 7, 'memory_metadata_volume': 8,
+                                                         'ovf_store': 9, 'unknown': 10}.get(disk.get('content_type', 'unknown'))}\n")
+        lines.append("# HELP disk_format The underlying storage format: 0/1/2 - cow/raw/unknown (number).\n")
+        lines.append("# TYPE disk_format gauge\n")
+        lines.append(f"disk_format{{{labels}}} { {'cow': 0, 'raw': 1, 'unknown': 2}.get(disk.get('format', 'unknown'))}\n")
+        lines.append("# HELP disk_qcow_version The underlying QCOW version of a QCOW volume: 0/1/2 - qcow2_v2/qcow2_v3/unknown (number).\n")
+        lines.append("# TYPE disk_qcow_version gauge\n")
+        lines.append(f"disk_qcow_version{{{labels}}} { {'qcow2_v2': 0, 'qcow2_v3': 1, 'unknown': 2}.get(disk.get('qcow_version', 'unknown'))}\n")
+        lines.append("# HELP disk_storage_type Disk storage type: 0/1/2/3/4 - cinder/image/lun/managed_block_storage/unknown (number).\n")
+        lines.append("# TYPE disk_storage_type gauge\n")
+        lines.append(f"disk_storage_type{{{labels}}} { {'cinder': 0, 'image': 1, 'lun': 2, 'managed_block_storage': 3, 'unknown': 4}.get(disk.get('storage_type', 'unknown'))}\n")
+        lines.append("# HELP actual_size Actual allocated size of the disk on storage (bytes).\n")
+        lines.append("# TYPE actual_size gauge\n")
+        lines.append(f"actual_size{{{labels}}} {disk.get('actual_size', 0)}\n")
+        lines.append("# HELP propagate_errors 1 if disk I/O errors propagate to the guest (fatal), else 0 (bool).\n")
+        lines.append("# TYPE propagate_errors gauge\n")
+        lines.append(f"propagate_errors{{{labels}}} {1 if disk.get('propagate_errors', 'false') == 'true' else 0}\n")
+        lines.append("# HELP provisioned_size Provisioned (virtual) size of the disk (bytes).\n")
+        lines.append("# TYPE provisioned_size gauge\n")
+        lines.append(f"provisioned_size{{{labels}}} {disk.get('provisioned_size', 0)}\n")
+        lines.append("# HELP shareable 1 if the disk is marked as shareable between VMs, else 0 (bool).\n")
+        lines.append("# TYPE shareable gauge\n")
+        lines.append(f"shareable{{{labels}}} {1 if disk.get('shareable', 'false') == 'true' else 0}\n")
+        lines.append("# HELP sparse 1 if the disk is thin-provisioned (sparse), else 0 (bool).\n")
+        lines.append("# TYPE sparse gauge\n")
+        lines.append(f"sparse{{{labels}}} {1 if disk.get('sparse', 'false') == 'true' else 0}\n")
+        lines.append("# HELP status 1 if the disk status is ok, else 0 (bool).\n")
+        lines.append("# TYPE status gauge\n")
+        lines.append(f"status{{{labels}}} {1 if disk.get('status', 'fail') == 'ok' else 0}\n")
+        lines.append("# HELP total_size Total space consumed by the disk on storage (bytes).\n")
+        lines.append("# TYPE total_size gauge\n")
+        lines.append(f"total_size{{{labels}}} {disk.get('total_size', 0)}\n")
+        lines.append("# HELP wipe_after_delete 1 if secure wipe after delete is enabled, else 0 (bool).\n")
+        lines.append("# TYPE wipe_after_delete gauge\n")
+        lines.append(f"wipe_after_delete{{{labels}}} {1 if disk.get('wipe_after_delete', 'false') == 'true' else 0}\n")
+
+        for item in disk.get("statistics", {}).get("statistic", {}) if family_enabled("disk_statistics") else []:
+            lines.append(f"# HELP {item.get('name', 'unknown').replace('.', '_')} {item.get('description', 'unknown')} ({item.get('unit', 'unknown')}).\n")
+            lines.append(f"# TYPE {item.get('name', 'unknown').replace('.', '_')} {item.get('kind', 'unknown')}\n")
+            lines.append(f"{item.get('name', 'unknown').replace('.', '_')}{{{labels}}} {item.get('values', {}).get('value', {})[0].get('datum', 0)
+                if len(item.get('values', {})) > 0
+                else 0}\n")
+
+    return filter_series("disks", lines)
+
+
+@register_collector("storagedomain_disks", depends=("storagedomains",), interval=300, cost=5, enabled="storagedomain_disks" in ENABLED_COLLECTORS)
+async def get_storagedomain_disks_statistics(session, token, inventory):
+    await wait_dependencies(inventory)
+
+    storage_domain_ids = list(inventory["storage_domains"])
+    if not storage_domain_ids:
+        raise RuntimeError("No storage domains in the inventory, the storagedomains collector returned nothing")
+
+    results = await fan_out(session, token, [f"storagedomains/{storage_domain_id}/disks" for storage_domain_id in storage_domain_ids])
+    if all(isinstance(result, Exception) for result in results):
+        raise RuntimeError(f"Failed to fetch disks of all {len(results)} storage domains: {results[0]!r}")
+
+    lines = []
+
+    for storage_domain_id, result in zip(storage_domain_ids, results):
+        if isinstance(result, Exception):
+            log.warning(f"Failed to fetch disks of storage domain {storage_domain_id}: {result!r}")
+            continue
+
+        labels = render_labels({"object_type": "storagedomain",
+                                "storage_type": resolve(inventory, "storage_domains", storage_domain_id, "storage_type"),
+                                "name": resolve(inventory, "storage_domains", storage_domain_id),
+                                "id": storage_domain_id})
+
+        disks = result.get("disk", [])
+        lines.append("# HELP disks_count Number of disks on the storage domain (number).\n")
+        lines.append("# TYPE disks_count gauge\n")
+        lines.append(f"disks_count{{{labels}}} {len(disks)}\n")
+        lines.append("# HELP disks_actual_size Actual allocated size of the disks on the storage domain (bytes).\n")
+        lines.append("# TYPE disks_actual_size gauge\n")
+        lines.append(f"disks_actual_size{{{labels}}} {sum(int(disk.get('actual_size', 0)) for disk in disks)}\n")
+        lines.append("# HELP disks_provisioned_size Provisioned (virtual) size of the disks on the storage domain (bytes).\n")
+        lines.append("# TYPE disks_provisioned_size gauge\n")
+        lines.append(f"disks_provisioned_size{{{labels}}} {sum(int(disk.get('provisioned_size', 0)) for disk in disks)}\n")
+
+    return filter_series("storagedomain_disks", lines)
+
+
+@register_collector("networks", depends=("datacenters",), enabled="networks" in ENABLED_COLLECTORS)
+async def get_networks_statistics(session, token, inventory):
+    networks_statistics = await get_json(session, token, "networks")
+
+    for network in networks_statistics.get("network", []):
+        inventory["networks"][network.get("id", "unknown")] = {"name": network.get("name", "unknown"),
+                                                               "data_center_id": network.get("data_center", {}).get("id", "unknown")}
+
+    inventory["ready"]["networks"].set()
+    await wait_dependencies(inventory)
+
+    lines = []
+
+    for network in networks_statistics.get("network", []):
+        labels = {"object_type": "network",
+                  "name": network.get("name", "unknown"),
+                  "id": network.get("id", "unknown"),
+                  "data_center_id": network.get("data_center", {}).get("id", "unknown"),
+                  "data_center_name": resolve(inventory, "data_centers", network.get("data_center", {}).get("id", "unknown"))}
+
+        usages = network.get("usages", {}).get("usage", [])
+
+        labels = render_labels(labels)
+        lines.append("# HELP mtu The maximum transmission unit of the logical network, 0 - default (number).\n")
+        lines.append("# TYPE mtu gauge\n")
+        lines.append(f"mtu{{{labels}}} {network.get('mtu', 0)}\n")
+        lines.append("# HELP vlan_id The VLAN tag of the logical network, 0 - untagged (number).\n")
+        lines.append("# TYPE vlan_id gauge\n")
+        lines.append(f"vlan_id{{{labels}}} {network.get('vlan', {}).get('id', 0)}\n")
+        lines.append("# HELP required Defines whether the network is mandatory for all the hosts in the cluster (bool).\n")
+        lines.append("# TYPE required gauge\n")
+        lines.append(f"required{{{labels}}} {1 if network.get('required', 'false') == 'true' else 0}\n")
+        lines.append("# HELP stp Specifies whether the spanning tree protocol is enabled for the network (bool).\n")
+        lines.append("# TYPE stp gauge\n")
+        lines.append(f"stp{{{labels}}} {1 if network.get('stp', 'false') == 'true' else 0}\n")
+        lines.append("# HELP port_isolation Defines whether communication between VMs running on the same host is blocked on this network (bool).\n")
+        lines.append("# TYPE port_isolation gauge\n")
+        lines.append(f"port_isolation{{{labels}}} {1 if network.get('port_isolation', 'false') == 'true' else 0}\n")
+
+        for usage in ("default_route", "display", "gluster", "management", "migration", "vm"):
+            lines.append(f"# HELP usage_{usage} The network is used for {usage.replace('_', ' ')} traffic (bool).\n")
+            lines.append(f"# TYPE usage_{usage} gauge\n")
+            lines.append(f"usage_{usage}{{{labels}}} {1 if usage in usages else 0}\n")
+
+    return filter_series("networks", lines)
+
+
+@register_collector("vnicprofiles", depends=("networks",), enabled="vnicprofiles" in ENABLED_COLLECTORS)
+async def get_vnicprofiles_statistics(session, token, inventory):
+    vnicprofiles_statistics = await get_json(session, token, "vnicprofiles")
+
+    for vnic_profile in vnicprofiles_statistics.get("vnic_profile", []):
+        inventory["vnic_profiles"][vnic_profile.get("id", "unknown")] = {"name": vnic_profile.get("name", "unknown"),
+                                                                         "network_id": vnic_profile.get("network", {}).get("id", "unknown")}
+
+    await wait_dependencies(inventory)
+
+    lines = []
+
+    for vnic_profile in vnicprofiles_statistics.get("vnic_profile", []):
+        labels = render_labels({"object_type": "vnic_profile",
+                                "name": vnic_profile.get("name", "unknown"),
+                                "id": vnic_profile.get("id", "unknown"),
+                                "network_id": vnic_profile.get("network", {}).get("id", "unknown"),
+                                "network_name": resolve(inventory, "networks", vnic_profile.get("network", {}).get("id", "unknown"))})
+
+        lines.append("# HELP port_mirroring Enables port mirroring for the VM network interfaces using the profile (bool).\n")
+        lines.append("# TYPE port_mirroring gauge\n")
+        lines.append(f"port_mirroring{{{labels}}} {1 if vnic_profile.get('port_mirroring', 'false') == 'true' else 0}\n")
+        lines.append("# HELP migratable Marks whether pass_through NIC is migratable or not (bool).\n")
+        lines.append("# TYPE migratable gauge\n")
+        lines.append(f"migratable{{{labels}}} {1 if vnic_profile.get('migratable', 'false') == 'true' else 0}\n")
+        lines.append("# HELP pass_through_mode The pass-through mode of the profile: 0/1/2 - disabled/enabled/unknown (number).\n")
+        lines.append("# TYPE pass_through_mode gauge\n")
+        lines.append(f"pass_through_mode{{{labels}}} { {'disabled': 0, 'enabled': 1, 'unknown': 2}.get(vnic_profile.get('pass_through', {}).get('mode', 'unknown'), 2)}\n")
+
+    return filter_series("vnicprofiles", lines)
+
+
+@register_collector("templates", depends=("clusters",), interval=300, enabled="templates" in ENABLED_COLLECTORS)
+async def get_templates_statistics(session, token, inventory):
+    templates_statistics = await get_json(session, token, "templates")
+
+    await wait_dependencies(inventory)
+
+    lines = []
+
+    for template in templates_statistics.get("template", []):
+        labels = render_labels({"object_type": "template",
+                                "name": template.get("name", "unknown"),
+                                "id": template.get("id", "unknown"),
+                                "version_name": template.get("version", {}).get("version_name", "unknown"),
+                                "os_type": template.get("os", {}).get("type", "unknown"),
+                                "cluster_id": template.get("cluster", {}).get("id", "unknown"),
+                                "cluster_name": resolve(inventory, "clusters", template.get("cluster", {}).get("id", "unknown"))})
+
+        lines.append("# HELP memory The template memory (bytes).\n")
+        lines.append("# TYPE memory gauge\n")
+        lines.append(f"memory{{{labels}}} {template.get('memory', 0)}\n")
+        lines.append("# HELP cpu_topology_cores Number of template CPU cores (number).\n")
+        lines.append("# TYPE cpu_topology_cores gauge\n")
+        lines.append(f"cpu_topology_cores{{{labels}}} {template.get('cpu', {}).get('topology', {}).get('cores', 0)}\n")
+        lines.append("# HELP cpu_topology_sockets Number of template CPU sockets (number).\n")
+        lines.append("# TYPE cpu_topology_sockets gauge\n")
+        lines.append(f"cpu_topology_sockets{{{labels}}} {template.get('cpu', {}).get('topology', {}).get('sockets', 0)}\n")
+        lines.append("# HELP cpu_topology_threads Number of template CPU threads (number).\n")
+        lines.append("# TYPE cpu_topology_threads gauge\n")
+        lines.append(f"cpu_topology_threads{{{labels}}} {template.get('cpu', {}).get('topology', {}).get('threads', 0)}\n")
+        lines.append("# HELP stateless Is the template stateless (bool).\n")
+        lines.append("# TYPE stateless gauge\n")
+        lines.append(f"stateless{{{labels}}} {1 if template.get('stateless', 'false') == 'true' else 0}\n")
+        lines.append("# HELP high_availability_enabled Is high availability enabled for VMs created from the template (bool).\n")
+        lines.append("# TYPE high_availability_enabled gauge\n")
+        lines.append(f"high_availability_enabled{{{labels}}} {1 if template.get('high_availability', {}).get('enabled', 'false') == 'true' else 0}\n")
+        lines.append("# HELP status The template status: 0/1/2/3 - illegal/locked/ok/unknown (number).\n")
+        lines.append("# TYPE status gauge\n")
+        lines.append(f"status{{{labels}}} { {'illegal': 0, 'locked': 1, 'ok': 2, 'unknown': 3}.get(template.get('status', 'unknown'), 3)}\n")
+
+    return filter_series("templates", lines)
+
+
+def get_rollup_statistics(inventory):
+    hosts = inventory["hosts"]
+    clusters = inventory["clusters"]
+    data_centers = inventory["data_centers"]
+
+    scopes = {"host": {}, "cluster": {}, "data_center": {}}
+
+    for vm in inventory["vms"]:
+        keys = {"host": vm["host_id"],
+                "cluster": vm["cluster_id"],
+                "data_center": clusters.get(vm["cluster_id"], {}).get("data_center_id", "unknown")}
+
+        for scope, key in keys.items():
+            if key != "unknown":
+                scopes[scope].setdefault(key, []).append(vm)
+
+    lines = []
+
+    for scope, groups in scopes.items():
+        if not groups:
+            continue
+
+        rollups = {}
+
+        for key, vms in groups.items():
+            if scope == "host":
+                labels = {"object_type": "host",
+                          "name": hosts.get(key, {}).get("name", "unknown"),
+                          "id": key,
+                          "cluster_id": hosts.get(key, {}).get("cluster_id", "unknown")}
+            elif scope == "cluster":
+                labels = {"object_type": "cluster",
+                          "name": clusters.get(key, {}).get("name", "unknown"),
+                          "id": key,
+                          "data_center_id": clusters.get(key, {}).get("data_center_id", "unknown")}
+            else:
+                labels = {"object_type": "data_center",
+                          "name": data_centers.get(key, {}).get("name", "unknown"),
+                          "id": key}
+
+            labels = render_labels(labels)
+
+            statuses = {}
+            disks = {}
+            for vm in vms:
+                statuses[vm["status"]] = statuses.get(vm["status"], 0) + 1
+                disks.update({disk_id: inventory["disks"].get(disk_id, {}).get("actual_size", size) for disk_id, size in vm["disks"].items()})
+
+            for status, count in statuses.items():
+                rollups.setdefault("vms_count", []).append(f'{scope}_vms_count{{{labels}, status="{status}"}} {count}\n')
+
+            rollups.setdefault("vms_cpu_usage", []).append(f"{scope}_vms_cpu_usage{{{labels}}} {sum(vm['cpu_usage'] for vm in vms)}\n")
+            rollups.setdefault("vms_memory", []).append(f"{scope}_vms_memory{{{labels}}} {sum(vm['memory'] for vm in vms)}\n")
+            rollups.setdefault("vms_memory_used", []).append(f"{scope}_vms_memory_used{{{labels}}} {sum(vm['memory_used'] for vm in vms)}\n")
+            rollups.setdefault("vms_disks_actual_size", []).append(f"{scope}_vms_disks_actual_size{{{labels}}} {sum(disks.values())}\n")
+            rollups.setdefault("vms_nics_rx", []).append(f"{scope}_vms_nics_rx{{{labels}}} {sum(vm['nics_rx'] for vm in vms)}\n")
+            rollups.setdefault("vms_nics_tx", []).append(f"{scope}_vms_nics_tx{{{labels}}} {sum(vm['nics_tx'] for vm in vms)}\n")
+
+            if scope == "cluster" and ROLLUP_TOP_N > 0:
+                for metric in ("cpu_usage", "memory_used"):
+                    top = sorted(vms, key=lambda vm: vm[metric], reverse=True)[:ROLLUP_TOP_N]
+                    for rank, vm in enumerate(top, start=1):
+                        rollups.setdefault(f"top_vms_{metric}", []).append(f'{scope}_top_vms_{metric}{{{labels}, rank="{rank}", vm_name="{vm["name"]}", vm_id="{vm["id"]}"}} {vm[metric]}\n')
+
+        for name, samples in rollups.items():
+            lines.append(f"# HELP {scope}_{name} {ROLLUP_DESCRIPTIONS[name]}\n")
+            lines.append(f"# TYPE {scope}_{name} gauge\n")
+            lines.extend(samples)
+
+    return filter_series("rollups", lines)
+
+
+def get_history_statistics(inventory):
+    lines = ["# HELP zvirt_exporter_history_dropped_points History points dropped in the last collection because the engine sent no date (number).\n",
+             "# TYPE zvirt_exporter_history_dropped_points gauge\n",
+             f"zvirt_exporter_history_dropped_points {inventory['history_dropped']}\n"]
+
+    for name, family in inventory["history"].items():
+        lines.append(f"# HELP {name} {family['help']}\n")
+        lines.append(f"# TYPE {name} gauge\n")
+        lines.extend(family["samples"])
+
+    lines.append("# EOF\n")
+
+    return lines
+
+
+def build_query_index(kind, inventory):
+    if kind == "vms":
+        objects = {vm["id"]: {**vm,
+                              "cluster_name": resolve(inventory, "clusters", vm["cluster_id"]),
+                              "host_name": resolve(inventory, "hosts", vm["host_id"]),
+                              "storage_domain_ids": sorted({*vm["storage_domain_ids"],
+                                                            *(inventory["disks"][disk_id]["storage_domain_id"]
+                                                              for disk_id in vm["disks"] if disk_id in inventory["disks"])})}
+                   for vm in inventory["vms"]}
+    else:
+        objects = {host_id: {**host,
+                             "id": host_id,
+                             "cluster_name": resolve(inventory, "clusters", host["cluster_id"])}
+                   for host_id, host in inventory["hosts"].items()}
+
+    order = sorted(objects, key=lambda object_id: objects[object_id]["name"])
+    indexes = {name: {} for name in QUERY_FILTERS[kind]}
+
+    for object_id in order:
+        item = objects[object_id]
+        keys = {"cluster": (item["cluster_id"], item["cluster_name"]),
+                "host": (item.get("host_id"), item.get("host_name")),
+                "tag": item["tags"],
+                "storage_domain": (*item.get("storage_domain_ids", []),
+                                   *(resolve(inventory, "storage_domains", storage_domain_id)
+                                     for storage_domain_id in item.get("storage_domain_ids", []))),
+                "status": (item["status"],)}
+
+        for name in indexes:
+            for key in set(keys[name]):
+                if key not in (None, "unknown"):
+                    indexes[name].setdefault(key, []).append(object_id)
+
+    return {"timestamp": time.time(),
+            "objects": objects,
+            "order": order,
+            "indexes": indexes}
+
+
+def get_transfer_statistics():
+    lines = []
+
+    for metric, description in (("requests", "Engine API requests made by the collector during the last collection (number)."),
+                                ("wire_bytes", "Engine API response bytes received by the collector as sent over the wire (bytes)."),
+                                ("decoded_bytes", "Engine API response bytes received by the collector after decompression (bytes).")):
+        lines.append(f"# HELP zvirt_exporter_engine_{metric} {description}\n")
+        lines.append(f"# TYPE zvirt_exporter_engine_{metric} gauge\n")
+        for collector, transfer in TRANSFERS["current"].items():
+            lines.append(f'zvirt_exporter_engine_{metric}{{collector="{collector}"}} {transfer[metric]}\n')
+
+    return lines
+
+
+async def run_collector(name, collector, session, token, inventory):
+    CURRENT_COLLECTOR.set(name)
+    start = time.perf_counter()
+
+    try:
+        return await collector(session, token, inventory)
+    finally:
+        if name in inventory["ready"]:
+            inventory["ready"][name].set()
+        sample_rss()
+        phases = SPANS["current"].setdefault(name, {})
+        phases["render"] = time.perf_counter() - start - SPANS["busy"].get(name, {}).get("total", 0)
+
+
+async def gather_statistic(names=None):
+    SPANS["current"] = {}
+    SPANS["busy"] = {}
+    TRANSFERS["current"] = {}
+    cycle_start = time.perf_counter()
+
+    session = await get_engine_session()
+    token = await get_token(session)
+
+    inventory = {"vms": [],
+                 "hosts": {},
+                 "clusters": {},
+                 "data_centers": {},
+                 "storage_domains": {},
+                 "quotas": {},
+                 "disk_profiles": {},
+                 "disks": {},
+                 "networks": {},
+                 "vnic_profiles": {},
+                 "ready": {},
+                 "history": {},
+                 "history_dropped": 0,
+                 "collected": time.time()}
+
+    collectors = {name: COLLECTORS[name]["func"] for name in schedule_collectors(COLLECTORS if names is None else names)}
+    inventory["ready"] = {name: asyncio.Event() for name in collectors}
+
+    results = await asyncio.gather(*(run_collector(name, collector, session, token, inventory)
+                                     for name, collector in collectors.items()),
+                                   return_exceptions=True)
+
+    fragments = {}
+    for name, result in zip(collectors, results):
+        if isinstance(result, Exception):
+            log.error(f"Collector {name} failed: {result!r}")
+        else:
+            with span("join", name):
+                fragments[name] = "".join(result)
+
+    if not fragments:
+        raise RuntimeError(f"All {len(collectors)} collectors failed")
+
+    if ROLLUPS_ENABLED and "vms" in fragments:
+        with span("render", "rollups"):
+            fragments["rollups"] = "".join(get_rollup_statistics(inventory))
+
+    if TRANSFERS["current"]:
+        fragments["transfer"] = "".join(get_transfer_statistics())
+
+    with span("render", "query"):
+        for kind in QUERY_FILTERS:
+            if kind in fragments:
+                QUERY_INDEX[kind] = build_query_index(kind, inventory)
+
+    if HISTORY_ENABLED and "vms" in fragments:
+        with span("render", "history"):
+            METRICS_CACHE["history"] = "".join(get_history_statistics(inventory))
+        if inventory["history_dropped"]:
+            log.warning(f"Dropped {inventory['history_dropped']} history points without a date, "
+                        f"set HISTORY_SAMPLE_INTERVAL to give them synthetic timestamps")
+
+    SPANS["last"] = {"timestamp": time.time(),
+                     "duration": time.perf_counter() - cycle_start,
+                     "collectors": SPANS["current"]}
+
+    return fragments
+
+
+def save_snapshot():
+    snapshot = {"timestamp": METRICS_CACHE["timestamp"],
+                "fragments": METRICS_CACHE["fragments"],
+                "collected": METRICS_CACHE["collected"],
+                "history": METRICS_CACHE["history"],
+                "index": {name: {"series": sum(1 for line in fragment.splitlines() if not line.startswith("#")),
+                                 "bytes": len(fragment)}
+                          for name, fragment in METRICS_CACHE["fragments"].items()}}
+
+    tmp_path = f"{SNAPSHOT_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, SNAPSHOT_PATH)
+
+
+def load_snapshot():
+    try:
+        with open(SNAPSHOT_PATH, "rb") as f:
+            snapshot = json.loads(f.read())
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        log.warning(f"Failed to load metrics snapshot {SNAPSHOT_PATH}: {e}")
+        return
+
+    age = time.time() - snapshot.get("timestamp", 0)
+    if age > SNAPSHOT_MAX_AGE:
+        log.info(f"Metrics snapshot {SNAPSHOT_PATH} is {age:.0f}s old, ignoring it")
+        return
+
+    METRICS_CACHE["fragments"] = snapshot.get("fragments", {})
+    METRICS_CACHE["data"] = "".join(METRICS_CACHE["fragments"].values())
+    METRICS_CACHE["history"] = snapshot.get("history")
+    METRICS_CACHE["timestamp"] = snapshot.get("timestamp", 0)
+    METRICS_CACHE["collected"] = {name: snapshot.get("collected", {}).get(name, METRICS_CACHE["timestamp"]) for name in METRICS_CACHE["fragments"]}
+    METRICS_CACHE["restored"] = set(METRICS_CACHE["fragments"])
+    log.info(f"Restored metrics snapshot {SNAPSHOT_PATH} ({age:.0f}s old)")
+
+
+def expire_fragments():
+    now = time.time()
+    expired = [name for name in METRICS_CACHE["fragments"]
+               if now - METRICS_CACHE["collected"].get(name, 0) > (SNAPSHOT_MAX_AGE if name in METRICS_CACHE["restored"] else
+                                                                    max(FRAGMENT_MAX_AGE, 2 * COLLECTORS.get("vms" if name == "rollups" else name, {}).get("interval", 0)))]
+
+    for name in expired:
+        log.warning(f"Metrics of {name} are {now - METRICS_CACHE['collected'].get(name, 0):.0f}s old, no longer serving them")
+        del METRICS_CACHE["fragments"][name]
+        METRICS_CACHE["restored"].discard(name)
+
+    if expired:
+        METRICS_CACHE["data"] = None
+        METRICS_CACHE["data"] = "".join(METRICS_CACHE["fragments"].values())
+
+
+async def update_metrics(names=None):
+    start = time.time()
+    new_metrics = None
+
+    if plan_memory() >= 2:
+        MEMORY_STATE["skipped"] += 1
+        MEMORY_STATE["skipped_total"] += 1
+        log.warning(f"Process is over MEMORY_BUDGET_MB={MEMORY_BUDGET_MB}, skipping the collection and serving the previous metrics")
+        if MEMORY_RELEASE:
+            release_memory()
+        return
+
+    selected = schedule_collectors(names)
+    if not selected:
+        return
+
+    MEMORY_STATE["skipped"] = 0
+    MEMORY_STATE["cycle"] = {"start": get_rss()}
+
+    try:
+        log.info(f"Collecting metrics ({', '.join(selected)})...")
+        with debug_capture():
+            new_metrics = await gather_statistic(selected)
+    except Exception as e:
+        log.exception(f"Metrics update failed: {e}")
+
+    if new_metrics:
+        if names is None:
+            METRICS_CACHE["fragments"] = {**{name: fragment for name, fragment in METRICS_CACHE["fragments"].items()
+                                             if (name in COLLECTORS or name == "rollups") and name not in new_metrics},
+                                          **new_metrics}
+        else:
+            METRICS_CACHE["fragments"] = {**METRICS_CACHE["fragments"], **new_metrics}
+        METRICS_CACHE["data"] = None
+        METRICS_CACHE["data"] = "".join(METRICS_CACHE["fragments"].values())
+        sample_rss()
+        METRICS_CACHE["timestamp"] = time.time()
+        METRICS_CACHE["updated"].update({name: METRICS_CACHE["timestamp"] for name in new_metrics if name in COLLECTORS})
+        METRICS_CACHE["collected"].update({name: METRICS_CACHE["timestamp"] for name in new_metrics})
+        METRICS_CACHE["restored"] -= new_metrics.keys()
+
+        duration = time.time() - start
+        failed = [name for name in selected if name not in new_metrics]
+        if failed:
+            log.warning(f"Metrics partially updated in {duration:.2f}s, keeping previous metrics of {', '.join(failed)}")
+        else:
+            log.info(f"Metrics updated in {duration:.2f}s")
+
+        if SNAPSHOT_PATH and not failed:
+            try:
+                await asyncio.to_thread(save_snapshot)
+            except OSError as e:
+                log.warning(f"Failed to save metrics snapshot {SNAPSHOT_PATH}: {e}")
+    else:
+        log.warning("Keeping previous metrics cache")
+
+    expire_fragments()
+
+    new_metrics = None
+    if MEMORY_RELEASE:
+        release_memory()
+    MEMORY_STATE["cycle"]["released"] = get_rss()
+
+
+async def refresh_metrics(names=None):
+    while True:
+        selected = set(schedule_collectors(names))
+        task = REFRESH_STATE["task"]
+        if task is None or task.done():
+            task = asyncio.create_task(update_metrics(names))
+            REFRESH_STATE["task"] = task
+            REFRESH_STATE["names"] = selected
+            break
+
+        if selected <= REFRESH_STATE["names"]:
+            break
+
+        await asyncio.shield(task)
+
+    await asyncio.shield(task)
+
+
+async def metrics_updater():
+    while True:
+        start = time.time()
+
+        await refresh_metrics()
 
         duration = int(time.time() - start)
         sleep_time = max(0, CACHE_TTL - duration)
@@ -952,12 +2240,37 @@ async def metrics_updater():
 
 @app.on_event("startup")
 async def startup_event():
+    if SNAPSHOT_PATH:
+        load_snapshot()
+
+    await get_engine_session()
+
     log.info("Starting metrics background updater...")
     asyncio.create_task(metrics_updater())
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_engine_session()
+
+    if DWH_POOL["pool"] is not None:
+        await DWH_POOL["pool"].close()
+        DWH_POOL["pool"] = None
+
+
 @app.get("/metrics")
-async def metrics():
+async def metrics(fresh: int = 0, collectors: str = ""):
+    if fresh:
+        names = {name.strip() for name in collectors.split(",") if name.strip()} or None
+        unknown = (names or set()) - COLLECTORS.keys()
+        if unknown:
+            return Response(content=f"Unknown collectors: {', '.join(sorted(unknown))}, available: {', '.join(COLLECTORS)}\n",
+                            status_code=400,
+                            media_type="text/plain")
+
+        if any(time.time() - METRICS_CACHE["updated"].get(name, 0) >= FRESH_MIN_INTERVAL for name in names or COLLECTORS):
+            await refresh_metrics(names)
+
     data = METRICS_CACHE.get("data")
     if not data:
         return Response(content="# HELP zvirt_exporter_not_ready Exporter cache is not ready\n"
@@ -966,7 +2279,159 @@ async def metrics():
                         status_code=200,
                         media_type="text/plain")
 
-    return Response(content=f"{data}# HELP zvirt_exporter_not_ready Exporter cache is not ready\n"
+    snapshot_age = ""
+    if METRICS_CACHE["restored"]:
+        snapshot_age = ("# HELP zvirt_exporter_snapshot_age_seconds Age of the metrics restored from the snapshot, served until their collectors succeed (seconds).\n"
+                        "# TYPE zvirt_exporter_snapshot_age_seconds gauge\n"
+                        f"zvirt_exporter_snapshot_age_seconds {time.time() - min(METRICS_CACHE['collected'].get(name, 0) for name in METRICS_CACHE['restored']):.0f}\n")
+
+    return Response(content=f"{data}{snapshot_age}{''.join(get_memory_statistics())}# HELP zvirt_exporter_not_ready Exporter cache is not ready\n"
                             f"# TYPE zvirt_exporter_not_ready gauge\n"
                             f"zvirt_exporter_not_ready 0",
                     media_type="text/plain")
+
+
+@app.get("/metrics/history")
+async def metrics_history():
+    if not HISTORY_ENABLED:
+        return Response(content="History export is disabled, set HISTORY_ENABLED=true\n",
+                        status_code=404,
+                        media_type="text/plain")
+
+    return Response(content=METRICS_CACHE.get("history") or "# EOF\n",
+                    media_type="application/openmetrics-text; version=1.0.0; charset=utf-8")
+
+
+@app.get("/api/query")
+async def api_query(request: Request, kind: str = "vms", limit: int = 100, offset: int = 0):
+    if kind not in QUERY_FILTERS:
+        return Response(content=f"Unknown kind {kind}, available: {', '.join(QUERY_FILTERS)}\n",
+                        status_code=400,
+                        media_type="text/plain")
+
+    index = QUERY_INDEX.get(kind)
+    if index is None:
+        return Response(content="Query index is not ready\n", status_code=503, media_type="text/plain")
+
+    filters = {name: value for name, value in request.query_params.items() if name in QUERY_FILTERS[kind]}
+    candidates = sorted((index["indexes"][name].get(value, []) for name, value in filters.items()), key=len)
+
+    if candidates:
+        matched = set.intersection(*(set(ids) for ids in candidates[1:])) if len(candidates) > 1 else None
+        ids = [object_id for object_id in candidates[0] if matched is None or object_id in matched]
+    else:
+        ids = index["order"]
+
+    limit = min(max(1, limit), QUERY_MAX_LIMIT)
+    offset = max(0, offset)
+
+    return {"kind": kind,
+            "filters": filters,
+            "timestamp": index["timestamp"],
+            "total": len(ids),
+            "offset": offset,
+            "limit": limit,
+            "items": [index["objects"][object_id] for object_id in ids[offset:offset + limit]]}
+
+
+def debug_denied(request):
+    if not DEBUG_TOKEN:
+        return Response(content="Not Found\n", status_code=404, media_type="text/plain")
+
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {DEBUG_TOKEN}"):
+        return Response(content="Forbidden\n", status_code=403, media_type="text/plain")
+
+    return None
+
+
+@app.post("/debug/profile")
+async def debug_profile_start(request: Request, cycles: int = 1):
+    denied = debug_denied(request)
+    if denied:
+        return denied
+
+    DEBUG_STATE["profile_cycles"] = max(1, cycles)
+    DEBUG_STATE["profile"] = None
+
+    return {"status": "scheduled", "cycles": DEBUG_STATE["profile_cycles"]}
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request):
+    denied = debug_denied(request)
+    if denied:
+        return denied
+
+    if DEBUG_STATE["profile"] is None:
+        return Response(content=f"Profile is not ready, {max(0, DEBUG_STATE['profile_cycles'])} cycle(s) left\n",
+                        status_code=404,
+                        media_type="text/plain")
+
+    return Response(content=DEBUG_STATE["profile"],
+                    media_type="application/octet-stream",
+                    headers={"Content-Disposition": 'attachment; filename="zvirt_exporter.prof"'})
+
+
+@app.post("/debug/tracemalloc")
+async def debug_tracemalloc_start(request: Request):
+    denied = debug_denied(request)
+    if denied:
+        return denied
+
+    DEBUG_STATE["tracemalloc_pending"] = True
+    DEBUG_STATE["tracemalloc"] = None
+
+    return {"status": "scheduled"}
+
+
+@app.get("/debug/tracemalloc")
+async def debug_tracemalloc(request: Request):
+    denied = debug_denied(request)
+    if denied:
+        return denied
+
+    if DEBUG_STATE["tracemalloc"] is None:
+        return Response(content="Tracemalloc snapshot is not ready\n", status_code=404, media_type="text/plain")
+
+    return Response(content=DEBUG_STATE["tracemalloc"],
+                    media_type="text/plain",
+                    headers={"Content-Disposition": 'attachment; filename="zvirt_exporter_tracemalloc.txt"'})
+
+
+@app.get("/debug/spans")
+async def debug_spans(request: Request):
+    denied = debug_denied(request)
+    if denied:
+        return denied
+
+    return Response(content=json.dumps(SPANS["last"], indent=2),
+                    media_type="application/json",
+                    headers={"Content-Disposition": 'attachment; filename="zvirt_exporter_spans.json"'})
+
+
+async def benchmark(cycles):
+    global ENGINE_COMPRESSION
+
+    compression = ENGINE_COMPRESSION
+    try:
+        for mode in ("identity", compression):
+            ENGINE_COMPRESSION = mode
+            for cycle in range(1, cycles + 1):
+                start = time.perf_counter()
+                await gather_statistic()
+                duration = time.perf_counter() - start
+                wire_bytes = sum(transfer["wire_bytes"] for transfer in TRANSFERS["current"].values())
+                decoded_bytes = sum(transfer["decoded_bytes"] for transfer in TRANSFERS["current"].values())
+                print(f"Accept-Encoding: {mode:<20} cycle {cycle}: {duration:.2f}s, "
+                      f"{wire_bytes} bytes over the wire, {decoded_bytes} bytes decoded "
+                      f"({decoded_bytes / max(1, wire_bytes):.1f}x)")
+    finally:
+        ENGINE_COMPRESSION = compression
+        await close_engine_session()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["benchmark"]:
+        asyncio.run(benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 3))
+    else:
+        print(f"Usage: {sys.argv[0]} benchmark [cycles]\nRun the exporter itself with uvicorn zvirt_exporter:app")